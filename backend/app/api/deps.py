@@ -1,34 +1,37 @@
-from typing import Generator, Type
+from typing import Type
 from sqlalchemy.orm import Session, Query
-from sqlalchemy import and_, or_
+from sqlalchemy import select
 from fastapi import Depends, Request
-from ..db import SessionLocal
+from ..db import get_db  # 与 main.py 共用同一个请求级会话依赖
+from ..core.access_log import DEBUG_AUTH_LOG
 from ..auth import get_current_active_user as auth_get_current_active_user
-from ..models import User, Task, DailyReport, TaskAssignmentType
-
-def get_db() -> Generator:
-    """获取数据库会话"""
-    try:
-        db = SessionLocal()
-        yield db
-    finally:
-        db.close()
+from ..models import User, Task, DailyReport, TaskAudience, user_principals
 
 def get_current_active_user(request: Request, db: Session = Depends(get_db)) -> User:
     """获取当前活跃用户（代理至 auth.get_current_active_user 并打印调试信息）"""
     user = auth_get_current_active_user(request, db)
-    # --- 临时调试代码：打印解码用户名与DB用户对象 ---
-    try:
-        decoded_username = request.session.get('username')
-        print(
-            f"[DEBUG-USER-OBJECT]: Decoded Username='{decoded_username}', DB User Object: id={user.id}, username='{user.username}', role='{user.role}', group_id={getattr(user, 'group_id', None)}, identity_type='{getattr(user, 'identity_type', None)}'"
-        )
-    except Exception as e:
-        print(f"[DEBUG-USER-OBJECT-ERROR]: {e}")
+    # --- 临时调试代码：打印解码用户名与DB用户对象（仅 DEBUG_AUTH_LOG=true 时输出） ---
+    if DEBUG_AUTH_LOG:
+        try:
+            decoded_username = request.session.get('username')
+            print(
+                f"[DEBUG-USER-OBJECT]: Decoded Username='{decoded_username}', DB User Object: id={user.id}, username='{user.username}', role='{user.role}', group_id={getattr(user, 'group_id', None)}, identity_type='{getattr(user, 'identity_type', None)}'"
+            )
+        except Exception as e:
+            print(f"[DEBUG-USER-OBJECT-ERROR]: {e}")
     # --- 结束调试 ---
     return user
 
 
+def task_visibility_clause(user: User):
+    """
+    用户可见任务的过滤条件（个人 / 组内 / 身份 / 全员）。
+    通过 task_audience 表按主体主键查找任务 ID，替代四个分配条件的 OR 组合。
+    """
+    visible_ids = select(TaskAudience.task_id).where(TaskAudience.principal.in_(user_principals(user)))
+    return Task.id.in_(visible_ids)
+
+
 def apply_visibility_filters(query: Query, user: User, model_class: Type) -> Query:
     """
     统一的资源可见性过滤器。
@@ -43,38 +46,7 @@ def apply_visibility_filters(query: Query, user: User, model_class: Type) -> Que
 
     # 任务模型的可见性过滤
     if model_class is Task:
-        filters = []
-
-        # 分配给当前用户
-        filters.append(
-            and_(
-                Task.assignment_type == TaskAssignmentType.USER,
-                Task.assigned_to == user.id,
-            )
-        )
-
-        # 分配给所有人
-        filters.append(Task.assignment_type == TaskAssignmentType.ALL)
-
-        # 分配给用户所在组
-        if user.group_id:
-            filters.append(
-                and_(
-                    Task.assignment_type == TaskAssignmentType.GROUP,
-                    Task.target_group_id == user.group_id,
-                )
-            )
-
-        # 分配给用户身份类型
-        if user.identity_type:
-            filters.append(
-                and_(
-                    Task.assignment_type == TaskAssignmentType.IDENTITY,
-                    Task.target_identity == user.identity_type,
-                )
-            )
-
-        return query.filter(or_(*filters))
+        return query.filter(task_visibility_clause(user))
 
     # 日报模型的可见性过滤
     if model_class is DailyReport:
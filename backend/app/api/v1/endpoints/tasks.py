@@ -1,12 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import codecs
+import csv
+import json
+import anyio
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Callable, List, NamedTuple, Optional
 
-from app.schemas import TaskResponse, TaskProgressUpdate, JielongParticipationCreate
+from app.schemas import (
+    TaskResponse, TaskProgressUpdate, JielongParticipationCreate,
+    TaskProgressBatchRequest, TaskProgressBatchItemResult, TaskProgressBatchResponse,
+)
 from app.crud import task_crud
 from app.models import User, Task, JielongRecord, TaskRecord, TaskCompletion
 from app.api import deps
-from sqlalchemy import desc
+from app.core.pagination import decode_cursor, encode_cursor
+from sqlalchemy import and_, desc, or_, select
 
 router = APIRouter()
 
@@ -19,6 +31,7 @@ router = APIRouter()
 def update_task_progress(
     task_id: int,
     progress_in: TaskProgressUpdate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=64),
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user)
 ):
@@ -26,6 +39,7 @@ def update_task_progress(
     为指定 ID 的任务更新进度。
     - **task_id**: 任务的 ID.
     - **progress_in**: 包含新进度值 `value` 的 JSON 对象.
+    - **Idempotency-Key**: 可选请求头，客户端重试时携带相同值不会重复累加.
     """
     # 此处应有权限检查逻辑：检查 current_user 是否被分配到此任务
     # (暂时省略，集中实现核心功能)
@@ -35,12 +49,75 @@ def update_task_progress(
         db=db,
         task_id=task_id,
         user_id=current_user.id,
-        value=progress_in.value
+        value=progress_in.value,
+        idempotency_key=idempotency_key,
     )
     if not updated_task:
         raise HTTPException(status_code=404, detail="Task not found or permission denied")
     return updated_task
 
+# 新 API 1b: 批量提交金额/数量进度（组长晚间集中录入）
+@router.post(
+    "/progress/batch",
+    response_model=TaskProgressBatchResponse,
+    summary="批量提交金额/数量任务进度"
+)
+def batch_update_task_progress(
+    batch_in: TaskProgressBatchRequest,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """
+    一次提交多条进度 `{task_id, value, user_id?, idempotency_key?}`，逐条返回结果。
+    - 权限：本人提交需可参与该任务；代他人提交时超管不限，管理员仅限本组成员
+    - 通过校验的条目在同一事务中写入；未通过的条目返回 error，不影响其他条目
+    """
+    items = batch_in.items
+    tasks = {t.id: t for t in db.query(Task).filter(Task.id.in_({i.task_id for i in items})).all()}
+    other_ids = {i.user_id for i in items if i.user_id is not None and i.user_id != current_user.id}
+    users = {u.id: u for u in db.query(User).filter(User.id.in_(other_ids)).all()} if other_ids else {}
+    users[current_user.id] = current_user
+
+    def check(item) -> Optional[str]:
+        task = tasks.get(item.task_id)
+        if not task:
+            return "任务不存在"
+        if getattr(task.task_type, 'value', task.task_type) not in ("amount", "quantity"):
+            return "仅支持金额/数量类型任务"
+        user_id = item.user_id if item.user_id is not None else current_user.id
+        user = users.get(user_id)
+        if not user or not user.is_active:
+            return "目标用户不存在"
+        if user_id != current_user.id:
+            if not getattr(current_user, "is_super_admin", False):
+                if not getattr(current_user, "is_admin", False):
+                    return "无权限为其他用户提交"
+                if current_user.group_id is None or user.group_id != current_user.group_id:
+                    return "管理员仅可为本组成员提交"
+        if not (getattr(user, "is_admin", False) or task.is_assigned_to_user(user)):
+            return "无权限参与该任务"
+        return None
+
+    results: List[TaskProgressBatchItemResult] = []
+    entries = []
+    for index, item in enumerate(items):
+        user_id = item.user_id if item.user_id is not None else current_user.id
+        error = check(item)
+        results.append(TaskProgressBatchItemResult(
+            index=index, task_id=item.task_id, user_id=user_id, ok=error is None, error=error))
+        if error is None:
+            entries.append({"index": index, "task_id": item.task_id, "user_id": user_id,
+                            "value": item.value, "idempotency_key": item.idempotency_key})
+
+    if entries:
+        outcome = task_crud.log_task_progress_batch(db, tasks, entries)
+        for index, state in outcome.items():
+            results[index].duplicate = state == "duplicate"
+
+    accepted = sum(1 for r in results if r.ok)
+    return TaskProgressBatchResponse(accepted=accepted, rejected=len(results) - accepted, results=results)
+
+
 # 新 API 2: 参与接龙任务（路径与前端保持一致）
 @router.post(
     "/{task_id}/jielong",
@@ -50,6 +127,7 @@ def update_task_progress(
 def participate_in_jielong_task(
     task_id: int,
     participation_in: JielongParticipationCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=64),
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user)
 ):
@@ -66,89 +144,309 @@ def participate_in_jielong_task(
         task_id=task_id,
         user_id=current_user.id,
         data=participation_in,
+        idempotency_key=idempotency_key,
     )
     if not jielong_record:
         raise HTTPException(status_code=404, detail="任务不存在或不支持接龙类型")
     return {"message": "ok", "record_id": jielong_record.id}
 
 
-# 新 API 3: 获取接龙任务参与记录列表
-@router.get(
-    "/{task_id}/jielong",
-    summary="获取接龙参与记录列表"
+# 新 API 2b: 批量导入接龙记录（CSV / NDJSON 流式解析）
+_IMPORT_CHUNK_SIZE = 500
+_IMPORT_MAX_ERRORS = 50
+# 兼容前端字段：id -> student_id，remark -> notes
+_IMPORT_FIELD_ALIASES = {"student_id": "student_id", "id": "student_id", "notes": "notes", "remark": "notes", "intention": "intention"}
+
+
+async def _iter_body_lines(request: Request):
+    """逐块读取请求体并按行产出（保留行尾换行符，供 csv.reader 识别跨行的引号字段），不在内存中保留整个文件"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _blocking_lines(lines):
+    """在工作线程中逐行拉取异步请求体（每行回到事件循环读取一次）"""
+    while True:
+        try:
+            yield anyio.from_thread.run(lines.__anext__)
+        except StopAsyncIteration:
+            return
+
+
+def _normalize_import_row(raw: dict) -> dict:
+    row = {}
+    for key, value in raw.items():
+        field = _IMPORT_FIELD_ALIASES.get(str(key).strip().lower())
+        if field and field not in row:
+            row[field] = None if value is None or value == "" else str(value).strip()
+    if not row.get("student_id"):
+        raise ValueError("缺少 student_id")
+    if len(row["student_id"]) > 100:
+        raise ValueError("student_id 过长")
+    return row
+
+
+@router.post(
+    "/{task_id}/jielong/import",
+    summary="批量导入接龙记录（CSV / NDJSON）"
 )
-def list_jielong_records(
+async def import_jielong_records(
     task_id: int,
-    user_id: Optional[int] = Query(default=None, description="按用户ID筛选接龙记录"),
+    request: Request,
+    format: Optional[str] = Query(default=None, description="csv 或 ndjson；默认按 Content-Type 判断"),
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user)
 ):
-    """返回指定任务的接龙记录列表，包含用户名称与序号。"""
+    """
+    请求体为 CSV（首行表头）或 NDJSON（每行一个对象），字段：student_id(id)、notes(remark)、intention。
+    - 按 (task_id, student_id) 去重：已存在或文件内重复的学号计为 duplicates
+    - 每 500 行写入并提交一次，接龙计数每批只累加一次
+    - 返回 accepted / duplicates / rejected 及前 50 条错误（行号从 1 开始，CSV 含表头行）
+    """
     task = db.query(Task).filter(Task.id == task_id).first()
     if not task:
         raise HTTPException(status_code=404, detail="任务不存在")
+    if getattr(task.task_type, 'value', task.task_type) != "jielong":
+        raise HTTPException(status_code=400, detail="仅支持接龙类型任务")
     if not (getattr(current_user, "is_admin", False) or task.is_assigned_to_user(current_user)):
-        raise HTTPException(status_code=403, detail="无权限查看该任务")
+        raise HTTPException(status_code=403, detail="无权限参与该任务")
+
+    fmt = (format or "").lower()
+    if not fmt:
+        content_type = request.headers.get("content-type", "").lower()
+        fmt = "ndjson" if ("ndjson" in content_type or "jsonl" in content_type or "json" in content_type) else "csv"
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format 仅支持 csv 或 ndjson")
+
+    user_id = current_user.id
+    accepted = duplicates = rejected = 0
+    errors = []
+    seen = set()
+    chunk: List[dict] = []
+
+    def reject(line_no: int, message: str):
+        nonlocal rejected
+        rejected += 1
+        if len(errors) < _IMPORT_MAX_ERRORS:
+            errors.append({"line": line_no, "error": message})
+
+    def flush():
+        nonlocal accepted, duplicates
+        if chunk:
+            added, dup = task_crud.import_jielong_chunk(db, task, user_id, chunk)
+            accepted += added
+            duplicates += dup
+            chunk.clear()
+
+    def add(line_no: int, raw: dict):
+        nonlocal duplicates
+        try:
+            row = _normalize_import_row(raw)
+        except ValueError as e:
+            reject(line_no, str(e))
+            return
+        if row["student_id"] in seen:
+            duplicates += 1
+            return
+        seen.add(row["student_id"])
+        chunk.append(row)
+        if len(chunk) >= _IMPORT_CHUNK_SIZE:
+            flush()
+
+    def run_import():
+        # 解析与逐批写库均在线程池中执行，不阻塞事件循环；请求体仍按行流式读取
+        lines = _blocking_lines(_iter_body_lines(request))
+        line_no = 0
+        try:
+            if fmt == "ndjson":
+                for line in lines:
+                    line_no += 1
+                    if not line.strip():
+                        continue
+                    try:
+                        raw = json.loads(line)
+                    except ValueError as e:  # json.JSONDecodeError 亦为 ValueError
+                        reject(line_no, str(e))
+                        continue
+                    if not isinstance(raw, dict):
+                        reject(line_no, "每行需为 JSON 对象")
+                        continue
+                    add(line_no, raw)
+            else:
+                # 整个请求体交给同一个 csv.reader：引号内的换行属于同一条记录；行号取记录结束的物理行
+                reader = csv.reader(lines)
+                header = None
+                for values in reader:
+                    line_no = reader.line_num
+                    if not any(v.strip() for v in values):
+                        continue
+                    if header is None:
+                        header = [h.strip().lower() for h in values]
+                        continue
+                    add(line_no, dict(zip(header, values)))
+        except UnicodeDecodeError:
+            reject(line_no + 1, "文件编码需为 UTF-8，导入已中止")
+        except csv.Error as e:
+            reject(line_no + 1, f"CSV 格式错误，导入已中止: {e}")
+        flush()
+
+    await run_in_threadpool(run_import)
+
+    return {"accepted": accepted, "duplicates": duplicates, "rejected": rejected, "errors": errors}
+
+
+# ==================== 参与记录列表（接龙 / 金额数量 / 勾选共用） ====================
+
+class _RecordListing(NamedTuple):
+    model: Any
+    time_column: Any
+    serialize: Callable[[Any], dict]
+    extra_filters: tuple = ()
+
+
+_JIELONG_LISTING = _RecordListing(
+    JielongRecord, JielongRecord.created_at,
+    lambda rec: {"id": rec.student_id, "remark": rec.notes, "intention": rec.intention, "created_at": rec.created_at},
+)
+_AMOUNT_QUANTITY_LISTING = _RecordListing(
+    TaskRecord, TaskRecord.created_at,
+    lambda rec: {"value": rec.value, "created_at": rec.created_at},
+)
+_COMPLETION_LISTING = _RecordListing(
+    TaskCompletion, TaskCompletion.completed_at,
+    lambda rec: {"completed_at": rec.completed_at, "completion_value": rec.completion_value,
+                 "completion_data": rec.completion_data},
+    (TaskCompletion.is_completed == True,),
+)
 
-    # 权限与组过滤逻辑：
-    # - 超级管理员：可筛选任意用户；查看所有用户记录
-    # - 管理员：仅查看本组成员记录；筛选的 user_id 必须属于本组
-    # - 普通用户：可查看任务下所有记录，但仅可按自身 user_id 进行筛选
-    q = db.query(JielongRecord).filter(JielongRecord.task_id == task_id)
+
+def _list_task_records(
+    db: Session,
+    task: Task,
+    current_user: User,
+    listing: _RecordListing,
+    user_id: Optional[int],
+    limit: Optional[int],
+    cursor: Optional[str],
+    format: Optional[str],
+):
+    """
+    记录列表引擎：用户名在 SQL 中 JOIN 获取，按 (时间, id) 倒序。
+    - 未传 limit / cursor：与原接口一致，返回全部记录
+    - 传入 limit：游标分页，返回 next_cursor；后续页传 cursor（序号延续上一页）
+    - format=ndjson：流式导出，每行一个 JSON 对象
+    权限与组过滤：
+    - 超级管理员：可筛选任意用户；查看所有用户记录
+    - 管理员：筛选的 user_id 必须属于本组；“全部”视图按任务分配类型限定范围
+      （group：仅本组成员；identity：仅同身份类型成员；all / user：不额外限制）
+    - 普通用户：可查看任务下所有记录，但仅可按自身 user_id 进行筛选
+    """
+    model = listing.model
+    q = (
+        db.query(model, User.username)
+        .outerjoin(User, model.user_id == User.id)
+        .filter(model.task_id == task.id, *listing.extra_filters)
+    )
 
     if user_id is not None:
         target_user = db.query(User).filter(User.id == user_id).first()
         if not target_user:
             raise HTTPException(status_code=404, detail="目标用户不存在")
-
-        if current_user.is_super_admin:
-            q = q.filter(JielongRecord.user_id == user_id)
-        elif current_user.is_admin:
-            if current_user.group_id is None or target_user.group_id != current_user.group_id:
-                raise HTTPException(status_code=403, detail="管理员仅可筛选本组成员")
-            q = q.filter(JielongRecord.user_id == user_id)
-        else:
-            if user_id != current_user.id:
+        if not getattr(current_user, "is_super_admin", False):
+            if getattr(current_user, "is_admin", False):
+                if current_user.group_id is None or target_user.group_id != current_user.group_id:
+                    raise HTTPException(status_code=403, detail="管理员仅可筛选本组成员")
+            elif user_id != current_user.id:
                 raise HTTPException(status_code=403, detail="无权限按该用户筛选")
-            q = q.filter(JielongRecord.user_id == user_id)
-
-    # 管理员“全部”视图：根据任务的分配类型决定可见范围
-    # - assignment_type == 'group'：仅本组成员
-    # - assignment_type == 'identity'：仅同身份类型成员
-    # - assignment_type == 'all'：可以查看所有人的记录
-    # - assignment_type == 'user'：通常只涉及单用户，不额外限制
-    if current_user.is_admin and not current_user.is_super_admin:
+        q = q.filter(model.user_id == user_id)
+
+    if getattr(current_user, "is_admin", False) and not getattr(current_user, "is_super_admin", False):
         assignment_type_val = getattr(task.assignment_type, 'value', task.assignment_type)
         if assignment_type_val == 'group':
             if current_user.group_id is None:
                 # 管理员无组：返回空（通过一个永不匹配的条件）
-                q = q.filter(JielongRecord.user_id == -1)
+                q = q.filter(model.user_id == -1)
             else:
-                q = q.join(User, JielongRecord.user_id == User.id).filter(User.group_id == current_user.group_id)
+                q = q.filter(User.group_id == current_user.group_id)
         elif assignment_type_val == 'identity':
-            # 依据身份类型限制（例如 SS/SA/SZ 等）
-            q = q.join(User, JielongRecord.user_id == User.id).filter(User.identity_type == current_user.identity_type)
-        elif assignment_type_val in ('all', 'user'):
-            # 不额外限制：管理员可查看所有人的记录（与超级管理员一致）
-            pass
-
-    records = q.order_by(desc(JielongRecord.created_at)).all()
-
-    # 组装前端期望字段
-    items = []
-    for idx, rec in enumerate(records, start=1):
-        # 获取用户名
-        user = db.query(User).filter(User.id == rec.user_id).first()
-        items.append({
-            "sequence": idx,
-            "user_username": user.username if user else None,
-            "id": rec.student_id,
-            "remark": rec.notes,
-            "intention": rec.intention,
-            "created_at": rec.created_at,
-        })
-
-    return {"items": items, "total": len(items)}
+            q = q.filter(User.identity_type == current_user.identity_type)
+
+    sequence_start = 0
+    total_q = q
+    if cursor:
+        record_id, sequence_start = decode_cursor(cursor, 2)
+        if not isinstance(record_id, int) or not isinstance(sequence_start, int):
+            raise HTTPException(status_code=400, detail="无效的分页游标")
+        # 比较值取自游标对应记录在库中的时间，避免时间字符串格式差异
+        anchor = select(listing.time_column).where(model.id == record_id).scalar_subquery()
+        q = q.filter(or_(listing.time_column < anchor, and_(listing.time_column == anchor, model.id < record_id)))
+    q = q.order_by(desc(listing.time_column), desc(model.id))
+
+    def to_item(sequence: int, rec, username: Optional[str]) -> dict:
+        return {"sequence": sequence, "user_username": username, **listing.serialize(rec)}
+
+    if (format or "").lower() == "ndjson":
+        if limit is not None:
+            q = q.limit(limit)
+
+        def stream():
+            for idx, (rec, username) in enumerate(q.yield_per(1000), start=sequence_start + 1):
+                yield json.dumps(jsonable_encoder(to_item(idx, rec, username)), ensure_ascii=False) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    if limit is None and cursor is None:
+        rows = q.all()
+        items = [to_item(idx, rec, username) for idx, (rec, username) in enumerate(rows, start=1)]
+        return {"items": items, "total": len(items)}
+
+    page_size = limit or 100
+    rows = q.limit(page_size + 1).all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    items = [to_item(idx, rec, username) for idx, (rec, username) in enumerate(rows, start=sequence_start + 1)]
+    next_cursor = encode_cursor(rows[-1][0].id, sequence_start + len(rows)) if has_more else None
+    # 总数仅在首页统计
+    total = total_q.order_by(None).count() if cursor is None else None
+    return {"items": items, "total": total, "next_cursor": next_cursor}
+
+
+def _record_list_params(
+    user_id: Optional[int] = Query(default=None, description="按用户ID筛选记录"),
+    limit: Optional[int] = Query(default=None, ge=1, le=1000, description="每页条数；不传则返回全部"),
+    cursor: Optional[str] = Query(default=None, description="上一页返回的 next_cursor"),
+    format: Optional[str] = Query(default=None, description="ndjson：流式导出"),
+) -> dict:
+    return {"user_id": user_id, "limit": limit, "cursor": cursor, "format": format}
+
+
+# 新 API 3: 获取接龙任务参与记录列表
+@router.get(
+    "/{task_id}/jielong",
+    summary="获取接龙参与记录列表"
+)
+def list_jielong_records(
+    task_id: int,
+    params: dict = Depends(_record_list_params),
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """返回指定任务的接龙记录列表，包含用户名称与序号。"""
+    task = db.query(Task).filter(Task.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if not (getattr(current_user, "is_admin", False) or task.is_assigned_to_user(current_user)):
+        raise HTTPException(status_code=403, detail="无权限查看该任务")
+
+    return _list_task_records(db, task, current_user, _JIELONG_LISTING, **params)
 
 
 # 新 API 4: 获取金额/数量任务参与记录列表
@@ -158,7 +456,7 @@ def list_jielong_records(
 )
 def list_amount_quantity_records(
     task_id: int,
-    user_id: Optional[int] = Query(default=None, description="按用户ID筛选记录"),
+    params: dict = Depends(_record_list_params),
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user)
 ):
@@ -168,7 +466,6 @@ def list_amount_quantity_records(
         raise HTTPException(status_code=404, detail="任务不存在")
 
     # 仅支持 amount/quantity 类型
-    assignment_type_val = getattr(task.assignment_type, 'value', task.assignment_type)
     task_type_val = getattr(task.task_type, 'value', task.task_type)
     if task_type_val not in ('amount', 'quantity', 'normal'):
         raise HTTPException(status_code=400, detail="该任务类型不支持记录列表")
@@ -177,50 +474,7 @@ def list_amount_quantity_records(
     if not (getattr(current_user, "is_admin", False) or getattr(current_user, "is_super_admin", False) or task.is_assigned_to_user(current_user)):
         raise HTTPException(status_code=403, detail="无权限查看该任务")
 
-    q = db.query(TaskRecord).filter(TaskRecord.task_id == task_id)
-
-    # 用户筛选逻辑
-    if user_id is not None:
-        target_user = db.query(User).filter(User.id == user_id).first()
-        if not target_user:
-            raise HTTPException(status_code=404, detail="目标用户不存在")
-
-        if getattr(current_user, "is_super_admin", False):
-            q = q.filter(TaskRecord.user_id == user_id)
-        elif getattr(current_user, "is_admin", False):
-            if current_user.group_id is None or target_user.group_id != current_user.group_id:
-                raise HTTPException(status_code=403, detail="管理员仅可筛选本组成员")
-            q = q.filter(TaskRecord.user_id == user_id)
-        else:
-            if user_id != current_user.id:
-                raise HTTPException(status_code=403, detail="无权限按该用户筛选")
-            q = q.filter(TaskRecord.user_id == user_id)
-
-    # 管理员“全部”视图的范围限制，依据任务分配类型
-    if getattr(current_user, "is_admin", False) and not getattr(current_user, "is_super_admin", False):
-        if assignment_type_val == 'group':
-            if current_user.group_id is None:
-                q = q.filter(TaskRecord.user_id == -1)
-            else:
-                q = q.join(User, TaskRecord.user_id == User.id).filter(User.group_id == current_user.group_id)
-        elif assignment_type_val == 'identity':
-            q = q.join(User, TaskRecord.user_id == User.id).filter(User.identity_type == current_user.identity_type)
-        elif assignment_type_val in ('all', 'user'):
-            pass
-
-    records = q.order_by(desc(TaskRecord.created_at)).all()
-
-    items = []
-    for idx, rec in enumerate(records, start=1):
-        user = db.query(User).filter(User.id == rec.user_id).first()
-        items.append({
-            "sequence": idx,
-            "user_username": user.username if user else None,
-            "value": rec.value,
-            "created_at": rec.created_at,
-        })
-
-    return {"items": items, "total": len(items)}
+    return _list_task_records(db, task, current_user, _AMOUNT_QUANTITY_LISTING, **params)
 
 
 # 新 API 5: 获取勾选任务完成记录列表
@@ -230,7 +484,7 @@ def list_amount_quantity_records(
 )
 def list_checkbox_completions(
     task_id: int,
-    user_id: Optional[int] = Query(default=None, description="按用户ID筛选完成记录"),
+    params: dict = Depends(_record_list_params),
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user)
 ):
@@ -247,49 +501,4 @@ def list_checkbox_completions(
     if not (getattr(current_user, "is_admin", False) or getattr(current_user, "is_super_admin", False) or task.is_assigned_to_user(current_user)):
         raise HTTPException(status_code=403, detail="无权限查看该任务")
 
-    q = db.query(TaskCompletion).filter(TaskCompletion.task_id == task_id, TaskCompletion.is_completed == True)
-
-    # 用户筛选逻辑
-    if user_id is not None:
-        target_user = db.query(User).filter(User.id == user_id).first()
-        if not target_user:
-            raise HTTPException(status_code=404, detail="目标用户不存在")
-
-        if getattr(current_user, "is_super_admin", False):
-            q = q.filter(TaskCompletion.user_id == user_id)
-        elif getattr(current_user, "is_admin", False):
-            if current_user.group_id is None or target_user.group_id != current_user.group_id:
-                raise HTTPException(status_code=403, detail="管理员仅可筛选本组成员")
-            q = q.filter(TaskCompletion.user_id == user_id)
-        else:
-            if user_id != current_user.id:
-                raise HTTPException(status_code=403, detail="无权限按该用户筛选")
-            q = q.filter(TaskCompletion.user_id == user_id)
-
-    # 管理员“全部”视图的范围限制，依据任务分配类型
-    assignment_type_val = getattr(task.assignment_type, 'value', task.assignment_type)
-    if getattr(current_user, "is_admin", False) and not getattr(current_user, "is_super_admin", False):
-        if assignment_type_val == 'group':
-            if current_user.group_id is None:
-                q = q.filter(TaskCompletion.user_id == -1)
-            else:
-                q = q.join(User, TaskCompletion.user_id == User.id).filter(User.group_id == current_user.group_id)
-        elif assignment_type_val == 'identity':
-            q = q.join(User, TaskCompletion.user_id == User.id).filter(User.identity_type == current_user.identity_type)
-        elif assignment_type_val in ('all', 'user'):
-            pass
-
-    records = q.order_by(desc(TaskCompletion.completed_at)).all()
-
-    items = []
-    for idx, rec in enumerate(records, start=1):
-        user = db.query(User).filter(User.id == rec.user_id).first()
-        items.append({
-            "sequence": idx,
-            "user_username": user.username if user else None,
-            "completed_at": rec.completed_at,
-            "completion_value": rec.completion_value,
-            "completion_data": rec.completion_data,
-        })
-
-    return {"items": items, "total": len(items)}
\ No newline at end of file
+    return _list_task_records(db, task, current_user, _COMPLETION_LISTING, **params)
@@ -4,9 +4,7 @@ from sqlalchemy.orm import Session
 from .db import get_db
 from .models import User
 from .crud.user_crud import get_user_by_username
-
-# 简单的会话存储（生产环境应该使用 Redis）
-user_sessions = {}
+from .core.user_cache import get_user_by_id_cached
 
 def get_current_active_user(request: Request, db: Session = Depends(get_db)) -> User:
     # 从会话中获取用户数据
@@ -16,7 +14,7 @@ def get_current_active_user(request: Request, db: Session = Depends(get_db)) ->
         # 如果会话不存在，尝试通过“记住我”Cookie自动恢复登录
         remember_id = request.cookies.get("remember_me_user_id")
         if remember_id:
-            user = db.query(User).filter(User.id == int(remember_id)).first()
+            user = get_user_by_id_cached(db, remember_id)
             if user and user.is_active:
                 # 恢复会话（同时兼容 main.py 的 get_current_user 依赖）
                 request.session['user'] = {
@@ -31,8 +29,8 @@ def get_current_active_user(request: Request, db: Session = Depends(get_db)) ->
                 user_data = request.session.get('user')
         if not user_data:
             raise HTTPException(status_code=401, detail="未认证")
-    # 从数据库中获取最新的用户信息（好习惯，以防用户信息被后台更改）
-    user = db.query(User).filter(User.id == user_data.get('id')).first()
+    # 获取最新的用户信息（身份缓存带短 TTL，用户资料变更时会主动失效）
+    user = get_user_by_id_cached(db, user_data.get('id'))
     if not user:
         # 如果 session 中的用户在数据库中已不存在
         request.session.clear() # 清理无效 session
@@ -0,0 +1,147 @@
+"""
+结构化访问日志：每个请求一行 JSON（路由模板、状态码、耗时、用户 ID）。
+
+日志记录经由 QueueHandler 放入内存队列，由后台 QueueListener 线程完成 JSON 序列化与写出，
+请求路径上只有一次入队操作。
+
+环境变量：
+- ACCESS_LOG_ENABLED (true)：是否输出访问日志
+- ACCESS_LOG_SAMPLE_2XX (1.0)：2xx/3xx 响应的采样率（0~1），4xx/5xx 与慢请求始终记录
+- ACCESS_LOG_SLOW_MS (1000)：超过该耗时的请求视为慢请求
+- ACCESS_LOG_FILE：写入文件；未设置时输出到 stdout
+- DEBUG_AUTH_LOG (false)：是否输出认证依赖中的调试信息
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    val = os.getenv(name)
+    if val is None:
+        return default
+    return val.strip().lower() in ("1", "true", "yes", "on")
+
+
+ACCESS_LOG_ENABLED = _env_bool("ACCESS_LOG_ENABLED", True)
+ACCESS_LOG_SAMPLE_2XX = float(os.getenv("ACCESS_LOG_SAMPLE_2XX", "1.0"))
+ACCESS_LOG_SLOW_MS = float(os.getenv("ACCESS_LOG_SLOW_MS", "1000"))
+ACCESS_LOG_FILE = os.getenv("ACCESS_LOG_FILE")
+DEBUG_AUTH_LOG = _env_bool("DEBUG_AUTH_LOG", False)
+
+access_logger = logging.getLogger("opsight.access")
+
+
+class _JsonLineFormatter(logging.Formatter):
+    """在监听线程中把访问记录（dict）序列化为一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = record.msg if isinstance(record.msg, dict) else {"message": record.getMessage()}
+        payload.setdefault("ts", datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat())
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """不在调用线程中格式化记录，格式化交给监听线程"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+
+def setup_access_logger() -> logging.Logger:
+    """初始化访问日志（幂等）"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return access_logger
+
+    target = logging.FileHandler(ACCESS_LOG_FILE, encoding="utf-8") if ACCESS_LOG_FILE else logging.StreamHandler(sys.stdout)
+    target.setFormatter(_JsonLineFormatter())
+
+    log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+    _queue_handler = _DeferredQueueHandler(log_queue)
+    access_logger.addHandler(_queue_handler)
+    access_logger.setLevel(logging.INFO)
+    access_logger.propagate = False
+
+    _listener = QueueListener(log_queue, target, respect_handler_level=False)
+    _listener.start()
+    atexit.register(stop_access_logger)
+    return access_logger
+
+
+def stop_access_logger() -> None:
+    """停止监听线程并写出队列中剩余的记录"""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        access_logger.removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def should_log(status_code: int, duration_ms: float, sample_rate: float = ACCESS_LOG_SAMPLE_2XX) -> bool:
+    if status_code >= 400 or duration_ms >= ACCESS_LOG_SLOW_MS:
+        return True
+    if sample_rate >= 1.0:
+        return True
+    return random.random() < sample_rate
+
+
+def _route_template(scope: Scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path:
+        return scope.get("root_path", "") + path
+    return scope.get("path", "")
+
+
+class AccessLogMiddleware:
+    """纯 ASGI 访问日志中间件（替代 @app.middleware("http") 的 log_requests）"""
+
+    def __init__(self, app: ASGIApp, sample_rate: float = ACCESS_LOG_SAMPLE_2XX):
+        self.app = app
+        self.sample_rate = sample_rate
+        setup_access_logger()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if should_log(status_code, duration_ms, self.sample_rate):
+                session = scope.get("session") or {}
+                access_logger.info({
+                    "method": scope["method"],
+                    "route": _route_template(scope),
+                    "status": status_code,
+                    "duration_ms": round(duration_ms, 2),
+                    "user_id": session.get("user_id"),
+                })
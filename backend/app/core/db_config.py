@@ -0,0 +1,211 @@
+"""
+数据库引擎配置：连接池参数、SQLite 性能 PRAGMA 以及连接池指标。
+
+全部由环境变量驱动（未设置时使用括号内默认值）：
+- DB_POOL_SIZE (5) / DB_MAX_OVERFLOW (10) / DB_POOL_TIMEOUT (30 秒)
+- DB_POOL_RECYCLE (-1，不回收) / DB_POOL_PRE_PING (true)
+- SQLITE_JOURNAL_MODE (WAL) / SQLITE_SYNCHRONOUS (NORMAL)
+- SQLITE_CACHE_SIZE (-64000，负数表示 KiB) / SQLITE_MMAP_SIZE (268435456)
+- SQLITE_BUSY_TIMEOUT_MS (5000) / SQLITE_TEMP_STORE (MEMORY)
+
+PRAGMA 变量设为空字符串即可跳过对应设置。
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    val = os.getenv(name)
+    if val is None:
+        return default
+    return val.strip().lower() in ("1", "true", "yes", "on")
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def is_sqlite_memory(url: str) -> bool:
+    return is_sqlite(url) and (":memory:" in url or url.rstrip("/").endswith("sqlite:") or "mode=memory" in url)
+
+
+# ==================== 连接池指标 ====================
+
+class PoolMetrics:
+    """记录连接获取（checkout）的等待时间，用于按 worker 评估连接池大小"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += seconds
+            if seconds > self.wait_max:
+                self.wait_max = seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "checkout_wait_total_ms": round(self.wait_total * 1000, 3),
+                "checkout_wait_avg_ms": round(self.wait_total * 1000 / attempts, 3) if attempts else 0.0,
+                "checkout_wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+class _CheckoutTimingMixin:
+    """为 QueuePool 统计从池中取连接的等待时间（包含新建连接的耗时）"""
+
+    metrics: PoolMetrics
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        # engine.dispose() 会重建连接池，保留累计指标
+        new_pool = super().recreate()
+        new_pool.metrics = self.metrics
+        return new_pool
+
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# ==================== 引擎参数 ====================
+
+def build_engine_kwargs(url: str, is_async: bool = False) -> Dict[str, Any]:
+    """根据 URL 与环境变量生成 create_engine / create_async_engine 参数"""
+    kwargs: Dict[str, Any] = {"pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True)}
+
+    if is_sqlite(url) and not is_async:
+        kwargs["connect_args"] = {"check_same_thread": False}
+
+    # 内存 SQLite 使用 SQLAlchemy 默认的单连接池，不接受队列池参数
+    if is_sqlite_memory(url):
+        return kwargs
+
+    kwargs.update(
+        poolclass=InstrumentedAsyncAdaptedQueuePool if is_async else InstrumentedQueuePool,
+        pool_size=_env_int("DB_POOL_SIZE", 5),
+        max_overflow=_env_int("DB_MAX_OVERFLOW", 10),
+        pool_timeout=_env_int("DB_POOL_TIMEOUT", 30),
+        pool_recycle=_env_int("DB_POOL_RECYCLE", -1),
+    )
+    return kwargs
+
+
+def sqlite_pragmas(url: str) -> List[Tuple[str, str]]:
+    """返回需要在每个新连接上执行的 PRAGMA 列表"""
+    defaults = [
+        ("journal_mode", "SQLITE_JOURNAL_MODE", "WAL"),
+        ("synchronous", "SQLITE_SYNCHRONOUS", "NORMAL"),
+        ("cache_size", "SQLITE_CACHE_SIZE", "-64000"),
+        ("mmap_size", "SQLITE_MMAP_SIZE", "268435456"),
+        ("busy_timeout", "SQLITE_BUSY_TIMEOUT_MS", "5000"),
+        ("temp_store", "SQLITE_TEMP_STORE", "MEMORY"),
+    ]
+    memory = is_sqlite_memory(url)
+    pragmas = []
+    for pragma, env_name, default in defaults:
+        value = os.getenv(env_name, default).strip()
+        if not value:
+            continue
+        # 内存库不支持 WAL / mmap
+        if memory and pragma in ("journal_mode", "mmap_size"):
+            continue
+        pragmas.append((pragma, value))
+    return pragmas
+
+
+def install_sqlite_pragmas(engine, url: str) -> None:
+    """通过 connect 事件为 SQLite 连接设置 PRAGMA（异步引擎请传入 async_engine.sync_engine）"""
+    if not is_sqlite(url):
+        return
+    pragmas = sqlite_pragmas(url)
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in pragmas:
+                cursor.execute(f"PRAGMA {pragma}={value}")
+        finally:
+            cursor.close()
+
+
+def install_read_only_guard(engine, url: str) -> None:
+    """只读库连接：SQLite 开启 query_only，PostgreSQL 将会话默认事务设为只读"""
+    if is_sqlite(url):
+        statement = "PRAGMA query_only=ON"
+    elif url.startswith(("postgresql", "postgres")):
+        statement = "SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY"
+    else:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_read_only(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(statement)
+        finally:
+            cursor.close()
+        # psycopg2 / asyncpg 适配器下 SET 语句会开启事务，需要提交后才对后续事务生效
+        if not is_sqlite(url):
+            dbapi_connection.commit()
+
+
+def pool_status(engine) -> Dict[str, Any]:
+    """连接池当前状态与累计等待指标"""
+    pool = engine.pool
+    status: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            status[name] = fn()
+    if "checkedout" in status:
+        status["in_use"] = status["checkedout"]
+    metrics: Optional[PoolMetrics] = getattr(pool, "metrics", None)
+    if metrics is not None:
+        status.update(metrics.snapshot())
+    return status
@@ -0,0 +1,129 @@
+"""
+截止时间调度：周期性地以集合式 UPDATE 批量维护 Task.is_overdue。
+
+每轮两条语句（均走 ix_tasks_overdue_due_date 索引）：
+- 标记：未标记、已过截止时间、未完成且未取消的任务置为逾期
+- 清除：已标记但已完成 / 已取消 / 截止时间被推后或清空的任务取消逾期
+
+默认随应用进程启动（asyncio 周期任务，语句在线程池中执行）；多 worker 部署时可关闭
+DUE_SCHEDULER_ENABLED，改为单独运行：
+    python -m app.core.due_scheduler            # 常驻，按间隔执行
+    python -m app.core.due_scheduler --once     # 执行一轮后退出（适合 cron）
+多个进程同时执行也只是重复同样的幂等更新。
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session
+
+from ..db import SessionLocal
+from ..models import OVERDUE_EXEMPT_STATUSES, Task
+
+logger = logging.getLogger(__name__)
+
+DUE_SCHEDULER_ENABLED = os.getenv("DUE_SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+DUE_SCHEDULER_INTERVAL_SECONDS = float(os.getenv("DUE_SCHEDULER_INTERVAL_SECONDS", "60"))
+
+
+def _open_clause():
+    """未完成且未取消"""
+    return and_(
+        or_(Task.status.is_(None), Task.status.notin_(OVERDUE_EXEMPT_STATUSES)),
+        or_(Task.is_completed.is_(None), Task.is_completed == False),  # noqa: E712
+    )
+
+
+def overdue_updates(now: datetime):
+    """本轮的 (标记, 清除) 两条 UPDATE；只改 is_overdue，updated_at 保持不变（日报快照按 updated_at 判断“今日完成”）"""
+    mark = (
+        update(Task)
+        .where(Task.is_overdue == False, Task.due_date.isnot(None), Task.due_date < now, _open_clause())  # noqa: E712
+        .values(is_overdue=True, updated_at=Task.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    clear = (
+        update(Task)
+        .where(Task.is_overdue == True, or_(Task.due_date.is_(None), Task.due_date >= now, ~_open_clause()))  # noqa: E712
+        .values(is_overdue=False, updated_at=Task.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    return mark, clear
+
+
+def refresh_overdue(db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+    """执行一轮逾期标记 / 清除并提交，返回各自影响的行数"""
+    mark, clear = overdue_updates(now or datetime.utcnow())
+    result = {"marked": db.execute(mark).rowcount, "cleared": db.execute(clear).rowcount}
+    db.commit()
+    return result
+
+
+def run_once() -> Dict[str, int]:
+    t0 = time.perf_counter()
+    with SessionLocal() as db:
+        result = refresh_overdue(db)
+    if result["marked"] or result["cleared"]:
+        logger.info(f"Overdue refresh: marked={result['marked']} cleared={result['cleared']} "
+                    f"({(time.perf_counter() - t0) * 1000:.1f} ms)")
+    return result
+
+
+class DueDateScheduler:
+    """应用内的周期任务：start() 于启动事件中调用，stop() 于关闭事件中调用"""
+
+    def __init__(self, interval_seconds: float = DUE_SCHEDULER_INTERVAL_SECONDS):
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(run_once)
+            except Exception:
+                # 单轮失败（如数据库暂不可用）不终止调度，下一轮重试
+                logger.exception("Overdue refresh failed")
+            await asyncio.sleep(self.interval_seconds)
+
+
+due_date_scheduler = DueDateScheduler()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="批量维护任务逾期标记")
+    parser.add_argument("--once", action="store_true", help="执行一轮后退出")
+    parser.add_argument("--interval", type=float, default=DUE_SCHEDULER_INTERVAL_SECONDS, help="执行间隔（秒）")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    if args.once:
+        print(run_once())
+        return 0
+    while True:
+        try:
+            run_once()
+        except Exception:
+            logger.exception("Overdue refresh failed")
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,37 @@
+"""
+条件 GET（ETag / If-None-Match）工具。
+
+ETag 由调用方给出的各组成部分（行数据、记录水位、查看者与查询参数等）哈希得到；
+客户端携带匹配的 If-None-Match 时直接返回 304，跳过统计与序列化。
+"""
+import hashlib
+import json
+from typing import Any
+
+from fastapi import Request, Response
+from sqlalchemy import inspect as sa_inspect
+
+
+def make_etag(*parts: Any) -> str:
+    payload = json.dumps(parts, default=str, sort_keys=True, separators=(",", ":"))
+    return '"' + hashlib.sha1(payload.encode("utf-8")).hexdigest() + '"'
+
+
+def row_fingerprint(obj: Any) -> list:
+    """ORM 对象全部列的当前值（用于 ETag，任意字段变化都会改变结果）"""
+    return [getattr(obj, attr.key) for attr in sa_inspect(type(obj)).column_attrs]
+
+
+def if_none_match(request: Request, etag: str) -> bool:
+    """If-None-Match 是否命中（弱比较，支持多个值与 *）"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {value.strip().removeprefix("W/") for value in header.split(",")}
+    return etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
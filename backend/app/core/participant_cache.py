@@ -0,0 +1,111 @@
+"""
+任务参与者集合缓存：按 (分配类型, 目标组 / 身份, 查看者范围) 缓存活跃用户 ID 集合。
+
+任务详情（get_task）的汇总统计需要参与者集合；同一组 / 身份 / 全员任务被大量用户打开时，
+复用同一份集合，不再每次加载用户表。
+
+缓存以“成员关系纪元”（membership epoch）做版本：用户新建、删除，或 is_active / group_id /
+identity_type 变化（含组成员增删）提交后纪元加一，旧纪元的条目随即失效。
+纪元为进程内计数，其他进程的修改最多在 TTL 内可见延迟（与用户身份缓存一致）。
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Hashable, Iterable, Tuple
+
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session, object_session
+
+from ..models import User
+
+PARTICIPANT_CACHE_TTL_SECONDS = float(os.getenv("PARTICIPANT_CACHE_TTL_SECONDS", "30"))
+PARTICIPANT_CACHE_MAX_ENTRIES = int(os.getenv("PARTICIPANT_CACHE_MAX_ENTRIES", "1000"))
+
+# 影响参与者集合的用户字段
+_MEMBERSHIP_FIELDS = ("is_active", "group_id", "identity_type")
+_PENDING_FLAG = "membership_changed"
+
+
+class ParticipantSetCache:
+    """线程安全的 key -> 参与者 ID 元组缓存，按纪元与 TTL 失效"""
+
+    def __init__(self, ttl_seconds: float = PARTICIPANT_CACHE_TTL_SECONDS, max_entries: int = PARTICIPANT_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.epoch = 0
+        self._entries: Dict[Hashable, Tuple[int, float, Tuple[int, ...]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Iterable[int]]) -> Tuple[int, ...]:
+        """命中则返回缓存的集合，否则调用 loader 加载（去重、排序）并缓存"""
+        now = time.monotonic()
+        with self._lock:
+            epoch = self.epoch
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == epoch and entry[1] > now:
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        participants = tuple(sorted({int(uid) for uid in loader() if uid is not None}))
+        if self.ttl_seconds <= 0:
+            return participants
+        with self._lock:
+            # 加载期间纪元已变化时不写入，避免缓存旧数据
+            if self.epoch == epoch:
+                if key not in self._entries and len(self._entries) >= self.max_entries:
+                    oldest = min(self._entries, key=lambda k: self._entries[k][1])
+                    self._entries.pop(oldest, None)
+                self._entries[key] = (epoch, now + self.ttl_seconds, participants)
+        return participants
+
+    def bump_epoch(self) -> None:
+        with self._lock:
+            self.epoch += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            size = len(self._entries)
+        return {"size": size, "epoch": self.epoch, "hits": self.hits, "misses": self.misses}
+
+
+participant_cache = ParticipantSetCache()
+
+
+def bump_membership_epoch() -> None:
+    """成员关系批量变化（如绕过 ORM 的批量删除）后手动调用"""
+    participant_cache.bump_epoch()
+
+
+def _mark_pending(target: User) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info[_PENDING_FLAG] = True
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_delete")
+def _user_inserted_or_deleted(mapper, connection, target):
+    _mark_pending(target)
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target):
+    state = sa_inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in _MEMBERSHIP_FIELDS):
+        _mark_pending(target)
+
+
+# 提交后才推进纪元：提交前推进会让并发请求按新纪元缓存尚未提交的旧数据
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session):
+    if session.info.pop(_PENDING_FLAG, False):
+        participant_cache.bump_epoch()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop(_PENDING_FLAG, None)
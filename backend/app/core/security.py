@@ -1,8 +1,26 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
 from passlib.context import CryptContext
 
 # 切换为 pbkdf2_sha256 以避免 Windows + Python 3.13 下 bcrypt 初始化异常
 # pbkdf2_sha256 可靠、跨平台且不受 72 字节长度限制
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# PASSWORD_HASH_ROUNDS：迭代次数；已有哈希的迭代次数与之不同时，登录成功后会自动按新参数重新哈希
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+# PASSWORD_HASH_WORKERS：哈希线程池大小（hashlib 的 PBKDF2 计算会释放 GIL，可多核并行）
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__min_rounds=PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__max_rounds=PASSWORD_HASH_ROUNDS,
+)
+
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证明文密码和哈希密码是否匹配"""
@@ -10,4 +28,24 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     """生成密码的哈希值"""
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """验证密码；若哈希参数已过期（如迭代次数调整），同时返回按当前参数生成的新哈希"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+# ==================== 异步版本（用于 async def 路由） ====================
+# 在有界线程池中执行，避免 PBKDF2 计算阻塞事件循环
+
+async def _run_in_hash_pool(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, fn, *args)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_in_hash_pool(get_password_hash, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await _run_in_hash_pool(verify_and_update_password, plain_password, hashed_password)
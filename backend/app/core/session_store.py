@@ -0,0 +1,302 @@
+"""
+服务端会话存储：Cookie 中只保存不透明的会话 ID，会话数据保存在服务端。
+
+后端由环境变量 SESSION_BACKEND 选择：
+- memory（默认）：进程内 LRU + TTL，仅适用于单 worker；
+- sqlite：本地 SQLite 文件（SESSION_SQLITE_PATH，默认 ./sessions.db），同机多 worker 共享；
+- redis：需要安装 redis 包并配置 REDIS_URL，多机共享。
+
+其他配置：SESSION_TTL_SECONDS（默认 86400）、SESSION_MAX_ENTRIES（内存后端容量，默认 10000）、
+SESSION_COOKIE_NAME（默认 session）、SESSION_COOKIE_SECURE（默认 false）、
+SESSION_REFRESH_INTERVAL_SECONDS（只读请求续期的最小间隔，默认 60）。
+
+会话在最后一次访问后 TTL 秒过期（滑动窗口）：修改会话的请求重写会话，只读请求通过 touch 延长
+存储中的过期时间并重新下发 Cookie，同一会话每个刷新间隔内最多续期一次，避免每个请求都写存储。
+登录用户变化（user_id 改变）时会更换会话 ID，防止会话固定。
+"""
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from http.cookies import SimpleCookie
+from typing import Any, Dict, Optional
+
+import anyio
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "86400"))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+SESSION_REFRESH_INTERVAL_SECONDS = int(os.getenv("SESSION_REFRESH_INTERVAL_SECONDS", "60"))
+
+
+class SessionStore:
+    """会话存储接口"""
+
+    # 存储操作是否会阻塞（文件 / 网络 I/O），为 True 时中间件在线程池中调用
+    blocking = False
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def set(self, session_id: str, data: Dict[str, Any], ttl: int) -> None:
+        raise NotImplementedError
+
+    def touch(self, session_id: str, ttl: int, min_interval: int = 0) -> bool:
+        """将会话过期时间延长为 now + ttl；距上次续期不足 min_interval 秒时不写入。返回是否已续期"""
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """进程内 LRU + TTL 存储"""
+
+    def __init__(self, max_entries: int = SESSION_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at <= time.time():
+                self._entries.pop(session_id, None)
+                return None
+            self._entries.move_to_end(session_id)
+        return json.loads(payload)
+
+    def set(self, session_id: str, data: Dict[str, Any], ttl: int) -> None:
+        # 以 JSON 保存，与共享后端保持相同的序列化语义
+        payload = json.dumps(data)
+        with self._lock:
+            self._entries[session_id] = (time.time() + ttl, payload)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def touch(self, session_id: str, ttl: int, min_interval: int = 0) -> bool:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry[0] <= now:
+                return False
+            expires_at, payload = entry
+            if expires_at >= now + ttl - min_interval:
+                return False
+            self._entries[session_id] = (now + ttl, payload)
+            return True
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteSessionStore(SessionStore):
+    """SQLite 文件存储（同一台机器上的多个 worker 共享）"""
+
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_sessions_expires_at ON sessions (expires_at)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT data FROM sessions WHERE id = ? AND expires_at > ?", (session_id, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, session_id: str, data: Dict[str, Any], ttl: int) -> None:
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO sessions (id, data, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at",
+            (session_id, json.dumps(data), now + ttl),
+        )
+        self._writes += 1
+        if self._writes % 500 == 0:
+            # 定期清理过期会话
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+        conn.commit()
+
+    def touch(self, session_id: str, ttl: int, min_interval: int = 0) -> bool:
+        now = time.time()
+        conn = self._conn()
+        # 条件更新：未到刷新间隔时不命中任何行，不产生写入
+        cur = conn.execute(
+            "UPDATE sessions SET expires_at = ? WHERE id = ? AND expires_at > ? AND expires_at < ?",
+            (now + ttl, session_id, now, now + ttl - min_interval),
+        )
+        conn.commit()
+        return cur.rowcount > 0
+
+    def delete(self, session_id: str) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        conn.commit()
+
+
+class RedisSessionStore(SessionStore):
+    """Redis 存储（可选依赖 redis）"""
+
+    blocking = True
+
+    def __init__(self, url: str, prefix: str = "opsight:session:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("SESSION_BACKEND=redis 需要安装 redis 包") from e
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        payload = self._client.get(self.prefix + session_id)
+        return json.loads(payload) if payload else None
+
+    def set(self, session_id: str, data: Dict[str, Any], ttl: int) -> None:
+        self._client.set(self.prefix + session_id, json.dumps(data), ex=ttl)
+
+    def touch(self, session_id: str, ttl: int, min_interval: int = 0) -> bool:
+        key = self.prefix + session_id
+        remaining = self._client.ttl(key)
+        # 键不存在（-2）或无过期时间（-1）时不处理
+        if remaining < 0 or remaining >= ttl - min_interval:
+            return False
+        return bool(self._client.expire(key, ttl))
+
+    def delete(self, session_id: str) -> None:
+        self._client.delete(self.prefix + session_id)
+
+
+def create_session_store() -> SessionStore:
+    """根据环境变量创建会话存储"""
+    backend = os.getenv("SESSION_BACKEND", "memory").strip().lower()
+    if backend == "sqlite":
+        return SQLiteSessionStore(os.getenv("SESSION_SQLITE_PATH", "./sessions.db"))
+    if backend == "redis":
+        return RedisSessionStore(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    return MemorySessionStore()
+
+
+def new_session_id() -> str:
+    return secrets.token_urlsafe(32)
+
+
+# ==================== 中间件 ====================
+
+class ServerSideSessionMiddleware:
+    """替代 starlette SessionMiddleware：request.session 的用法不变，Cookie 只携带会话 ID"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: Optional[SessionStore] = None,
+        session_cookie: str = os.getenv("SESSION_COOKIE_NAME", "session"),
+        max_age: int = SESSION_TTL_SECONDS,
+        path: str = "/",
+        same_site: str = "lax",
+        https_only: bool = os.getenv("SESSION_COOKIE_SECURE", "false").lower() in ("1", "true", "yes"),
+        refresh_interval: int = SESSION_REFRESH_INTERVAL_SECONDS,
+    ):
+        self.app = app
+        self.store = store if store is not None else create_session_store()
+        self.session_cookie = session_cookie
+        self.max_age = max_age
+        self.refresh_interval = refresh_interval
+        self.path = path
+        self.security_flags = "httponly; samesite=" + same_site
+        if https_only:
+            self.security_flags += "; secure"
+
+    async def _call_store(self, fn, *args):
+        if self.store.blocking:
+            return await anyio.to_thread.run_sync(fn, *args)
+        return fn(*args)
+
+    def _read_session_id(self, scope: Scope) -> Optional[str]:
+        for name, value in scope.get("headers", []):
+            if name == b"cookie":
+                cookie = SimpleCookie()
+                try:
+                    cookie.load(value.decode("latin-1"))
+                except Exception:
+                    return None
+                morsel = cookie.get(self.session_cookie)
+                # 旧版签名 Cookie 或伪造值长度不符，直接视为无会话
+                if morsel is not None and 0 < len(morsel.value) <= 64:
+                    return morsel.value
+        return None
+
+    def _cookie_header(self, value: str, max_age: int) -> str:
+        return f"{self.session_cookie}={value}; path={self.path}; Max-Age={max_age}; {self.security_flags}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        session_id = self._read_session_id(scope)
+        initial: Dict[str, Any] = {}
+        if session_id:
+            loaded = await self._call_store(self.store.get, session_id)
+            if loaded is None:
+                session_id = None
+            else:
+                initial = loaded
+        scope["session"] = json.loads(json.dumps(initial)) if initial else {}
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                session = scope["session"]
+                cookie = None
+                if session and session != initial:
+                    sid = session_id
+                    if sid is None or session.get("user_id") != initial.get("user_id"):
+                        # 新会话或登录用户变化时更换会话 ID
+                        if sid is not None:
+                            await self._call_store(self.store.delete, sid)
+                        sid = new_session_id()
+                    await self._call_store(self.store.set, sid, session, self.max_age)
+                    cookie = self._cookie_header(sid, self.max_age)
+                elif session and session_id is not None:
+                    # 会话未修改：滑动续期存储中的过期时间，并同步延长 Cookie 的 Max-Age
+                    if await self._call_store(self.store.touch, session_id, self.max_age, self.refresh_interval):
+                        cookie = self._cookie_header(session_id, self.max_age)
+                elif not session and session_id is not None:
+                    await self._call_store(self.store.delete, session_id)
+                    cookie = self._cookie_header("null", 0)
+                if cookie is not None:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Set-Cookie", cookie)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,92 @@
+"""
+任务进度的原子累加：任务计数器（tasks 表）与个人进度汇总（task_user_progress 表）。
+
+两者都在数据库内以单条语句完成“读 - 加 - 写”，并发提交不会丢失更新；均不提交，由调用方在同一事务中
+写入明细记录（TaskRecord / JielongRecord）后统一提交，明细的幂等键冲突回滚时计数一并回滚。
+语句直接作用于表（Core），不依赖 ORM 会话中的对象状态。
+"""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import case, func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..models import Task, TaskUserProgress, task_personal_target
+
+tasks = Task.__table__
+
+# 计数器更新后需要的任务字段（用于个人目标计算）
+_PROGRESS_RETURNING = (
+    tasks.c.id, tasks.c.task_type, tasks.c.target_amount, tasks.c.target_quantity,
+    tasks.c.jielong_target_count, tasks.c.jielong_config,
+)
+
+
+def increment_task_counter(db: Session, task_id: int, task_types, values: dict):
+    """UPDATE tasks SET x = x + :v ... RETURNING：在数据库内原子累加，返回任务字段；类型不符或不存在时返回 None"""
+    stmt = (
+        update(tasks)
+        .where(tasks.c.id == task_id, tasks.c.task_type.in_(task_types))
+        .values(updated_at=datetime.utcnow(), **values)
+        .returning(*_PROGRESS_RETURNING)
+    )
+    return db.execute(stmt).first()
+
+
+def _completed_expr(current, target):
+    """有正目标且当前值达到目标即视为完成"""
+    return case((target > 0, current >= target), else_=False)
+
+
+def apply_user_progress(
+    db: Session,
+    task,
+    user_id: int,
+    delta: float = 0.0,
+    is_completed: Optional[bool] = None,
+) -> None:
+    """在当前事务中更新 task_user_progress（不提交）。
+
+    - 金额 / 数量 / 接龙：current_value 累加 delta，按个人目标重新判断是否完成
+    - 勾选：传入 is_completed，current_value 置为 1/0
+    SQLite / PostgreSQL 使用单条 INSERT ... ON CONFLICT DO UPDATE，并发首次写入也不会冲突。
+    """
+    target = task_personal_target(task, user_id)
+    if is_completed is not None:
+        value, completed = (1.0 if is_completed else 0.0), bool(is_completed)
+    else:
+        value = float(delta)
+        completed = bool(target and target > 0 and value >= target)
+    row = {"task_id": task.id, "user_id": user_id, "current_value": value,
+           "target_value": target, "is_completed": completed}
+
+    table = TaskUserProgress.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite_insert if dialect == "sqlite" else pg_insert
+        stmt = insert(table).values(**row)
+        if is_completed is not None:
+            new_value = stmt.excluded.current_value
+            new_completed = stmt.excluded.is_completed
+        else:
+            new_value = table.c.current_value + stmt.excluded.current_value
+            new_completed = _completed_expr(new_value, stmt.excluded.target_value)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.task_id, table.c.user_id],
+            set_={"current_value": new_value, "target_value": stmt.excluded.target_value,
+                  "is_completed": new_completed, "updated_at": func.now()},
+        ))
+        return
+
+    progress = db.get(TaskUserProgress, (task.id, user_id))
+    if progress is None:
+        db.add(TaskUserProgress(**row))
+        return
+    if is_completed is None:
+        value = (progress.current_value or 0.0) + value
+        completed = bool(target and target > 0 and value >= target)
+    progress.current_value = value
+    progress.target_value = target
+    progress.is_completed = completed
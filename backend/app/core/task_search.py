@@ -0,0 +1,153 @@
+"""
+任务全文检索：索引 Task.title、Task.description 与 tags（JSON 数组）。
+
+- SQLite：FTS5 表 tasks_fts（trigram 分词，中文无需分词即可子串匹配），由 tasks 表上的触发器同步，
+  任何写入路径（ORM、批量 INSERT、批量 UPDATE / DELETE）都会更新索引；按 bm25 排序。
+- PostgreSQL：每个词以 ILIKE 子串匹配过滤，由 pg_trgm 的 GIN 三元组索引加速（install_task_search_trigram）；
+  生成列 tasks.search_vector（tsvector，标题 / 标签 / 描述分别加权）只用于 ts_rank 排序。
+  simple 配置不做中文分词，整段中文会成为一个词元，tsvector 无法匹配中文子串，因此不用它过滤。
+  pg_trgm 扩展不可用（无权限创建）时仍可检索，只是 ILIKE 退化为顺序扫描；
+  pg_trgm 只把字母数字字符计入三元组，数据库 locale 不把中文视为字母（如 C locale）时中文词同样退化为扫描。
+- 其他数据库：退化为 LIKE 扫描。
+
+两种 trigram 索引都至少需要 3 个字符才能使用；更短的词（如两字中文词）只在已被其他词缩小的结果上过滤，
+查询全为短词时扫描 tasks 表（命中密集时很快提前结束，稀疏时代价与任务总数成正比）。
+"""
+import json
+import logging
+import re
+from typing import List
+
+from sqlalchemy import String, cast, column, false, func, literal_column, or_, table, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Query
+
+from ..models import Task
+
+logger = logging.getLogger(__name__)
+
+# bm25 列权重，顺序与 tasks_fts 的列一致：title, description, tags
+FTS_WEIGHTS = (10.0, 1.0, 5.0)
+# PostgreSQL 使用不做词干处理的 simple 配置（中英文混排）
+PG_TS_CONFIG = "simple"
+
+_fts = table("tasks_fts", column("rowid"))
+
+
+def _tags_text(ref: str) -> str:
+    """tags JSON -> 以空格分隔的标签文本（json_each 会还原 \\uXXXX 转义的中文）"""
+    return f"(CASE WHEN json_valid({ref}) THEN (SELECT group_concat(value, ' ') FROM json_each({ref})) END)"
+
+
+_SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(title, description, tags, tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts (rowid, title, description, tags) "
+    f"VALUES (new.id, new.title, new.description, {_tags_text('new.tags')}); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description, tags ON tasks BEGIN "
+    "DELETE FROM tasks_fts WHERE rowid = old.id; "
+    "INSERT INTO tasks_fts (rowid, title, description, tags) "
+    f"VALUES (new.id, new.title, new.description, {_tags_text('new.tags')}); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "DELETE FROM tasks_fts WHERE rowid = old.id; END",
+]
+
+_PG_DDL = [
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    f"setweight(to_tsvector('{PG_TS_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{PG_TS_CONFIG}', coalesce(tags::text, '')), 'B') || "
+    f"setweight(to_tsvector('{PG_TS_CONFIG}', coalesce(description, '')), 'C')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_search_vector ON tasks USING GIN (search_vector)",
+]
+
+# 表达式须与 _like_filter 生成的列表达式一致，ILIKE 才能使用这些索引
+_PG_TRGM_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_title_trgm ON tasks USING GIN (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_description_trgm ON tasks USING GIN (description gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_tags_trgm ON tasks USING GIN ((CAST(tags AS VARCHAR)) gin_trgm_ops)",
+]
+
+
+def install_task_search(conn: Connection) -> None:
+    """创建检索索引与同步机制并回填现有任务（幂等）"""
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        for ddl in _SQLITE_DDL:
+            conn.execute(text(ddl))
+        conn.execute(text("DELETE FROM tasks_fts"))
+        conn.execute(text(
+            "INSERT INTO tasks_fts (rowid, title, description, tags) "
+            f"SELECT id, title, description, {_tags_text('tags')} FROM tasks"
+        ))
+    elif dialect == "postgresql":
+        for ddl in _PG_DDL:
+            conn.execute(text(ddl))
+
+
+def install_task_search_trigram(conn: Connection) -> bool:
+    """PostgreSQL：创建 pg_trgm 扩展与三元组索引（幂等）。扩展不可用时放弃并返回 False，检索仍可用"""
+    if conn.dialect.name != "postgresql":
+        return False
+    try:
+        # SAVEPOINT：创建失败只回滚本步骤，不中止外层迁移事务
+        with conn.begin_nested():
+            for ddl in _PG_TRGM_DDL:
+                conn.execute(text(ddl))
+    except DBAPIError:
+        logger.warning("pg_trgm unavailable; task search falls back to sequential ILIKE scans", exc_info=True)
+        return False
+    return True
+
+
+def _terms(q: str) -> List[str]:
+    return [t for t in re.split(r"\s+", q.strip()) if t]
+
+
+def _like_pattern(term: str) -> str:
+    return "%" + re.sub(r"([\\%_])", r"\\\1", term) + "%"
+
+
+def _like_filter(term: str, ilike: bool = False):
+    """在 tasks 表上逐行匹配；tags 以 JSON 文本存储（非 ASCII 字符为 \\uXXXX 转义），按转义后的形式匹配"""
+    like = _like_pattern(term)
+    tags_like = _like_pattern(json.dumps(term)[1:-1])
+    op = "ilike" if ilike else "like"
+    return or_(
+        getattr(Task.title, op)(like, escape="\\"),
+        getattr(Task.description, op)(like, escape="\\"),
+        getattr(cast(Task.tags, String), op)(tags_like, escape="\\"),
+    )
+
+
+def apply_task_search(query: Query, q: str) -> Query:
+    """按关键词过滤 Task 查询并按相关度排序（多个词之间为“与”）；调用方负责可见性过滤与 LIMIT"""
+    terms = _terms(q)
+    if not terms:
+        return query.filter(false())
+    dialect = query.session.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        # 过滤用 ILIKE（中文、短词、词中子串均可命中）；ts_rank 仅用于排序，整词命中的英文结果靠前
+        for term in terms:
+            query = query.filter(_like_filter(term, ilike=True))
+        tsquery = func.plainto_tsquery(PG_TS_CONFIG, " ".join(terms))
+        vector = literal_column("tasks.search_vector")
+        return query.order_by(func.ts_rank(vector, tsquery).desc(), Task.id.desc())
+
+    indexed = [t for t in terms if len(t) >= 3] if dialect == "sqlite" else []
+    for term in terms:
+        if term not in indexed:
+            query = query.filter(_like_filter(term))
+    if not indexed:
+        return query.order_by(Task.id.desc())
+
+    # 每个词作为短语（双引号转义），避免用户输入被解析为 FTS5 查询语法
+    match = " ".join('"' + t.replace('"', '""') + '"' for t in indexed)
+    rank = literal_column("bm25(tasks_fts, {}, {}, {})".format(*FTS_WEIGHTS))
+    return (
+        query.join(_fts, _fts.c.rowid == Task.id)
+        .filter(literal_column("tasks_fts").op("MATCH")(match))
+        .order_by(rank, Task.id.desc())
+    )
@@ -0,0 +1,143 @@
+"""
+用户身份缓存：按会话中的 user_id 缓存用户行快照（短 TTL）。
+
+认证依赖（main.get_current_user / auth.get_current_active_user）命中缓存时
+直接把快照还原为已持久化状态的 User 对象并挂到当前请求的 Session 上，
+不再为“确认当前用户是谁”发起数据库查询。
+
+用户资料、组成员关系发生变化的接口需要调用 invalidate_user / invalidate_users，
+以保证权限相关字段（role、group_id、identity_type、is_active）及时生效；
+其他进程内的修改最多在 TTL 内可见延迟。
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+
+from ..models import User
+
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+
+class UserIdentityCache:
+    """线程安全的 user_id -> 用户列快照 TTL 缓存"""
+
+    def __init__(self, ttl_seconds: float = USER_CACHE_TTL_SECONDS, max_entries: int = USER_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, snapshot = entry
+            if expires_at <= now:
+                self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(snapshot)
+
+    def put(self, user_id: int, snapshot: Dict[str, Any]) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if user_id not in self._entries and len(self._entries) >= self.max_entries:
+                # 超出容量时淘汰最早过期的条目
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                self._entries.pop(oldest, None)
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, dict(snapshot))
+
+    def invalidate(self, *user_ids: int) -> None:
+        with self._lock:
+            for uid in user_ids:
+                self._entries.pop(uid, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "size": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+user_cache = UserIdentityCache()
+
+
+def _snapshot(user: User) -> Dict[str, Any]:
+    """提取 User 的全部列属性（不含关系），用于还原"""
+    return {attr.key: getattr(user, attr.key) for attr in sa_inspect(User).column_attrs}
+
+
+def get_user_by_id_cached(db: Session, user_id: Any) -> Optional[User]:
+    """按 ID 获取用户：优先当前 Session 的 identity map，其次进程内缓存，最后查询数据库。
+
+    命中缓存时返回的对象已处于 persistent 状态，可以像查询得到的对象一样
+    读取关系（如 user.group）、修改字段并提交。
+    """
+    try:
+        uid = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    # 同一请求内多个依赖共享同一个 Session 时直接复用
+    existing = db.identity_map.get(identity_key(User, uid))
+    if existing is not None:
+        return existing
+
+    snapshot = user_cache.get(uid)
+    if snapshot is None:
+        user = db.query(User).filter(User.id == uid).first()
+        if user is not None:
+            user_cache.put(uid, _snapshot(user))
+        return user
+
+    user = User(**snapshot)
+    # 标记为“已加载的游离对象”后加入 Session，不触发 SELECT
+    make_transient_to_detached(user)
+    db.add(user)
+    return user
+
+
+def invalidate_user(user_id: Any) -> None:
+    """用户资料变更后调用，清除对应缓存"""
+    try:
+        user_cache.invalidate(int(user_id))
+    except (TypeError, ValueError):
+        pass
+
+
+def invalidate_users(user_ids: Iterable[Any]) -> None:
+    """批量清除（例如组成员批量变更）"""
+    ids = []
+    for uid in user_ids:
+        try:
+            ids.append(int(uid))
+        except (TypeError, ValueError):
+            continue
+    if ids:
+        user_cache.invalidate(*ids)
+
+
+def clear_user_cache() -> None:
+    """清空全部缓存（例如数据清理后）"""
+    user_cache.clear()
@@ -1,54 +1,163 @@
+from collections import defaultdict
+from sqlalchemy import case, func, insert, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 
-from ..models import Task, TaskRecord, JielongRecord
+from ..core.task_progress import apply_user_progress, increment_task_counter, tasks
+from ..models import Task, TaskRecord, TaskType, JielongRecord, TaskUserProgress, task_personal_target
 from ..schemas import JielongParticipationCreate
 
 
-def log_task_progress(db: Session, task_id: int, user_id: int, value: float) -> Optional[Task]:
-    """记录任务进度（金额/数量），并返回更新后的任务。"""
-    # 检查任务是否存在
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
+def refresh_progress_targets(db: Session, task: Task) -> None:
+    """任务目标或接龙个人目标变化后，同步已有进度行的 target_value 与完成状态（不提交）"""
+    task_type = getattr(task.task_type, 'value', task.task_type)
+    query = db.query(TaskUserProgress).filter(TaskUserProgress.task_id == task.id)
+    if task_type == "checkbox":
+        return
+    if task_type in ("amount", "quantity"):
+        target = task_personal_target(task, None)
+        completed = (TaskUserProgress.current_value >= target) if target and target > 0 else False
+        query.update({TaskUserProgress.target_value: target, TaskUserProgress.is_completed: completed},
+                     synchronize_session=False)
+        return
+    for progress in query.all():
+        target = task_personal_target(task, progress.user_id)
+        progress.target_value = target
+        progress.is_completed = bool(target and target > 0 and (progress.current_value or 0) >= target)
+
+
+def _find_by_idempotency_key(db: Session, model, task_id: int, user_id: int, idempotency_key: Optional[str]):
+    if not idempotency_key:
         return None
+    return (
+        db.query(model)
+        .filter(model.task_id == task_id, model.user_id == user_id, model.idempotency_key == idempotency_key)
+        .first()
+    )
 
-    # 仅处理金额与数量类型（兼容 Enum 或字符串）
-    task_type = getattr(task.task_type, 'value', task.task_type)
-    if task_type not in ("amount", "quantity"):
+
+def log_task_progress(
+    db: Session,
+    task_id: int,
+    user_id: int,
+    value: float,
+    idempotency_key: Optional[str] = None,
+) -> Optional[Task]:
+    """记录任务进度（金额/数量），并返回更新后的任务。
+
+    进度在数据库内原子累加，并发提交不会丢失更新；同一用户重复提交相同 idempotency_key 时只计一次。
+    """
+    if _find_by_idempotency_key(db, TaskRecord, task_id, user_id, idempotency_key):
+        return db.get(Task, task_id)
+
+    # 对数量类型，按整数累加
+    try:
+        inc = int(value)
+    except (TypeError, ValueError):
+        inc = 0
+    amount = float(value)
+    task_type = tasks.c.task_type
+    row = increment_task_counter(db, task_id, [TaskType.AMOUNT, TaskType.QUANTITY], {
+        "current_amount": case((task_type == TaskType.AMOUNT, func.coalesce(tasks.c.current_amount, 0.0) + amount),
+                               else_=tasks.c.current_amount),
+        "current_quantity": case((task_type == TaskType.QUANTITY, func.coalesce(tasks.c.current_quantity, 0) + inc),
+                                 else_=tasks.c.current_quantity),
+    })
+    if row is None:
         return None
 
     # 创建进度记录（TaskRecord 只包含 value、task_id、user_id）
-    task_record = TaskRecord(
+    db.add(TaskRecord(
         task_id=task_id,
         user_id=user_id,
-        value=float(value),
+        value=amount,
+        idempotency_key=idempotency_key,
         created_at=datetime.utcnow()
-    )
-
-    db.add(task_record)
-
-    # 累加任务当前进度
-    if task_type == "amount":
-        task.current_amount = (task.current_amount or 0.0) + float(value)
-    elif task_type == "quantity":
-        # 对数量类型，按整数累加
-        try:
-            inc = int(value)
-        except (TypeError, ValueError):
-            inc = 0
-        task.current_quantity = (task.current_quantity or 0) + inc
-
-    # 更新时间戳
-    task.updated_at = datetime.utcnow()
+    ))
 
     try:
+        db.flush()
+        # 个人进度汇总（与记录同一事务）
+        is_amount = getattr(row.task_type, 'value', row.task_type) == "amount"
+        apply_user_progress(db, row, user_id, delta=amount if is_amount else inc)
         db.commit()
-        db.refresh(task)
-        return task
+    except IntegrityError:
+        # 并发的重复提交（相同 idempotency_key）已先行写入：整个事务回滚，不重复累加
+        db.rollback()
+        return db.get(Task, task_id) if idempotency_key else None
     except Exception:
         db.rollback()
         return None
+    return db.get(Task, task_id)
+
+
+def _is_amount_task(task: Task) -> bool:
+    return getattr(task.task_type, 'value', task.task_type) == "amount"
+
+
+def log_task_progress_batch(db: Session, task_map: Dict[int, Task], entries: List[dict]) -> Dict[int, str]:
+    """批量记录金额/数量进度（调用方已完成权限校验），返回 {index: "ok" | "duplicate"}。
+
+    task_map 为 {task_id: Task}；entries 每项包含 index、task_id、user_id、value、idempotency_key。
+    TaskRecord 以一次 executemany 写入，计数器按任务分组后各执行一次原子累加（只更新该任务类型对应的列），
+    个人进度按 (任务, 用户) 分组更新，全部在同一事务中提交。并发重复提交导致唯一索引冲突时回滚并重试一次（重试时该键被识别为重复）。
+    """
+    for attempt in range(2):
+        keys = {e["idempotency_key"] for e in entries if e.get("idempotency_key")}
+        seen = set()
+        if keys:
+            seen = set(
+                db.query(TaskRecord.task_id, TaskRecord.user_id, TaskRecord.idempotency_key)
+                .filter(TaskRecord.task_id.in_({e["task_id"] for e in entries}), TaskRecord.idempotency_key.in_(keys))
+                .all()
+            )
+
+        outcome: Dict[int, str] = {}
+        rows = []
+        task_deltas: Dict[int, float] = defaultdict(int)  # 数量任务保持整数累加
+        user_deltas: Dict[tuple, float] = defaultdict(float)
+        now = datetime.utcnow()
+        for e in entries:
+            key = e.get("idempotency_key")
+            if key and (e["task_id"], e["user_id"], key) in seen:
+                outcome[e["index"]] = "duplicate"
+                continue
+            if key:
+                seen.add((e["task_id"], e["user_id"], key))
+            value = float(e["value"])
+            try:
+                inc = int(e["value"])
+            except (TypeError, ValueError):
+                inc = 0
+            rows.append({"task_id": e["task_id"], "user_id": e["user_id"], "value": value,
+                         "idempotency_key": key, "created_at": now})
+            delta = value if _is_amount_task(task_map[e["task_id"]]) else inc
+            task_deltas[e["task_id"]] += delta
+            user_deltas[(e["task_id"], e["user_id"])] += delta
+            outcome[e["index"]] = "ok"
+
+        if not rows:
+            return outcome
+        try:
+            db.execute(insert(TaskRecord), rows)
+            for task_id, delta in task_deltas.items():
+                column = tasks.c.current_amount if _is_amount_task(task_map[task_id]) else tasks.c.current_quantity
+                db.execute(
+                    update(tasks)
+                    .where(tasks.c.id == task_id)
+                    .values({column: func.coalesce(column, 0) + delta, tasks.c.updated_at: now})
+                )
+            for (task_id, user_id), delta in user_deltas.items():
+                apply_user_progress(db, task_map[task_id], user_id, delta=delta)
+            db.commit()
+            return outcome
+        except IntegrityError:
+            db.rollback()
+            if attempt:
+                raise
+    return {}
 
 
 def add_jielong_participation(
@@ -56,12 +165,21 @@ def add_jielong_participation(
     task_id: int,
     user_id: int,
     data: JielongParticipationCreate,
+    idempotency_key: Optional[str] = None,
 ) -> Optional[JielongRecord]:
-    """添加接龙任务参与记录（使用 JielongRecord 模型字段）。"""
-    # 检查任务存在且为接龙类型
-    task = db.query(Task).filter(Task.id == task_id).first()
-    task_type = getattr(task.task_type, 'value', task.task_type) if task else None
-    if not task or task_type != "jielong":
+    """添加接龙任务参与记录（使用 JielongRecord 模型字段）。
+
+    接龙计数原子累加；重复提交相同 idempotency_key 时返回已有记录。
+    """
+    existing = _find_by_idempotency_key(db, JielongRecord, task_id, user_id, idempotency_key)
+    if existing:
+        return existing
+
+    # 检查任务存在且为接龙类型，同时增加接龙当前计数
+    row = increment_task_counter(db, task_id, [TaskType.JIELONG], {
+        "jielong_current_count": func.coalesce(tasks.c.jielong_current_count, 0) + 1,
+    })
+    if row is None:
         return None
 
     # 创建接龙记录
@@ -71,19 +189,50 @@ def add_jielong_participation(
         student_id=data.student_id,
         notes=data.notes,
         intention=data.intention,
+        idempotency_key=idempotency_key,
         created_at=datetime.utcnow(),
     )
-
     db.add(jielong_record)
 
-    # 增加接龙当前计数
-    task.jielong_current_count = (task.jielong_current_count or 0) + 1
-    task.updated_at = datetime.utcnow()
-
     try:
+        db.flush()
+        apply_user_progress(db, row, user_id, delta=1)
         db.commit()
-        db.refresh(jielong_record)
         return jielong_record
+    except IntegrityError:
+        db.rollback()
+        return _find_by_idempotency_key(db, JielongRecord, task_id, user_id, idempotency_key)
     except Exception:
         db.rollback()
-        return None
\ No newline at end of file
+        return None
+
+
+def import_jielong_chunk(db: Session, task: Task, user_id: int, rows: List[dict]) -> tuple:
+    """导入一批接龙记录并提交，返回 (新增数, 重复数)。
+
+    按 (task_id, student_id) 索引查出本批中已存在的学号并跳过（批内重复由调用方去除），
+    其余记录一次 executemany 写入，接龙计数与个人进度各累加一次。
+    """
+    student_ids = [r["student_id"] for r in rows]
+    existing = {
+        sid for (sid,) in db.query(JielongRecord.student_id)
+        .filter(JielongRecord.task_id == task.id, JielongRecord.student_id.in_(student_ids))
+        .all()
+    }
+    now = datetime.utcnow()
+    new_rows = [
+        {"task_id": task.id, "user_id": user_id, "student_id": r["student_id"], "notes": r.get("notes"),
+         "intention": r.get("intention"), "created_at": now}
+        for r in rows if r["student_id"] not in existing
+    ]
+    if new_rows:
+        db.execute(insert(JielongRecord), new_rows)
+        db.execute(
+            update(Task)
+            .where(Task.id == task.id)
+            .values(jielong_current_count=func.coalesce(Task.jielong_current_count, 0) + len(new_rows), updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        apply_user_progress(db, task, user_id, delta=len(new_rows))
+    db.commit()
+    return len(new_rows), len(rows) - len(new_rows)
@@ -1,25 +1,200 @@
-from sqlalchemy import create_engine
+import logging
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 import os
 
+from .core.db_config import build_engine_kwargs, install_read_only_guard, install_sqlite_pragmas
+
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./simple_app.db")
 
-# 创建数据库引擎
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, connect_args=connect_args)
+# 创建数据库引擎（连接池参数与 SQLite PRAGMA 由环境变量控制，见 core/db_config.py）
+engine = create_engine(DATABASE_URL, **build_engine_kwargs(DATABASE_URL))
+install_sqlite_pragmas(engine, DATABASE_URL)
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# ==================== 只读库（分析 / 报表） ====================
+# READ_REPLICA_URL 指向只读副本或快照库；未配置时只读依赖回退到主库。
+READ_REPLICA_URL = os.getenv("READ_REPLICA_URL") or None
+
+if READ_REPLICA_URL:
+    read_engine = create_engine(READ_REPLICA_URL, **build_engine_kwargs(READ_REPLICA_URL))
+    install_sqlite_pragmas(read_engine, READ_REPLICA_URL)
+    install_read_only_guard(read_engine, READ_REPLICA_URL)
+else:
+    read_engine = engine
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 # 创建基类
 Base = declarative_base()
 
-# 依赖注入函数
-def get_db():
-    """获取数据库会话"""
+# ==================== 请求级数据库会话 ====================
+# main.py 与 api/v1 路由统一使用本模块的 get_db：同一个可调用对象在一次请求内
+# 只会被 FastAPI 解析一次，所有依赖共享同一个 Session。
+# Session 在第一次执行 SQL 时才从连接池取连接，未访问数据库的请求（例如命中
+# 用户缓存的鉴权接口）不会占用连接。
+
+_HAS_WRITES = "has_unflushed_or_uncommitted_writes"
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _mark_writes(session, flush_context):
+    session.info[_HAS_WRITES] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _clear_writes(session, *args):
+    session.info.pop(_HAS_WRITES, None)
+
+
+def _has_pending_writes(db: Session) -> bool:
+    return bool(db.new or db.deleted or db.dirty or db.info.get(_HAS_WRITES))
+
+
+def get_request_db(request: Request) -> Optional[Session]:
+    """获取当前请求已打开的 Session（供非依赖注入的代码复用，未打开时返回 None）"""
+    return getattr(request.state, "db", None)
+
+
+def get_db(request: Request = None):
+    """获取请求级数据库会话
+
+    写操作须在接口内显式 commit：依赖的收尾在响应发出之后才执行，此时提交失败已无法通知客户端。
+    请求结束时统一收尾一次：出现异常则回滚；仍有未提交的变更则回滚并记录警告；最后关闭并归还连接。
+    """
+    if request is not None:
+        existing = get_request_db(request)
+        if existing is not None:
+            yield existing
+            return
+
     db = SessionLocal()
+    if request is not None:
+        request.state.db = db
+    try:
+        yield db
+        if _has_pending_writes(db):
+            path = request.url.path if request is not None else None
+            logger.warning(f"Rolling back uncommitted writes left by request {path}")
+            db.rollback()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if request is not None:
+            request.state.db = None
+        db.close()
+
+
+def get_read_db(request: Request = None):
+    """获取只读数据库会话（分析、统计类接口使用）
+
+    未配置 READ_REPLICA_URL 时复用请求级主库会话，不额外占用连接。
+    """
+    if read_engine is engine:
+        yield from get_db(request)
+        return
+
+    db = ReadSessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# ==================== 异步数据库（AsyncSession） ====================
+# 本地 SQLite 使用 aiosqlite，PostgreSQL 使用 asyncpg；
+# 可通过 ASYNC_DATABASE_URL 显式指定，否则由 DATABASE_URL 推导。
+
+def _to_async_url(url: str) -> str:
+    """将同步驱动 URL 转换为对应的异步驱动 URL"""
+    if url.startswith("sqlite+aiosqlite://") or "+asyncpg" in url:
+        return url
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _to_async_url(DATABASE_URL)
+
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def get_async_engine_if_created():
+    """返回已创建的异步引擎（未使用过异步接口时为 None）"""
+    return _async_engine
+
+
+def _create_async_engine(url: str, read_only: bool = False):
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    async_engine = create_async_engine(url, **build_engine_kwargs(url, is_async=True))
+    install_sqlite_pragmas(async_engine.sync_engine, url)
+    if read_only:
+        install_read_only_guard(async_engine.sync_engine, url)
+    return async_engine, async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def get_async_engine():
+    """延迟创建异步引擎：未安装异步驱动时仅在首次使用异步接口时报错"""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        _async_engine, _AsyncSessionLocal = _create_async_engine(ASYNC_DATABASE_URL)
+    return _async_engine
+
+
+async def get_async_db():
+    """获取异步数据库会话（用于 async def 路由，避免阻塞事件循环）"""
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
+
+
+ASYNC_READ_REPLICA_URL = os.getenv("ASYNC_READ_REPLICA_URL") or (
+    _to_async_url(READ_REPLICA_URL) if READ_REPLICA_URL else None
+)
+
+_async_read_engine = None
+_AsyncReadSessionLocal = None
+
+
+def get_async_read_engine_if_created():
+    return _async_read_engine
+
+
+async def get_async_read_db():
+    """获取异步只读会话；未配置只读库时回退到主库"""
+    global _async_read_engine, _AsyncReadSessionLocal
+    if not ASYNC_READ_REPLICA_URL:
+        async for db in get_async_db():
+            yield db
+        return
+    if _async_read_engine is None:
+        _async_read_engine, _AsyncReadSessionLocal = _create_async_engine(ASYNC_READ_REPLICA_URL, read_only=True)
+    async with _AsyncReadSessionLocal() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    """关闭异步连接池（应用关闭时调用；aiosqlite 的工作线程需显式关闭连接才会退出）"""
+    global _async_engine, _AsyncSessionLocal, _async_read_engine, _AsyncReadSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _AsyncSessionLocal = None
+    if _async_read_engine is not None:
+        await _async_read_engine.dispose()
+        _async_read_engine = None
+        _AsyncReadSessionLocal = None
@@ -4,15 +4,15 @@ KillerApp Backend Main Application
 FastAPI 主应用程序文件
 """
 
-from fastapi import FastAPI, HTTPException, Depends, status, Query, Request, Response, Body
+from fastapi import FastAPI, HTTPException, Depends, status, Query, Request, Response, Body, Header
 from app.crud import task_crud
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.responses import JSONResponse
-from starlette.middleware.sessions import SessionMiddleware
 from sqlalchemy.orm import Session
-from sqlalchemy import create_engine, func, and_, or_, text
+from sqlalchemy import create_engine, func, and_, or_, text, select, case, insert
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta, date
 from collections import defaultdict
@@ -25,11 +25,16 @@ import os
 from pathlib import Path
 
 # 导入数据库模型和配置
-from .db import SessionLocal, engine, Base, get_db
+from .db import (
+    SessionLocal, engine, read_engine, Base, get_db, get_read_db, get_async_db, get_async_read_db,
+    dispose_async_engine, get_async_engine_if_created, get_async_read_engine_if_created
+)
 from .models import (
     User, Task, DailyReport, UserGroup, AIAgent, AIFunction, AIFunctionType,
     AICallLog, AISettings, SystemSettings, TaskStatus, CallStatus, TaskAssignmentType, JielongRecord, TaskType,
-    TaskRecord, TaskCompletion, MonthlyGoal, NotificationRead
+    TaskRecord, TaskCompletion, MonthlyGoal, NotificationRead, TaskAudience,
+    TaskUserProgress, TaskTag, jielong_aggregate_progress, task_personal_target, task_principals, task_tag_values,
+    task_is_overdue
 )
 from .schemas import (
     UserResponse, UserCreateRequest, UserUpdateRequest,
@@ -43,192 +48,41 @@ from .schemas import (
     AIStatsResponse, AISettingsResponse, AISettingsUpdateRequest,
     SystemSettingsResponse, SystemSettingsUpdateRequest,
     PaginatedAICallLogResponse, LoginRequest, AuthResponse,
-    PaginatedUserResponse, PaginatedTaskResponse,
+    PaginatedUserResponse, PaginatedTaskResponse, TaskFanOutResponse, TaskSearchResponse, TaskTagFacetResponse,
     AddMembersRequest, RemoveMemberRequest,
     MonthlyGoalUpsertRequest, MonthlyGoalResponse,
     AISystemKnowledgeResponse, AIChatRequest, AIChatResponse,
     AIAnswerRequest, AIAnswerResponse,
     NotificationReadSyncRequest, NotificationReadMapResponse
 )
-from .api.deps import apply_visibility_filters
+from .api.deps import apply_visibility_filters, task_visibility_clause
 from .api.v1.endpoints.tasks import router as tasks_v1_router
-from .core.security import verify_password, get_password_hash
+from .core.security import get_password_hash, get_password_hash_async, verify_and_update_password_async
+from .core.user_cache import get_user_by_id_cached, invalidate_user, invalidate_users, clear_user_cache
+from .core.participant_cache import bump_membership_epoch, participant_cache
+from .core.db_config import pool_status
+from .core.pagination import decode_cursor, encode_cursor
+from .core.etag import if_none_match, make_etag, not_modified, row_fingerprint
+from .core.task_search import apply_task_search
+from .core.due_scheduler import DUE_SCHEDULER_ENABLED, due_date_scheduler
+from .core.session_store import ServerSideSessionMiddleware, create_session_store
+from .core.access_log import ACCESS_LOG_ENABLED, DEBUG_AUTH_LOG, AccessLogMiddleware, stop_access_logger
+from .migrations import AUTO_MIGRATE, ensure_default_ai_functions, needs_migration, run_migrations_if_needed
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
-
-# 运行时迁移：为 daily_reports 表添加新增销售相关列（SQLite 兼容）
-def _ensure_daily_report_sales_columns():
-    try:
-        from sqlalchemy import inspect
-        inspector = inspect(engine)
-        cols = [c['name'] for c in inspector.get_columns('daily_reports')]
-        
-        additions = [
-            ("new_sign_count", "INTEGER DEFAULT 0"),
-            ("new_sign_amount", "FLOAT DEFAULT 0.0"),
-            ("renewal_count", "INTEGER DEFAULT 0"),
-            ("upgrade_count", "INTEGER DEFAULT 0"),
-            ("referral_count", "INTEGER DEFAULT 0"),
-            ("referral_amount", "FLOAT DEFAULT 0.0"),
-            ("renewal_amount", "FLOAT DEFAULT 0.0"),
-            ("upgrade_amount", "FLOAT DEFAULT 0.0"),
-        ]
-        
-        with engine.connect() as conn:
-            for name, decl in additions:
-                if name not in cols:
-                    try:
-                        conn.execute(text(f"ALTER TABLE daily_reports ADD COLUMN {name} {decl};"))
-                        conn.commit()
-                        logger.info(f"Added column daily_reports.{name}")
-                    except Exception as e:
-                        logger.warning(f"Failed to add column {name}: {e}")
-    except Exception as e:
-        logger.warning(f"DailyReport column ensure failed: {e}")
-
-_ensure_daily_report_sales_columns()
-
-# 运行时迁移：为 monthly_goals 表添加新增目标金额列（SQLite 兼容）
-def _ensure_monthly_goal_target_columns():
-    try:
-        from sqlalchemy import inspect
-        inspector = inspect(engine)
-        cols = [c['name'] for c in inspector.get_columns('monthly_goals')]
-        
-        additions = [
-            ("new_sign_target_amount", "FLOAT DEFAULT 0.0"),
-            ("referral_target_amount", "FLOAT DEFAULT 0.0"),
-            ("renewal_total_target_amount", "FLOAT DEFAULT 0.0"),
-        ]
-        
-        with engine.connect() as conn:
-            for name, decl in additions:
-                if name not in cols:
-                    try:
-                        conn.execute(text(f"ALTER TABLE monthly_goals ADD COLUMN {name} {decl};"))
-                        conn.commit()
-                        logger.info(f"Added column monthly_goals.{name}")
-                    except Exception as e:
-                        logger.warning(f"Failed to add column {name}: {e}")
-    except Exception as e:
-        logger.warning(f"MonthlyGoal column ensure failed: {e}")
-
-_ensure_monthly_goal_target_columns()
-
-# 运行时迁移：确保 users 表存在 hashed_password 列
-def _ensure_users_password_column():
-    try:
-        from sqlalchemy import inspect
-        inspector = inspect(engine)
-        cols = [c['name'] for c in inspector.get_columns('users')]
-        
-        if "hashed_password" not in cols:
-            try:
-                with engine.connect() as conn:
-                    conn.execute(text("ALTER TABLE users ADD COLUMN hashed_password TEXT;"))
-                    conn.commit()
-                    logger.info("Added column users.hashed_password")
-            except Exception as e:
-                logger.warning(f"Failed to add users.hashed_password: {e}")
-    except Exception as e:
-        logger.warning(f"Users password column ensure failed: {e}")
-
-_ensure_users_password_column()
-
-# 运行时迁移：确保 users 表存在 avatar_url 列
-def _ensure_users_avatar_column():
-    try:
-        from sqlalchemy import inspect
-        inspector = inspect(engine)
-        cols = [c['name'] for c in inspector.get_columns('users')]
-        
-        if "avatar_url" not in cols:
-            try:
-                with engine.connect() as conn:
-                    conn.execute(text("ALTER TABLE users ADD COLUMN avatar_url TEXT;"))
-                    conn.commit()
-                    logger.info("Added column users.avatar_url")
-            except Exception as e:
-                logger.warning(f"Failed to add users.avatar_url: {e}")
-    except Exception as e:
-        logger.warning(f"Users avatar_url column ensure failed: {e}")
-
-_ensure_users_avatar_column()
-
-def _ensure_default_admin_user():
-    try:
-        db = SessionLocal()
-        admin = db.query(User).filter(User.username == "admin").first()
-        if not admin:
-            admin = User(
-                username="admin",
-                role="super_admin",
-                identity_type="sa",
-                is_active=True,
-                hashed_password=get_password_hash("admin123"))
-            db.add(admin)
-            db.commit()
-        elif not admin.hashed_password:
-            admin.hashed_password = get_password_hash("admin123")
-            db.commit()
-
-        demo = db.query(User).filter(User.username == "demo").first()
-        if not demo:
-            demo = User(
-                username="demo",
-                role="super_admin",
-                identity_type="sa",
-                is_active=True,
-                hashed_password=get_password_hash("demo123"))
-            db.add(demo)
-            db.commit()
-        db.close()
-    except Exception as e:
-        logger.warning(f"Default admin ensure failed: {e}")
-
-_ensure_default_admin_user()
-
-# 运行时初始化：确保默认功能点存在（若有默认智能体）
-def _ensure_default_ai_functions():
+# 数据库结构迁移：版本已是最新时只执行一次查询（见 app/migrations.py）
+# 多 worker 部署建议先执行 `python -m app.migrations upgrade`，并设置 AUTO_MIGRATE=false
+if AUTO_MIGRATE:
     try:
-        db = SessionLocal()
-        # 查找默认智能体
-        default_agent = db.query(AIAgent).filter(AIAgent.is_active == True, AIAgent.is_default == True).order_by(AIAgent.created_at.asc()).first()
-        if not default_agent:
-            # 若无默认智能体，则跳过
-            db.close()
-            return
-
-        existing = {f.name for f in db.query(AIFunction).all()}
-        need_create = []
-        if "个人数据洞察" not in existing:
-            need_create.append("个人数据洞察")
-        if "团队数据洞察" not in existing:
-            need_create.append("团队数据洞察")
-
-        for name in need_create:
-            func = AIFunction(
-                name=name,
-                description=("AI 输出组织：个人视角" if name == "个人数据洞察" else "AI 输出组织：团队视角"),
-                function_type=AIFunctionType.CUSTOM,
-                agent_id=default_agent.id,
-                is_active=True,
-                created_by=1  # 默认由系统创建；如无用户1，后续更新
-            )
-            db.add(func)
-        if need_create:
-            db.commit()
-        db.close()
+        run_migrations_if_needed()
     except Exception as e:
-        # 初始化失败不影响服务启动
-        logger.warning(f"初始化默认AI功能失败: {e}")
-
-_ensure_default_ai_functions()
+        # 与原先的运行时检查一致：迁移失败不阻止服务启动，下次启动会重试未完成的版本
+        logger.warning(f"数据库迁移失败: {e}")
+elif needs_migration():
+    logger.warning("数据库结构不是最新版本，请执行 python -m app.migrations upgrade")
 
 # 创建 FastAPI 应用
 app = FastAPI(
@@ -237,12 +91,8 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# 添加会话中间件
-app.add_middleware(
-    SessionMiddleware,
-    secret_key=os.getenv("SESSION_SECRET", "replace-this-in-prod"),
-    max_age=86400
-)
+# 添加会话中间件（服务端存储，Cookie 只携带会话 ID；后端见 core/session_store.py）
+app.add_middleware(ServerSideSessionMiddleware, store=create_session_store())
 
 origins_env = os.getenv("ALLOWED_ORIGINS")
 origins = [o.strip() for o in origins_env.split(",") if o.strip()] if origins_env else [
@@ -268,14 +118,9 @@ app.add_middleware(
 # 挂载子路由：任务相关（v1）
 app.include_router(tasks_v1_router, prefix="/api/v1/tasks")
 
-# 请求日志中间件
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    logger.info(f"{request.method} {request.url} - {response.status_code} - {process_time:.4f}s")
-    return response
+# 访问日志中间件：JSON 行、队列异步写出、2xx 可采样（见 core/access_log.py）
+if ACCESS_LOG_ENABLED:
+    app.add_middleware(AccessLogMiddleware)
 
 # 全局异常处理
 # 重要：HTTPException 需要透传原有状态码与信息，避免全部变成 500
@@ -313,19 +158,21 @@ def get_current_user(
             detail="Not authenticated"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # 命中身份缓存时不访问数据库
+    user = get_user_by_id_cached(db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户不存在"
         )
-    # --- 临时调试代码：打印会话解析到的用户对象 ---
-    try:
-        print(
-            f"[DEBUG-USER-OBJECT]: SessionUserID={user_id}, DB User Object: id={user.id}, username='{user.username}', role='{user.role}', group_id={getattr(user, 'group_id', None)}, identity_type='{getattr(user, 'identity_type', None)}'"
-        )
-    except Exception as e:
-        print(f"[DEBUG-USER-OBJECT-ERROR]: {e}")
+    # --- 临时调试代码：打印会话解析到的用户对象（仅 DEBUG_AUTH_LOG=true 时输出） ---
+    if DEBUG_AUTH_LOG:
+        try:
+            print(
+                f"[DEBUG-USER-OBJECT]: SessionUserID={user_id}, DB User Object: id={user.id}, username='{user.username}', role='{user.role}', group_id={getattr(user, 'group_id', None)}, identity_type='{getattr(user, 'identity_type', None)}'"
+            )
+        except Exception as e:
+            print(f"[DEBUG-USER-OBJECT-ERROR]: {e}")
     # --- 结束调试 ---
     return user
 
@@ -336,13 +183,14 @@ def get_current_active_user(current_user: User = Depends(get_current_user)) -> U
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="用户账户已被禁用"
         )
-    # --- 临时调试代码：打印活跃用户对象 ---
-    try:
-        print(
-            f"[DEBUG-USER-OBJECT]: Active User: id={current_user.id}, username='{current_user.username}', role='{current_user.role}', group_id={getattr(current_user, 'group_id', None)}, identity_type='{getattr(current_user, 'identity_type', None)}'"
-        )
-    except Exception as e:
-        print(f"[DEBUG-USER-OBJECT-ERROR]: {e}")
+    # --- 临时调试代码：打印活跃用户对象（仅 DEBUG_AUTH_LOG=true 时输出） ---
+    if DEBUG_AUTH_LOG:
+        try:
+            print(
+                f"[DEBUG-USER-OBJECT]: Active User: id={current_user.id}, username='{current_user.username}', role='{current_user.role}', group_id={getattr(current_user, 'group_id', None)}, identity_type='{getattr(current_user, 'identity_type', None)}'"
+            )
+        except Exception as e:
+            print(f"[DEBUG-USER-OBJECT-ERROR]: {e}")
     # --- 结束调试 ---
     return current_user
 
@@ -382,12 +230,20 @@ async def login(
             detail="账户已被禁用"
         )
     
-    # 密码验证
-    if not user.hashed_password or not verify_password(login_request.password, user.hashed_password):
+    # 密码验证（在哈希线程池中执行，不阻塞事件循环）
+    verified, new_hash = False, None
+    if user.hashed_password:
+        verified, new_hash = await verify_and_update_password_async(login_request.password, user.hashed_password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误"
         )
+    # 哈希参数已调整（PASSWORD_HASH_ROUNDS）时透明升级
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+        invalidate_user(user.id)
     
     # 设置会话
     request.session["user_id"] = user.id
@@ -403,13 +259,14 @@ async def login(
         "identity_type": getattr(user, "identity_type", None),
     }
     
-    # --- 临时调试代码（会话模拟JWT Payload） ---
-    try:
-        print(
-            f"[DEBUG-JWT-PAYLOAD]: {{'id': {user.id}, 'username': '{user.username}', 'role': '{user.role}', 'group_id': {getattr(user, 'group_id', None)}, 'identity_type': '{getattr(user, 'identity_type', None)}'}}"
-        )
-    except Exception as e:
-        print(f"[DEBUG-JWT-PAYLOAD-ERROR]: {e}")
+    # --- 临时调试代码（会话模拟JWT Payload）（仅 DEBUG_AUTH_LOG=true 时输出） ---
+    if DEBUG_AUTH_LOG:
+        try:
+            print(
+                f"[DEBUG-JWT-PAYLOAD]: {{'id': {user.id}, 'username': '{user.username}', 'role': '{user.role}', 'group_id': {getattr(user, 'group_id', None)}, 'identity_type': '{getattr(user, 'identity_type', None)}'}}"
+            )
+        except Exception as e:
+            print(f"[DEBUG-JWT-PAYLOAD-ERROR]: {e}")
     # --- 结束调试 ---
     
     # 记住我：设置 30 天的复活 Cookie（不含敏感信息，仅 user_id）
@@ -499,7 +356,7 @@ async def update_current_user_info(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="密码长度至少6位"
                 )
-            current_user.hashed_password = get_password_hash(pwd)
+            current_user.hashed_password = await get_password_hash_async(pwd)
 
     # Update other fields
     for field, value in update_data.items():
@@ -508,6 +365,7 @@ async def update_current_user_info(
     
     db.commit()
     db.refresh(current_user)
+    invalidate_user(current_user.id)
     
     # Sync avatar_url to Supabase user_account table if it was updated
     if "avatar_url" in user_request.dict(exclude_unset=True):
@@ -806,9 +664,11 @@ async def add_group_members(
         return {"message": "未提供用户ID"}
 
     users = db.query(User).filter(User.id.in_(req.user_ids)).all()
+    member_ids = [u.id for u in users]
     for u in users:
         u.group_id = group_id
     db.commit()
+    invalidate_users(member_ids)
 
     return {"message": "成员添加成功", "added_count": len(users)}
 
@@ -848,6 +708,7 @@ async def remove_group_member(
 
     user.group_id = None
     db.commit()
+    invalidate_user(user_id)
 
     return {"message": "成员移除成功"}
 
@@ -883,7 +744,7 @@ async def create_user(
         organization=user_request.organization,
         group_id=user_request.group_id,
         is_active=is_active_val if is_active_val is not None else True,
-        hashed_password=get_password_hash(user_request.password)
+        hashed_password=await get_password_hash_async(user_request.password)
     )
 
     db.add(new_user)
@@ -1041,13 +902,14 @@ async def update_user(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="密码长度至少6位"
                 )
-            user.hashed_password = get_password_hash(pwd)
+            user.hashed_password = await get_password_hash_async(pwd)
     # 其余字段直接更新
     for field, value in update_data.items():
         setattr(user, field, value)
     
     db.commit()
     db.refresh(user)
+    invalidate_user(user_id)
     
     return UserResponse(
         id=user.id,
@@ -1094,18 +956,14 @@ async def delete_user(
     
     db.delete(user)
     db.commit()
+    invalidate_user(user_id)
     
     return {"message": "用户删除成功"}
 
 # ==================== 任务管理 API ====================
 
-@app.post("/api/v1/tasks", response_model=TaskResponse)
-async def create_task(
-    task_request: TaskCreateRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """创建任务"""
+def _build_task(task_request: TaskCreateRequest, current_user: User) -> Task:
+    """按创建请求构造任务对象（不入库）"""
     # 基础字段
     task = Task(
         title=task_request.title,
@@ -1159,6 +1017,18 @@ async def create_task(
         task.jielong_config = task_request.jielong_config or {}
     elif task_request.task_type == TaskType.CHECKBOX:
         task.is_completed = False
+    task.is_overdue = task_is_overdue(task, datetime.utcnow())
+    return task
+
+
+@app.post("/api/v1/tasks", response_model=TaskResponse)
+async def create_task(
+    task_request: TaskCreateRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """创建任务"""
+    task = _build_task(task_request, current_user)
     db.add(task)
     db.commit()
     db.refresh(task)
@@ -1184,21 +1054,164 @@ async def create_task(
         due_date=task.due_date,
         status=getattr(task.status, 'value', str(task.status)),
         is_completed=task.is_completed,
+        is_overdue=task.is_overdue,
         created_by=task.created_by,
         created_at=task.created_at,
         updated_at=task.updated_at
     )
 
+TASK_FAN_OUT_MAX_ASSIGNEES = int(os.getenv("TASK_FAN_OUT_MAX_ASSIGNEES", "1000"))
+
+
+@app.post("/api/v1/tasks/fan-out", response_model=TaskFanOutResponse)
+async def create_tasks_fan_out(
+    task_request: TaskCreateRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """按分配对象拆分创建任务：USER 类型为 assigned_user_ids 中每个用户、GROUP 类型为 assigned_group_ids 中每个组各建一个任务。
+
+    （普通创建接口只取列表中的第一个对象。）全部任务在同一事务中以一次批量 INSERT ... RETURNING 写入，
+    受众索引同样批量写入；任一对象不存在时整体拒绝，不会部分创建。
+    """
+    if task_request.assignment_type == TaskAssignmentType.USER:
+        assignee_ids, model, field = task_request.assigned_user_ids, User, "assigned_to"
+    elif task_request.assignment_type == TaskAssignmentType.GROUP:
+        assignee_ids, model, field = task_request.assigned_group_ids, UserGroup, "target_group_id"
+    else:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="仅支持按用户或按组拆分创建任务")
+
+    # 去重并保持请求中的顺序
+    assignee_ids = list(dict.fromkeys(assignee_ids or []))
+    if not assignee_ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="请指定至少一个分配对象")
+    if len(assignee_ids) > TASK_FAN_OUT_MAX_ASSIGNEES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"单次最多拆分 {TASK_FAN_OUT_MAX_ASSIGNEES} 个分配对象"
+        )
+    existing = {row_id for (row_id,) in db.query(model.id).filter(model.id.in_(assignee_ids)).all()}
+    missing = [i for i in assignee_ids if i not in existing]
+    if missing:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"分配对象不存在: {missing}")
+
+    tasks = []
+    for assignee_id in assignee_ids:
+        task = _build_task(task_request, current_user)
+        setattr(task, field, assignee_id)
+        tasks.append(task)
+
+    # 未赋值的列交给默认值（各行字段集合一致，可合并为一条批量 INSERT）
+    columns = [attr.key for attr in Task.__mapper__.column_attrs]
+    rows = [
+        {key: getattr(task, key) for key in columns if getattr(task, key) is not None}
+        for task in tasks
+    ]
+    # RETURNING 附带分配对象列（各行唯一）按请求顺序还原 ID，
+    # 不使用 sort_by_parameter_order（无哨兵列时会退化为逐行 INSERT）
+    assignee_column = getattr(Task, field)
+    created = dict(db.execute(insert(Task).returning(assignee_column, Task.id), rows).all())
+    task_ids = [created[assignee_id] for assignee_id in assignee_ids]
+
+    # 批量 INSERT 不触发 ORM 事件，受众索引与标签索引在同一事务中写入
+    audience_rows = [
+        {"principal": principal, "task_id": task_id}
+        for task_id, task in zip(task_ids, tasks)
+        for principal in task_principals(task)
+    ]
+    if audience_rows:
+        db.execute(insert(TaskAudience), audience_rows)
+    tag_values = task_tag_values(task_request.tags)
+    tag_rows = [{"task_id": task_id, "tag": tag} for task_id in task_ids for tag in tag_values]
+    if tag_rows:
+        db.execute(insert(TaskTag), tag_rows)
+    db.commit()
+
+    return TaskFanOutResponse(count=len(task_ids), ids=list(task_ids))
+
+
+def _jielong_counts_by_task_user(db: Session, task_ids: List[int], user_ids: List[int]) -> Dict[tuple, int]:
+    """一次分组查询统计 (task_id, user_id) -> 接龙记录数"""
+    if not task_ids or not user_ids:
+        return {}
+    rows = (
+        db.query(JielongRecord.task_id, JielongRecord.user_id, func.count(JielongRecord.id))
+        .filter(JielongRecord.task_id.in_(task_ids), JielongRecord.user_id.in_(user_ids))
+        .group_by(JielongRecord.task_id, JielongRecord.user_id)
+        .all()
+    )
+    return {(task_id, user_id): count for task_id, user_id, count in rows}
+
+def _encode_task_cursor(task: Task) -> str:
+    return encode_cursor(task.id, task.created_at.isoformat() if task.created_at else None)
+
+def _decode_task_cursor(cursor: str) -> tuple:
+    task_id, created_at = decode_cursor(cursor, 2)
+    try:
+        return int(task_id), (datetime.fromisoformat(created_at) if created_at else None)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="无效的分页游标")
+
+def _apply_task_cursor(query, cursor: str):
+    """按 (created_at, id) 倒序取游标之后的数据（走 ix_tasks_created_at_id 索引）
+
+    比较值取自游标对应行在库中的 created_at，避免时间字符串格式差异；该行已删除时回退到游标中的时间。
+    """
+    task_id, created_at = _decode_task_cursor(cursor)
+    anchor = select(Task.created_at).where(Task.id == task_id).scalar_subquery()
+    if created_at is not None:
+        anchor = func.coalesce(anchor, created_at)
+    return query.filter(or_(
+        Task.created_at < anchor,
+        and_(Task.created_at == anchor, Task.id < task_id),
+        # created_at 为空的行排在最后（与列表排序的 NULLS LAST 一致）
+        and_(Task.created_at.is_(None), or_(anchor.is_not(None), Task.id < task_id)),
+    ))
+
+_RECORD_MODELS_BY_TASK_TYPE = {"amount": TaskRecord, "quantity": TaskRecord, "jielong": JielongRecord, "checkbox": TaskCompletion}
+
+def _task_records_watermark(db: Session, task: Task) -> Optional[int]:
+    """任务对应记录表的最大 ID（走 task_id 索引），记录新增后变化"""
+    model = _RECORD_MODELS_BY_TASK_TYPE.get(getattr(task.task_type, 'value', task.task_type))
+    if model is None:
+        return None
+    return db.query(func.max(model.id)).filter(model.task_id == task.id).scalar()
+
+def _viewer_fingerprint(user: User) -> list:
+    """影响可见范围与个人统计的查看者属性"""
+    return [user.id, user.role, user.group_id, user.identity_type]
+
+def _task_tags_clause(tags: List[str]):
+    """任务同时带有全部给定标签（按 task_tags 索引查找，不解析 tags JSON）"""
+    wanted = task_tag_values([t for value in tags for t in value.split(",")])
+    if not wanted:
+        return Task.id.is_(None)
+    matched = select(TaskTag.task_id).where(TaskTag.tag.in_(wanted)).group_by(TaskTag.task_id)
+    if len(wanted) > 1:
+        matched = matched.having(func.count() == len(wanted))
+    return Task.id.in_(matched)
+
+
 @app.get("/api/v1/tasks", response_model=PaginatedTaskResponse)
 async def get_tasks(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=100),
     status: Optional[str] = Query(None),
     assigned_to: Optional[int] = Query(None),
+    tags: Optional[List[str]] = Query(None, description="按标签筛选，可重复传参或逗号分隔；需同时包含全部标签"),
+    overdue: Optional[bool] = Query(None, description="按逾期标记筛选（由后台调度维护）"),
+    cursor: Optional[str] = Query(None, description="游标分页：首页传空字符串，之后传上一页返回的 next_cursor"),
+    include_total: Optional[bool] = Query(None, description="是否统计总数（游标模式默认不统计）"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """获取任务列表"""
+    """获取任务列表
+
+    默认按页码分页；传入 cursor 时使用 (created_at, id) 游标分页，深页与首页代价相同。
+    响应带 ETag（本页任务行 + 分页信息 + 查看者）；If-None-Match 命中时返回 304，跳过个人统计与序列化。
+    """
     query = db.query(Task)
     # 核心重构：调用统一的可见性过滤器
     query = apply_visibility_filters(query, current_user, Task)
@@ -1210,11 +1223,44 @@ async def get_tasks(
         # 仅在管理员视图下，按指定用户ID筛选才有意义
         if current_user.is_admin:
             query = query.filter(Task.assigned_to == assigned_to)
+    if tags:
+        query = query.filter(_task_tags_clause(tags))
+    if overdue is not None:
+        query = query.filter(Task.is_overdue == overdue)
 
     # 分页和执行查询
-    total = query.count() # 为前端分页返回总数
-    offset = (page - 1) * size
-    tasks = query.order_by(Task.created_at.desc()).offset(offset).limit(size).all()
+    cursor_mode = cursor is not None
+    if include_total is None:
+        include_total = not cursor_mode
+    total = query.count() if include_total else None  # 为前端分页返回总数
+    # NULLS LAST 与 _apply_task_cursor 的谓词一致（PostgreSQL 倒序默认 NULLS FIRST）
+    ordered = query.order_by(Task.created_at.desc().nulls_last(), Task.id.desc())
+    next_cursor = None
+    if cursor_mode:
+        if cursor:
+            ordered = _apply_task_cursor(ordered, cursor)
+        tasks = ordered.limit(size + 1).all()
+        if len(tasks) > size:
+            tasks = tasks[:size]
+            next_cursor = _encode_task_cursor(tasks[-1])
+    else:
+        offset = (page - 1) * size
+        tasks = ordered.offset(offset).limit(size).all()
+
+    etag = make_etag(
+        [row_fingerprint(t) for t in tasks], total, next_cursor, page, size,
+        _viewer_fingerprint(current_user),
+    )
+    if if_none_match(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
+    # 本页所有接龙任务的个人接龙数：一次分组查询，避免逐个任务 COUNT
+    jielong_task_ids = [t.id for t in tasks if getattr(t.task_type, 'value', t.task_type) == 'jielong']
+    try:
+        personal_counts = _jielong_counts_by_task_user(db, jielong_task_ids, [current_user.id])
+    except Exception:
+        personal_counts = None
   
     items = []
     for task in tasks:
@@ -1224,24 +1270,9 @@ async def get_tasks(
         personal_progress = None
 
         try:
-            task_type_val = getattr(task.task_type, 'value', task.task_type)
-            if task_type_val == 'jielong':
-                personal_current = (
-                    db.query(func.count(JielongRecord.id))
-                    .filter(JielongRecord.task_id == task.id, JielongRecord.user_id == current_user.id)
-                    .scalar()
-                ) or 0
-
-                cfg = task.jielong_config if isinstance(task.jielong_config, dict) else {}
-                personal_targets = cfg.get('personal_targets') if isinstance(cfg, dict) else None
-                if isinstance(personal_targets, dict):
-                    personal_target = (
-                        personal_targets.get(str(current_user.id))
-                        or personal_targets.get(current_user.id)
-                        or task.jielong_target_count
-                    )
-                else:
-                    personal_target = task.jielong_target_count
+            if task.id in jielong_task_ids and personal_counts is not None:
+                personal_current = personal_counts.get((task.id, current_user.id), 0)
+                personal_target = task_personal_target(task, current_user.id)
 
                 if personal_target and personal_target > 0:
                     personal_progress = round(float(personal_current) / float(personal_target), 4)
@@ -1273,6 +1304,7 @@ async def get_tasks(
             due_date=task.due_date,
             status=task.status,
             is_completed=getattr(task, 'is_completed', None),
+            is_overdue=task.is_overdue,
             created_by=task.created_by,
             created_at=task.created_at,
             updated_at=task.updated_at,
@@ -1285,18 +1317,58 @@ async def get_tasks(
         "items": items,
         "total": total,
         "page": page,
-        "size": size
+        "size": size,
+        "next_cursor": next_cursor
     }
 
+@app.get("/api/v1/tasks/search", response_model=TaskSearchResponse)
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=100, description="关键词，多个词以空格分隔（同时匹配）"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """按标题、描述与标签全文检索任务，按相关度排序，仅返回当前用户可见的任务"""
+    query = apply_visibility_filters(db.query(Task), current_user, Task)
+    tasks = apply_task_search(query, q).limit(limit).all()
+    items = [TaskResponse.model_validate(task, from_attributes=True) for task in tasks]
+    return {"items": items, "count": len(items)}
+
+@app.get("/api/v1/tasks/tags/facets", response_model=TaskTagFacetResponse)
+async def get_task_tag_facets(
+    status: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """当前用户可见任务的各标签任务数（一次分组查询），按数量倒序"""
+    visible = apply_visibility_filters(db.query(Task.id), current_user, Task)
+    if status:
+        visible = visible.filter(Task.status == status)
+    rows = (
+        db.query(TaskTag.tag, func.count().label("count"))
+        .filter(TaskTag.task_id.in_(visible))
+        .group_by(TaskTag.tag)
+        .order_by(func.count().desc(), TaskTag.tag)
+        .limit(limit)
+        .all()
+    )
+    return {"items": [{"tag": tag, "count": count} for tag, count in rows]}
+
 @app.get("/api/v1/tasks/{task_id}", response_model=TaskResponse)
 async def get_task(
     task_id: int,
+    request: Request,
+    response: Response,
     view_user_id: Optional[int] = Query(None, description="查看指定用户的个人视角统计（管理员/超管可用）"),
     scope: Optional[str] = Query(None, description="视角：mine 或 all，默认为 mine"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """获取单个任务的详细信息"""
+    """获取单个任务的详细信息
+
+    响应带 ETag（任务行 + 记录水位 + 参与者集合 + 查看者与参数）；If-None-Match 命中时返回 304，不执行统计查询。
+    """
     task = db.query(Task).filter(Task.id == task_id).first()
     if not task:
         raise HTTPException(
@@ -1310,6 +1382,52 @@ async def get_task(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="你没有权限访问此任务"
         )
+
+    # 计算参与用户集合（用于汇总视角与参与人数）
+    def resolve_participants() -> List[int]:
+        """组 / 身份 / 全员任务的参与者集合经 participant_cache 复用（按成员关系纪元失效）"""
+        users_q = db.query(User.id).filter(User.is_active == True)
+        assignment_type_val = getattr(task.assignment_type, 'value', task.assignment_type)
+        if assignment_type_val == 'user':
+            return [int(task.assigned_to)] if task.assigned_to else []
+        if assignment_type_val == 'group':
+            if not task.target_group_id:
+                return []
+            key = ('group', task.target_group_id)
+            users_q = users_q.filter(User.group_id == task.target_group_id)
+        elif assignment_type_val == 'identity':
+            if not task.target_identity:
+                return []
+            key = ('identity', task.target_identity)
+            users_q = users_q.filter(User.identity_type == task.target_identity)
+        elif assignment_type_val == 'all':
+            # 管理员：只看本组；超管：所有；普通用户：仅自己
+            if current_user.is_super_admin:
+                key = ('all', None)
+            elif current_user.is_admin:
+                key = ('all', current_user.group_id)
+                if current_user.group_id is not None:
+                    users_q = users_q.filter(User.group_id == current_user.group_id)
+            else:
+                return [int(current_user.id)]
+        else:
+            return []
+        return list(participant_cache.get_or_load(key, lambda: (uid for (uid,) in users_q.all())))
+
+    try:
+        participants = resolve_participants()
+    except Exception:
+        participants = []
+
+    # 参与者集合本身（排序后的 ID 摘要）计入 ETag：成员变化在任何 worker、重启前后都会改变 ETag
+    participants_digest = hashlib.sha1(",".join(map(str, participants)).encode("ascii")).hexdigest()
+    etag = make_etag(
+        row_fingerprint(task), _task_records_watermark(db, task), _viewer_fingerprint(current_user),
+        view_user_id, scope, participants_digest,
+    )
+    if if_none_match(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
   
     # 个人接龙统计（最小改动：仅后端计算，不改动数据库结构）
     personal_jielong_current_count = None
@@ -1349,38 +1467,23 @@ async def get_task(
         # 兼容 Enum 与字符串类型的 task_type
         task_type_val = getattr(task.task_type, 'value', task.task_type)
 
-        # 计算参与用户集合（用于汇总视角与参与人数）
-        def resolve_participants() -> List[int]:
-            users_q = db.query(User).filter(User.is_active == True)
-            assignment_type_val = getattr(task.assignment_type, 'value', task.assignment_type)
-            participant_ids: List[int] = []
-            if assignment_type_val == 'user':
-                if task.assigned_to:
-                    participant_ids = [int(task.assigned_to)]
-            elif assignment_type_val == 'group':
-                if task.target_group_id:
-                    users_q = users_q.filter(User.group_id == task.target_group_id)
-                    participant_ids = [u.id for u in users_q.all()]
-            elif assignment_type_val == 'identity':
-                if task.target_identity:
-                    users_q = users_q.filter(User.identity_type == task.target_identity)
-                    participant_ids = [u.id for u in users_q.all()]
-            elif assignment_type_val == 'all':
-                # 管理员：只看本组；超管：所有；普通用户：仅自己
-                if current_user.is_super_admin:
-                    participant_ids = [u.id for u in users_q.all()]
-                elif current_user.is_admin:
-                    if current_user.group_id is not None:
-                        users_q = users_q.filter(User.group_id == current_user.group_id)
-                    participant_ids = [u.id for u in users_q.all()]
-                else:
-                    participant_ids = [int(current_user.id)]
-            # 去重与清洗
-            return sorted({int(pid) for pid in participant_ids if pid is not None})
-
-        participants = resolve_participants()
         participant_count = len(participants) if participants else None
 
+        # 个人与汇总统计均读取 task_user_progress：个人为主键查找，汇总为一次按任务过滤的聚合
+        def personal_progress(user_id: int) -> Optional[TaskUserProgress]:
+            return db.get(TaskUserProgress, (task_id, user_id))
+
+        def aggregate_progress() -> tuple:
+            current, completed = (
+                db.query(
+                    func.coalesce(func.sum(TaskUserProgress.current_value), 0),
+                    func.coalesce(func.sum(case((TaskUserProgress.is_completed == True, 1), else_=0)), 0),
+                )
+                .filter(TaskUserProgress.task_id == task_id, TaskUserProgress.user_id.in_(participants))
+                .one()
+            )
+            return current, completed
+
         if task_type_val == 'jielong':
             # 基于 view_user_id 的个人统计权限判断
             target_user_id = current_user.id
@@ -1400,25 +1503,12 @@ async def get_task(
                         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="无权限查看其他用户的个人统计")
                     target_user_id = view_user_id
 
-            # 个人当前接龙数：统计该任务下目标用户的记录数
-            personal_jielong_current_count = (
-                db.query(func.count(JielongRecord.id))
-                .filter(JielongRecord.task_id == task_id, JielongRecord.user_id == target_user_id)
-                .scalar()
-            ) or 0
+            # 个人当前接龙数
+            progress = personal_progress(target_user_id)
+            personal_jielong_current_count = int(progress.current_value) if progress else 0
 
             # 个人目标：优先从 jielong_config.personal_targets 读取；否则回落到任务的 jielong_target_count
-            cfg = task.jielong_config if isinstance(task.jielong_config, dict) else {}
-            personal_targets = cfg.get('personal_targets') if isinstance(cfg, dict) else None
-            if isinstance(personal_targets, dict):
-                # 同时支持 str/int 键
-                personal_jielong_target_count = (
-                    personal_targets.get(str(target_user_id))
-                    or personal_targets.get(target_user_id)
-                    or task.jielong_target_count
-                )
-            else:
-                personal_jielong_target_count = task.jielong_target_count
+            personal_jielong_target_count = task_personal_target(task, target_user_id)
 
             if personal_jielong_target_count and personal_jielong_target_count > 0:
                 personal_jielong_progress = round(
@@ -1429,37 +1519,7 @@ async def get_task(
                 personal_jielong_progress = None
 
             # 汇总目标与进度（全部视角）：按参与用户加总目标
-            try:
-                if participants:
-                    cfg2 = task.jielong_config if isinstance(task.jielong_config, dict) else {}
-                    personal_targets2 = cfg2.get('personal_targets') if isinstance(cfg2, dict) else None
-                    if isinstance(personal_targets2, dict):
-                        total_target = 0
-                        for uid in participants:
-                            t = (
-                                personal_targets2.get(str(uid))
-                                or personal_targets2.get(uid)
-                                or task.jielong_target_count
-                            )
-                            try:
-                                total_target += int(t or 0)
-                            except Exception:
-                                total_target += 0
-                        aggregate_jielong_target_count = total_target
-                    else:
-                        aggregate_jielong_target_count = (task.jielong_target_count or 0) * len(participants)
-
-                    if aggregate_jielong_target_count and aggregate_jielong_target_count > 0:
-                        aggregate_jielong_progress = round(
-                            float(getattr(task, 'jielong_current_count', 0) or 0) / float(aggregate_jielong_target_count),
-                            4
-                        )
-                    else:
-                        aggregate_jielong_progress = None
-                else:
-                    aggregate_jielong_progress = None
-            except Exception:
-                aggregate_jielong_progress = None
+            aggregate_jielong_target_count, aggregate_jielong_progress = jielong_aggregate_progress(task, participants)
 
         elif task_type_val == 'amount':
             # 个人金额：按用户维度汇总 TaskRecord.value
@@ -1480,11 +1540,8 @@ async def get_task(
                         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="无权限查看其他用户的个人统计")
                     target_user_id = view_user_id
 
-            personal_current_amount = (
-                db.query(func.sum(TaskRecord.value))
-                .filter(TaskRecord.task_id == task_id, TaskRecord.user_id == target_user_id)
-                .scalar()
-            ) or 0.0
+            progress = personal_progress(target_user_id)
+            personal_current_amount = (progress.current_value if progress else 0.0) or 0.0
             personal_target_amount = task.target_amount or 0.0
             personal_amount_progress = (
                 round(float(personal_current_amount) / float(personal_target_amount), 4)
@@ -1493,11 +1550,7 @@ async def get_task(
 
             # 汇总金额（全部视角）
             if participants:
-                aggregate_current_amount = (
-                    db.query(func.sum(TaskRecord.value))
-                    .filter(TaskRecord.task_id == task_id, TaskRecord.user_id.in_(participants))
-                    .scalar()
-                ) or 0.0
+                aggregate_current_amount = float(aggregate_progress()[0] or 0.0)
                 aggregate_target_amount = (task.target_amount or 0.0) * len(participants)
                 aggregate_amount_progress = (
                     round(float(aggregate_current_amount) / float(aggregate_target_amount), 4)
@@ -1521,11 +1574,8 @@ async def get_task(
                         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="无权限查看其他用户的个人统计")
                     target_user_id = view_user_id
 
-            personal_current_quantity = (
-                db.query(func.sum(TaskRecord.value))
-                .filter(TaskRecord.task_id == task_id, TaskRecord.user_id == target_user_id)
-                .scalar()
-            ) or 0
+            progress = personal_progress(target_user_id)
+            personal_current_quantity = (progress.current_value if progress else 0) or 0
             # 转换为整数
             try:
                 personal_current_quantity = int(personal_current_quantity)
@@ -1538,11 +1588,7 @@ async def get_task(
             )
 
             if participants:
-                aggregate_current_quantity = (
-                    db.query(func.sum(TaskRecord.value))
-                    .filter(TaskRecord.task_id == task_id, TaskRecord.user_id.in_(participants))
-                    .scalar()
-                ) or 0
+                aggregate_current_quantity = aggregate_progress()[0] or 0
                 try:
                     aggregate_current_quantity = int(aggregate_current_quantity)
                 except Exception:
@@ -1571,23 +1617,12 @@ async def get_task(
                         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="无权限查看其他用户的个人统计")
                     target_user_id = view_user_id
 
-            personal_is_completed = bool(
-                db.query(func.count(TaskCompletion.id))
-                .filter(TaskCompletion.task_id == task_id, TaskCompletion.user_id == target_user_id, TaskCompletion.is_completed == True)
-                .scalar() or 0
-            )
-            personal_completion_count = (
-                db.query(func.count(TaskCompletion.id))
-                .filter(TaskCompletion.task_id == task_id, TaskCompletion.user_id == target_user_id, TaskCompletion.is_completed == True)
-                .scalar()
-            ) or 0
+            progress = personal_progress(target_user_id)
+            personal_is_completed = bool(progress and progress.is_completed)
+            personal_completion_count = 1 if personal_is_completed else 0
 
             if participants:
-                completed_count = (
-                    db.query(func.count(TaskCompletion.id))
-                    .filter(TaskCompletion.task_id == task_id, TaskCompletion.user_id.in_(participants), TaskCompletion.is_completed == True)
-                    .scalar()
-                ) or 0
+                completed_count = int(aggregate_progress()[1] or 0)
                 aggregate_checkbox_progress = (
                     round(float(completed_count) / float(len(participants)), 4)
                     if len(participants) > 0 else None
@@ -1619,6 +1654,7 @@ async def get_task(
         due_date=task.due_date,
         status=task.status,
         is_completed=getattr(task, 'is_completed', None),
+        is_overdue=task.is_overdue,
         created_by=task.created_by,
         created_at=task.created_at,
         updated_at=task.updated_at,
@@ -1710,6 +1746,10 @@ async def update_task(
             task.jielong_target_count = update_data["jielong_target_count"]
         if "jielong_config" in update_data:
             task.jielong_config = update_data["jielong_config"]
+
+    # 目标变化时同步个人进度汇总中的目标与完成状态
+    if {"task_type", "target_amount", "target_quantity", "jielong_target_count", "jielong_config"} & update_data.keys():
+        task_crud.refresh_progress_targets(db, task)
     
     task.updated_at = datetime.utcnow()
     db.commit()
@@ -1736,6 +1776,7 @@ async def update_task(
         due_date=task.due_date,
         status=getattr(task.status, 'value', str(task.status)),
         is_completed=task.is_completed,
+        is_overdue=task.is_overdue,
         created_by=task.created_by,
         created_at=task.created_at,
         updated_at=task.updated_at
@@ -1991,6 +2032,105 @@ async def get_report(
         updated_at=report.updated_at
     )
 
+def _snapshot_task_card(t: Task, usernames: Dict[int, str], group_names: Dict[int, str]) -> Dict[str, Any]:
+    """快照中的任务卡片（分配对象展示名取自预取的映射）"""
+    assigned_to_username = None
+    target_group_name = None
+    if t.assignment_type == TaskAssignmentType.USER and t.assigned_to:
+        assigned_to_username = usernames.get(t.assigned_to)
+    if t.assignment_type == TaskAssignmentType.GROUP and t.target_group_id:
+        target_group_name = group_names.get(t.target_group_id)
+    return {
+        "id": t.id,
+        "title": t.title,
+        "description": t.description,
+        "task_type": (t.task_type.value if hasattr(t.task_type, "value") else str(t.task_type)),
+        "assignment_type": (t.assignment_type.value if hasattr(t.assignment_type, "value") else str(t.assignment_type)),
+        "priority": (t.priority.value if hasattr(t.priority, "value") else str(t.priority)),
+        "assigned_to": t.assigned_to,
+        "assigned_to_username": assigned_to_username,
+        "target_group_id": t.target_group_id,
+        "target_group_name": target_group_name,
+        "target_identity": t.target_identity,
+        "target_amount": t.target_amount,
+        "current_amount": t.current_amount,
+        "target_quantity": t.target_quantity,
+        "current_quantity": t.current_quantity,
+        "jielong_target_count": t.jielong_target_count,
+        "jielong_current_count": t.jielong_current_count,
+        "jielong_config": t.jielong_config,
+        "due_date": t.due_date.isoformat() if t.due_date else None,
+        "status": (t.status.value if hasattr(t.status, "value") else str(t.status)),
+        "is_completed": t.is_completed,
+        "updated_at": t.updated_at.isoformat() if t.updated_at else None,
+    }
+
+
+def _build_tasks_snapshot(db: Session, target_user: User, work_date: date) -> Dict[str, Any]:
+    """构建日报任务快照（常数次查询：任务、用户名、组名各一次）
+
+    - 今日完成：当天更新且已完成
+    - 今日到期：截止日期为当天
+    - 正在进行：未完成且无截止日期或截止日期晚于当天
+    - 逾期未完成：未完成且截止日期不晚于当天
+    只加载“未完成”或“当天到期 / 当天更新”的可见任务，历史已完成任务不再读取；
+    每个任务只映射一次，单次遍历完成分类。
+    """
+    day_start = datetime.combine(work_date, datetime.min.time())
+    day_end = day_start + timedelta(days=1)
+    is_done = or_(Task.status == TaskStatus.DONE, Task.is_completed == True)
+    tasks = (
+        db.query(Task)
+        .filter(task_visibility_clause(target_user))
+        .filter(or_(
+            ~is_done,
+            Task.status.is_(None),
+            Task.is_completed.is_(None),
+            and_(Task.due_date >= day_start, Task.due_date < day_end),
+            and_(Task.updated_at >= day_start, Task.updated_at < day_end),
+        ))
+        .order_by(Task.id)
+        .all()
+    )
+
+    # 分配对象展示名：两次批量查询
+    user_ids = {t.assigned_to for t in tasks if t.assignment_type == TaskAssignmentType.USER and t.assigned_to}
+    group_ids = {t.target_group_id for t in tasks if t.assignment_type == TaskAssignmentType.GROUP and t.target_group_id}
+    usernames = dict(db.query(User.id, User.username).filter(User.id.in_(user_ids)).all()) if user_ids else {}
+    group_names = dict(db.query(UserGroup.id, UserGroup.name).filter(UserGroup.id.in_(group_ids)).all()) if group_ids else {}
+
+    def day_of(dt) -> Optional[date]:
+        try:
+            return dt.date() if dt is not None else None
+        except Exception:
+            return None
+
+    completed_today, due_today, ongoing_uncompleted, overdue_uncompleted = [], [], [], []
+    for t in tasks:
+        card = _snapshot_task_card(t, usernames, group_names)
+        done = (t.status == TaskStatus.DONE) or (t.is_completed is True)
+        due_day = day_of(t.due_date)
+        if done and day_of(t.updated_at) == work_date:
+            completed_today.append(card)
+        if due_day == work_date:
+            due_today.append(card)
+        if not done:
+            if due_day is None or due_day > work_date:
+                ongoing_uncompleted.append(card)
+            else:
+                overdue_uncompleted.append(card)
+
+    return {
+        "completed_today": completed_today,
+        "due_today": due_today,
+        "ongoing_uncompleted": ongoing_uncompleted,
+        "overdue_uncompleted": overdue_uncompleted,
+        "work_date": work_date.isoformat() if work_date else None,
+        "user_id": target_user.id,
+        "username": target_user.username,
+    }
+
+
 @app.post("/api/v1/reports/{report_id}/build-snapshot", response_model=DailyReportResponse)
 async def build_report_tasks_snapshot(
     report_id: int,
@@ -2015,72 +2155,7 @@ async def build_report_tasks_snapshot(
     if not target_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="报告用户不存在")
 
-    # 可见任务过滤（ALL / USER / GROUP / IDENTITY）
-    visibility_filter = or_(
-        Task.assignment_type == TaskAssignmentType.ALL,
-        and_(Task.assignment_type == TaskAssignmentType.USER, Task.assigned_to == target_user.id),
-        and_(Task.assignment_type == TaskAssignmentType.GROUP, Task.target_group_id == target_user.group_id),
-        and_(Task.assignment_type == TaskAssignmentType.IDENTITY, Task.target_identity == target_user.identity_type)
-    )
-    tasks = db.query(Task).filter(visibility_filter).all()
-
-    # 工具：按日期比较（忽略时区，仅按日期）
-    def is_same_day(dt, d):
-        try:
-            return (dt is not None) and (dt.date() == d)
-        except Exception:
-            return False
-
-    # 后端快照映射，尽量补充分配对象展示名
-    def map_task_for_snapshot(t: Task):
-        assigned_to_username = None
-        target_group_name = None
-        if t.assignment_type == TaskAssignmentType.USER and t.assigned_to:
-            u = db.query(User).filter(User.id == t.assigned_to).first()
-            assigned_to_username = u.username if u else None
-        if t.assignment_type == TaskAssignmentType.GROUP and t.target_group_id:
-            g = db.query(UserGroup).filter(UserGroup.id == t.target_group_id).first()
-            target_group_name = g.name if g else None
-        return {
-            "id": t.id,
-            "title": t.title,
-            "description": t.description,
-            "task_type": (t.task_type.value if hasattr(t.task_type, "value") else str(t.task_type)),
-            "assignment_type": (t.assignment_type.value if hasattr(t.assignment_type, "value") else str(t.assignment_type)),
-            "priority": (t.priority.value if hasattr(t.priority, "value") else str(t.priority)),
-            "assigned_to": t.assigned_to,
-            "assigned_to_username": assigned_to_username,
-            "target_group_id": t.target_group_id,
-            "target_group_name": target_group_name,
-            "target_identity": t.target_identity,
-            "target_amount": t.target_amount,
-            "current_amount": t.current_amount,
-            "target_quantity": t.target_quantity,
-            "current_quantity": t.current_quantity,
-            "jielong_target_count": t.jielong_target_count,
-            "jielong_current_count": t.jielong_current_count,
-            "jielong_config": t.jielong_config,
-            "due_date": t.due_date.isoformat() if t.due_date else None,
-            "status": (t.status.value if hasattr(t.status, "value") else str(t.status)),
-            "is_completed": t.is_completed,
-            "updated_at": t.updated_at.isoformat() if t.updated_at else None,
-        }
-
-    work_date = report.work_date
-    completed_today = [map_task_for_snapshot(t) for t in tasks if is_same_day(t.updated_at, work_date) and ((t.status == TaskStatus.DONE) or (t.is_completed is True))]
-    due_today = [map_task_for_snapshot(t) for t in tasks if (t.due_date is not None) and is_same_day(t.due_date, work_date)]
-    ongoing_uncompleted = [map_task_for_snapshot(t) for t in tasks if not ((t.status == TaskStatus.DONE) or (t.is_completed is True)) and ((t.due_date is None) or (t.due_date.date() > work_date))]
-    overdue_uncompleted = [map_task_for_snapshot(t) for t in tasks if not ((t.status == TaskStatus.DONE) or (t.is_completed is True)) and (t.due_date is not None) and (t.due_date.date() <= work_date)]
-
-    snapshot = {
-        "completed_today": completed_today,
-        "due_today": due_today,
-        "ongoing_uncompleted": ongoing_uncompleted,
-        "overdue_uncompleted": overdue_uncompleted,
-        "work_date": work_date.isoformat() if work_date else None,
-        "user_id": report.user_id,
-        "username": target_user.username,
-    }
+    snapshot = _build_tasks_snapshot(db, target_user, report.work_date)
 
     # 持久化到 ai_analysis.tasks_snapshot
     try:
@@ -2268,7 +2343,7 @@ async def analyze_report_with_ai(
 
 @app.get("/api/v1/stats/overview")
 async def get_stats_overview(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """获取统计概览"""
@@ -2332,7 +2407,7 @@ async def get_stats_overview(
 
 @app.get("/api/v1/analytics/dashboard")
 async def get_dashboard_data(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """获取仪表盘数据"""
@@ -2417,33 +2492,30 @@ async def get_dashboard_data(
 
 @app.get("/api/v1/analytics/task-stats")
 async def get_task_stats(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """获取任务统计数据"""
-    # 根据用户权限获取数据
-    if current_user.role == "user":
-        tasks = db.query(Task).filter(Task.assigned_to == current_user.id).all()
-    else:
-        tasks = db.query(Task).all()
+    # 根据用户权限获取数据（在数据库中分组计数，异步会话不阻塞事件循环）
+    async def count_by(column, default=None):
+        stmt = select(column, func.count(Task.id))
+        if current_user.role == "user":
+            stmt = stmt.where(Task.assigned_to == current_user.id)
+        rows = (await db.execute(stmt.group_by(column))).all()
+        stats = {}
+        for key, count in rows:
+            key = getattr(key, "value", key) or default
+            stats[key] = stats.get(key, 0) + count
+        return stats
 
     # 按状态统计
-    status_stats = {}
-    for task in tasks:
-        status = task.status
-        status_stats[status] = status_stats.get(status, 0) + 1
+    status_stats = await count_by(Task.status)
 
     # 按优先级统计
-    priority_stats = {}
-    for task in tasks:
-        priority = task.priority or "medium"
-        priority_stats[priority] = priority_stats.get(priority, 0) + 1
+    priority_stats = await count_by(Task.priority, "medium")
 
     # 按任务类型统计
-    type_stats = {}
-    for task in tasks:
-        task_type = task.task_type or "checkbox"
-        type_stats[task_type] = type_stats.get(task_type, 0) + 1
+    type_stats = await count_by(Task.task_type, "checkbox")
 
     return {
         "status_distribution": [
@@ -2459,30 +2531,34 @@ async def get_task_stats(
 
 @app.get("/api/v1/tasks/stats/summary")
 async def get_task_stats_summary(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """获取任务统计摘要"""
     # 根据用户权限获取数据
+    task_stmt = select(Task.status, func.count(Task.id)).group_by(Task.status)
+    report_stmt = select(func.count(DailyReport.id))
     if current_user.role == "user":
-        tasks = db.query(Task).filter(Task.assigned_to == current_user.id).all()
-        reports = db.query(DailyReport).filter(DailyReport.user_id == current_user.id).all()
-    else:
-        tasks = db.query(Task).all()
-        reports = db.query(DailyReport).all()
+        task_stmt = task_stmt.where(Task.assigned_to == current_user.id)
+        report_stmt = report_stmt.where(DailyReport.user_id == current_user.id)
 
     # 计算任务统计
-    pending_tasks = len([t for t in tasks if t.status == "pending"])
-    in_progress_tasks = len([t for t in tasks if t.status == "processing"])
-    completed_tasks = len([t for t in tasks if t.status == "done"])
+    status_counts = {
+        getattr(s, "value", s): c for s, c in (await db.execute(task_stmt)).all()
+    }
+    pending_tasks = status_counts.get("pending", 0)
+    in_progress_tasks = status_counts.get("processing", 0)
+    completed_tasks = status_counts.get("done", 0)
     
     # 计算本周日报数量
     week_start = datetime.now() - timedelta(days=datetime.now().weekday())
     week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
-    reports_this_week = len([r for r in reports if r.created_at >= week_start])
+    reports_this_week = (
+        await db.execute(report_stmt.where(DailyReport.created_at >= week_start))
+    ).scalar() or 0
 
     return {
-        "total": len(tasks),
+        "total": sum(status_counts.values()),
         "pending": pending_tasks,
         "processing": in_progress_tasks,
         "done": completed_tasks,
@@ -2491,32 +2567,38 @@ async def get_task_stats_summary(
 
 @app.get("/api/v1/reports/stats/summary")
 async def get_reports_stats_summary(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """获取日报统计摘要"""
     # 根据用户权限获取数据
+    week_start = datetime.now() - timedelta(days=datetime.now().weekday())
+    week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
+    stmt = select(
+        func.count(DailyReport.id),
+        func.avg(DailyReport.mood_score),
+        func.avg(DailyReport.efficiency_score),
+        func.coalesce(func.sum(DailyReport.work_hours), 0),
+        func.count(DailyReport.id).filter(DailyReport.created_at >= week_start),
+    )
     if current_user.role == "user":
-        reports = db.query(DailyReport).filter(DailyReport.user_id == current_user.id).all()
-    else:
-        reports = db.query(DailyReport).all()
+        stmt = stmt.where(DailyReport.user_id == current_user.id)
+    row = (await db.execute(stmt)).one()
 
     # 计算日报统计
-    total_reports = len(reports)
+    total_reports = row[0] or 0
     
     # 计算平均情绪分数
-    avg_emotion_score = sum(r.mood_score for r in reports) / total_reports if total_reports > 0 else 0
+    avg_emotion_score = float(row[1] or 0) if total_reports > 0 else 0
     
     # 计算平均效率分数
-    avg_efficiency_score = sum(r.efficiency_score for r in reports) / total_reports if total_reports > 0 else 0
+    avg_efficiency_score = float(row[2] or 0) if total_reports > 0 else 0
     
     # 计算总工作时长
-    total_work_hours = sum(r.work_hours for r in reports)
+    total_work_hours = row[3]
     
     # 计算本周日报数量
-    week_start = datetime.now() - timedelta(days=datetime.now().weekday())
-    week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
-    reports_this_week = len([r for r in reports if r.created_at >= week_start])
+    reports_this_week = row[4] or 0
 
     return {
         "total_reports": total_reports,
@@ -2528,19 +2610,23 @@ async def get_reports_stats_summary(
 
 @app.get("/api/v1/tasks/weekly-trend")
 async def get_weekly_task_trend(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """获取本周任务趋势"""
-    # 根据用户权限获取数据
-    if current_user.role == "user":
-        tasks = db.query(Task).filter(Task.assigned_to == current_user.id).all()
-    else:
-        tasks = db.query(Task).all()
-
     # 计算本周每天的任务数量
     today = datetime.now()
     week_start = today - timedelta(days=today.weekday())
+    week_begin = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    # 仅加载本周创建的任务时间（根据用户权限过滤）
+    stmt = select(Task.created_at).where(
+        Task.created_at >= week_begin,
+        Task.created_at < week_begin + timedelta(days=7),
+    )
+    if current_user.role == "user":
+        stmt = stmt.where(Task.assigned_to == current_user.id)
+    created_times = (await db.execute(stmt)).scalars().all()
     
     weekly_data = []
     weekdays = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
@@ -2551,7 +2637,7 @@ async def get_weekly_task_trend(
         day_end = day_start + timedelta(days=1)
         
         # 统计当天创建的任务数量
-        day_tasks = [t for t in tasks if day_start <= t.created_at < day_end]
+        day_tasks = [t for t in created_times if day_start <= t < day_end]
         
         weekly_data.append({
             "date": weekdays[i],
@@ -2564,6 +2650,7 @@ async def get_weekly_task_trend(
 @app.post("/api/v1/task-sync/sync-task-to-report")
 async def sync_task_to_report(
     payload: Dict[str, Any],
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=64),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -2591,7 +2678,9 @@ async def sync_task_to_report(
     if value is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="缺少进度数值")
 
-    updated_task = task_crud.log_task_progress(db=db, task_id=task_id, user_id=current_user.id, value=float(value))
+    updated_task = task_crud.log_task_progress(
+        db=db, task_id=task_id, user_id=current_user.id, value=float(value), idempotency_key=idempotency_key
+    )
     if not updated_task:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="记录进度失败")
 
@@ -2620,6 +2709,7 @@ async def toggle_checkbox_task(
     is_completed = bool(payload.get("is_completed"))
     task.is_completed = is_completed
     task.updated_at = datetime.now()
+    task_crud.apply_user_progress(db, task, current_user.id, is_completed=is_completed)
     try:
         db.commit()
         db.refresh(task)
@@ -2631,12 +2721,14 @@ async def toggle_checkbox_task(
 # ==================== 通知已读同步 ====================
 @app.get("/api/v1/notifications/read-map", response_model=NotificationReadMapResponse)
 async def get_notification_read_map(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """返回当前用户已读通知ID列表，用于多端同步。"""
-    records = db.query(NotificationRead).filter(NotificationRead.user_id == current_user.id).all()
-    ids = [r.notification_id for r in records]
+    result = await db.execute(
+        select(NotificationRead.notification_id).where(NotificationRead.user_id == current_user.id)
+    )
+    ids = list(result.scalars().all())
     return NotificationReadMapResponse(ids=ids)
 
 
@@ -2672,7 +2764,7 @@ async def sync_notification_read(
 
 @app.get("/api/v1/admin/metrics/stats")
 async def get_admin_metrics_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """获取管理员指标统计"""
@@ -2744,6 +2836,22 @@ async def get_admin_metrics_stats(
             "avgWorkHours": 0
         }
 
+@app.get("/api/v1/admin/db/pool")
+async def get_db_pool_status(current_user: User = Depends(get_current_active_user)):
+    """数据库连接池状态：当前占用连接数与累计 checkout 等待时间（用于按 worker 调整池大小）"""
+    if not getattr(current_user, "is_super_admin", False):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="需要超级管理员权限")
+
+    async_engine = get_async_engine_if_created()
+    async_read_engine = get_async_read_engine_if_created()
+    return {
+        "pid": os.getpid(),
+        "sync": pool_status(engine),
+        "async": pool_status(async_engine.sync_engine) if async_engine is not None else None,
+        "read": pool_status(read_engine) if read_engine is not engine else None,
+        "async_read": pool_status(async_read_engine.sync_engine) if async_read_engine is not None else None,
+    }
+
 # ==================== 系统维护 API ====================
 @app.delete("/api/v1/system/purge")
 async def purge_data_keep_admin(
@@ -2784,6 +2892,9 @@ async def purge_data_keep_admin(
         deleted["task_completions"] = q_tc.count()
         q_tc.delete(synchronize_session=False)
 
+        q_progress = db.query(TaskUserProgress).filter(TaskUserProgress.user_id != admin_id)
+        q_progress.delete(synchronize_session=False)
+
         q_tr = db.query(TaskRecord).filter(TaskRecord.user_id != admin_id)
         deleted["task_records"] = q_tr.count()
         q_tr.delete(synchronize_session=False)
@@ -2807,6 +2918,10 @@ async def purge_data_keep_admin(
             q_tasks = db.query(Task)
         deleted["tasks"] = q_tasks.count()
         q_tasks.delete(synchronize_session=False)
+        # 批量删除不触发 ORM 事件，手动清理受众索引与标签索引
+        db.query(TaskAudience).filter(~TaskAudience.task_id.in_(select(Task.id))).delete(synchronize_session=False)
+        db.query(TaskTag).filter(~TaskTag.task_id.in_(select(Task.id))).delete(synchronize_session=False)
+        db.query(TaskUserProgress).filter(~TaskUserProgress.task_id.in_(select(Task.id))).delete(synchronize_session=False)
 
         q_nr = db.query(NotificationRead).filter(NotificationRead.user_id != admin_id)
         deleted["notification_reads"] = q_nr.count()
@@ -2838,6 +2953,8 @@ async def purge_data_keep_admin(
         deleted["user_groups"] = deleted_groups
 
         db.commit()
+        clear_user_cache()
+        bump_membership_epoch()
         return {"message": "数据清理完成（保留 admin）", "deleted": deleted, "admin_id": admin_id}
     except Exception as e:
         db.rollback()
@@ -3142,7 +3259,7 @@ async def analytics_team_performance(
     end_date: Optional[str] = Query(None),
     role_scope: Optional[str] = Query(None),
     group_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -3255,7 +3372,7 @@ async def analytics_get_monthly_goals(
     month: Optional[int] = Query(None),
     group_id: Optional[int] = Query(None),
     user_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     today = date.today()
@@ -3331,7 +3448,7 @@ async def analytics_summary(
     user_id: Optional[int] = Query(None),
     year: Optional[int] = Query(None),
     month: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     import calendar
@@ -3545,7 +3662,7 @@ async def analytics_trend(
     metrics: Optional[List[str]] = Query(None, description="指标列表：new_sign_count/new_sign_amount/referral_count/referral_amount/renewal_count/renewal_amount/upgrade_count/upgrade_amount"),
     group_id: Optional[int] = Query(None),
     user_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     s, e = _parse_date_range(start_date, end_date)
@@ -3606,7 +3723,7 @@ async def analytics_data(
     role_scope: Optional[str] = Query(None, description="视角：CC / SS / LP / ALL（兼容 CC_SS）"),
     group_id: Optional[int] = Query(None),
     user_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """返回前端聚合指标与兼容旧版统计卡。
@@ -3765,7 +3882,7 @@ async def analytics_data_alias(
     role_scope: Optional[str] = Query(None),
     group_id: Optional[int] = Query(None),
     user_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     return await analytics_data(start_date, end_date, role_scope, group_id, user_id, db, current_user)
@@ -3775,7 +3892,7 @@ async def analytics_stats(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
     group_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """统计卡片：任务、完成率、日报、平均情感分"""
@@ -3803,7 +3920,7 @@ async def analytics_stats_alias(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
     group_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     return await analytics_stats(start_date, end_date, group_id, db, current_user)
@@ -3815,7 +3932,7 @@ async def analytics_charts(
     role_scope: Optional[str] = Query(None),
     group_id: Optional[int] = Query(None),
     user_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """图表数据：任务趋势、状态分布、优先级、情绪趋势、AI使用"""
@@ -3915,7 +4032,7 @@ async def analytics_charts_alias(
     role_scope: Optional[str] = Query(None),
     group_id: Optional[int] = Query(None),
     user_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     return await analytics_charts(start_date, end_date, role_scope, group_id, user_id, db, current_user)
@@ -3926,7 +4043,7 @@ async def analytics_user_performance(
     end_date: Optional[str] = Query(None),
     role_scope: Optional[str] = Query(None),
     group_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """管理员/超管：用户绩效排行"""
@@ -3991,7 +4108,7 @@ async def analytics_user_performance_alias(
     end_date: Optional[str] = Query(None),
     role_scope: Optional[str] = Query(None),
     group_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     return await analytics_user_performance(start_date, end_date, role_scope, group_id, db, current_user)
@@ -4004,7 +4121,7 @@ async def analytics_ranking(
     role_scope: Optional[str] = Query(None),
     group_id: Optional[int] = Query(None),
     user_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     if not metric_key:
@@ -4244,7 +4361,7 @@ async def analytics_ranking_alias(
     role_scope: Optional[str] = Query(None),
     group_id: Optional[int] = Query(None),
     user_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     return await analytics_ranking(metric_key, start_date, end_date, role_scope, group_id, user_id, db, current_user)
@@ -4672,6 +4789,9 @@ async def update_ai_agent(
         
         agent.updated_at = datetime.utcnow()
         db.commit()
+        # 设为默认智能体时补齐默认功能点（原先在每次启动时检查）
+        if agent.is_default and agent.is_active and ensure_default_ai_functions(db):
+            db.commit()
         db.refresh(agent)
         
         return AIAgentResponse(**agent.to_dict())
@@ -4796,7 +4916,7 @@ async def get_ai_call_logs(
     size: int = Query(20, ge=1, le=100),
     function_id: Optional[int] = Query(None),
     status: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """获取AI调用记录"""
@@ -4918,7 +5038,7 @@ async def call_ai_function(
 
 @app.get("/api/v1/ai/stats", response_model=AIStatsResponse)
 async def get_ai_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """获取AI统计信息"""
@@ -5339,7 +5459,7 @@ async def update_system_settings(
 @app.on_event("startup")
 async def startup_event():
     """启动时初始化数据"""
-    db = next(get_db())
+    db = SessionLocal()
     
     # 检查是否已存在 admin 用户
     existing_admin = db.query(User).filter(User.username == "admin").first()
@@ -5374,6 +5494,16 @@ async def startup_event():
     
     db.close()
 
+    if DUE_SCHEDULER_ENABLED:
+        due_date_scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """关闭时停止逾期调度、释放异步连接池，并写出队列中剩余的访问日志"""
+    await due_date_scheduler.stop()
+    await dispose_async_engine()
+    stop_access_logger()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
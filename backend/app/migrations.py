@@ -0,0 +1,415 @@
+# -*- coding: utf-8 -*-
+"""
+版本化数据库迁移
+
+取代 main.py 导入时逐个执行的 _ensure_* 结构探测：已执行的迁移记录在 schema_version 表中，
+版本已是最新时启动只需执行一次 SELECT MAX(version)，不再检查表结构。
+
+部署前可先执行迁移（随后将各 worker 的 AUTO_MIGRATE 设为 false）：
+    python -m app.migrations upgrade
+    python -m app.migrations status
+
+新增迁移：在 MIGRATIONS 末尾追加 (版本号, 名称, 函数)，函数接收一个处于事务中的 Connection，
+并且应当是幂等的（多个进程同时启动时可能重复执行）。
+"""
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+
+from .db import Base, engine as default_engine
+from .models import (
+    AIAgent, AIFunction, AIFunctionType, JielongRecord, Task, TaskAudience, TaskCompletion, TaskRecord, TaskTag,
+    TaskUserProgress, User, task_personal_target, task_principals, task_tag_values,
+)
+from .core.security import get_password_hash
+from .core.due_scheduler import overdue_updates
+from .core.task_search import install_task_search, install_task_search_trigram
+
+logger = logging.getLogger(__name__)
+
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "true").lower() in ("1", "true", "yes", "on")
+
+# PostgreSQL 下用于串行化多个 worker 迁移的 advisory lock 键
+_PG_LOCK_KEY = 724_000_117
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+# ==================== 迁移步骤 ====================
+
+def _add_missing_columns(conn: Connection, table: str, additions) -> None:
+    cols = {c["name"] for c in inspect(conn).get_columns(table)}
+    for name, decl in additions:
+        if name not in cols:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {decl}"))
+            logger.info(f"Added column {table}.{name}")
+
+
+def _create_all(conn: Connection) -> None:
+    Base.metadata.create_all(bind=conn)
+
+
+def _daily_report_sales_columns(conn: Connection) -> None:
+    _add_missing_columns(conn, "daily_reports", [
+        ("new_sign_count", "INTEGER DEFAULT 0"),
+        ("new_sign_amount", "FLOAT DEFAULT 0.0"),
+        ("renewal_count", "INTEGER DEFAULT 0"),
+        ("upgrade_count", "INTEGER DEFAULT 0"),
+        ("referral_count", "INTEGER DEFAULT 0"),
+        ("referral_amount", "FLOAT DEFAULT 0.0"),
+        ("renewal_amount", "FLOAT DEFAULT 0.0"),
+        ("upgrade_amount", "FLOAT DEFAULT 0.0"),
+    ])
+
+
+def _monthly_goal_target_columns(conn: Connection) -> None:
+    _add_missing_columns(conn, "monthly_goals", [
+        ("new_sign_target_amount", "FLOAT DEFAULT 0.0"),
+        ("referral_target_amount", "FLOAT DEFAULT 0.0"),
+        ("renewal_total_target_amount", "FLOAT DEFAULT 0.0"),
+    ])
+
+
+def _users_password_column(conn: Connection) -> None:
+    _add_missing_columns(conn, "users", [("hashed_password", "TEXT")])
+
+
+def _users_avatar_column(conn: Connection) -> None:
+    _add_missing_columns(conn, "users", [("avatar_url", "TEXT")])
+
+
+def _default_admin_user(conn: Connection) -> None:
+    db = Session(bind=conn)
+    admin = db.query(User).filter(User.username == "admin").first()
+    if not admin:
+        db.add(User(
+            username="admin",
+            role="super_admin",
+            identity_type="sa",
+            is_active=True,
+            hashed_password=get_password_hash("admin123")))
+    elif not admin.hashed_password:
+        admin.hashed_password = get_password_hash("admin123")
+
+    if not db.query(User).filter(User.username == "demo").first():
+        db.add(User(
+            username="demo",
+            role="super_admin",
+            identity_type="sa",
+            is_active=True,
+            hashed_password=get_password_hash("demo123")))
+    db.flush()
+    db.close()
+
+
+def ensure_default_ai_functions(db: Session) -> int:
+    """确保默认功能点存在（若有默认智能体）；返回新建数量。
+
+    除迁移外，智能体被设为默认时也会调用，保证之后新增的默认智能体同样生效。
+    """
+    default_agent = db.query(AIAgent).filter(AIAgent.is_active == True, AIAgent.is_default == True).order_by(AIAgent.created_at.asc()).first()
+    if not default_agent:
+        return 0
+
+    existing = {name for (name,) in db.query(AIFunction.name).all()}
+    need_create = [name for name in ("个人数据洞察", "团队数据洞察") if name not in existing]
+    for name in need_create:
+        db.add(AIFunction(
+            name=name,
+            description=("AI 输出组织：个人视角" if name == "个人数据洞察" else "AI 输出组织：团队视角"),
+            function_type=AIFunctionType.CUSTOM,
+            agent_id=default_agent.id,
+            is_active=True,
+            created_by=1  # 默认由系统创建；如无用户1，后续更新
+        ))
+    return len(need_create)
+
+
+def _default_ai_functions(conn: Connection) -> None:
+    db = Session(bind=conn)
+    ensure_default_ai_functions(db)
+    db.flush()
+    db.close()
+
+
+def _create_index(conn: Connection, model, name: str) -> None:
+    index = next(ix for ix in model.__table__.indexes if ix.name == name)
+    index.create(bind=conn, checkfirst=True)
+
+
+def _jielong_records_task_user_index(conn: Connection) -> None:
+    _create_index(conn, JielongRecord, "ix_jielong_records_task_user")
+
+
+def _tasks_created_at_id_index(conn: Connection) -> None:
+    _create_index(conn, Task, "ix_tasks_created_at_id")
+
+
+def _task_audience_table(conn: Connection) -> None:
+    """创建 task_audience 并按现有任务的分配字段回填"""
+    table = TaskAudience.__table__
+    table.create(bind=conn, checkfirst=True)
+    conn.execute(table.delete())
+    tasks = Task.__table__
+    rows = [
+        {"principal": principal, "task_id": task.id}
+        for task in conn.execute(tasks.select().with_only_columns(
+            tasks.c.id, tasks.c.assignment_type, tasks.c.assigned_to, tasks.c.target_group_id, tasks.c.target_identity))
+        for principal in task_principals(task)
+    ]
+    if rows:
+        conn.execute(table.insert(), rows)
+    logger.info(f"Backfilled task_audience with {len(rows)} rows")
+
+
+def _task_user_progress_table(conn: Connection) -> None:
+    """创建 task_user_progress 并由 TaskRecord / JielongRecord / TaskCompletion 回填"""
+    table = TaskUserProgress.__table__
+    table.create(bind=conn, checkfirst=True)
+    conn.execute(table.delete())
+
+    records, jielong, completions = TaskRecord.__table__, JielongRecord.__table__, TaskCompletion.__table__
+    values = {}
+    for task_id, user_id, total in conn.execute(
+            select(records.c.task_id, records.c.user_id, func.sum(records.c.value)).group_by(records.c.task_id, records.c.user_id)):
+        values[(task_id, user_id)] = float(total or 0)
+    for task_id, user_id, count in conn.execute(
+            select(jielong.c.task_id, jielong.c.user_id, func.count()).group_by(jielong.c.task_id, jielong.c.user_id)):
+        values[(task_id, user_id)] = float(count)
+    completed = set(conn.execute(
+        select(completions.c.task_id, completions.c.user_id).where(completions.c.is_completed == True).distinct()).all())
+    for key in completed:
+        values.setdefault(key, 1.0)
+    if not values:
+        return
+
+    tasks = Task.__table__
+    task_rows = {row.id: row for row in conn.execute(select(
+        tasks.c.id, tasks.c.task_type, tasks.c.target_amount, tasks.c.target_quantity,
+        tasks.c.jielong_target_count, tasks.c.jielong_config))}
+    rows = []
+    for (task_id, user_id), value in values.items():
+        task = task_rows.get(task_id)
+        if task is None:
+            continue
+        target = task_personal_target(task, user_id)
+        if getattr(task.task_type, "value", task.task_type) == "checkbox":
+            is_completed = (task_id, user_id) in completed
+            value = 1.0 if is_completed else 0.0
+        else:
+            is_completed = bool(target and target > 0 and value >= target)
+        rows.append({"task_id": task_id, "user_id": user_id, "current_value": value,
+                     "target_value": target, "is_completed": is_completed})
+    if rows:
+        conn.execute(table.insert(), rows)
+    logger.info(f"Backfilled task_user_progress with {len(rows)} rows")
+
+
+def _progress_idempotency_keys(conn: Connection) -> None:
+    for table, model, index in (("task_records", TaskRecord, "ux_task_records_idempotency"),
+                                ("jielong_records", JielongRecord, "ux_jielong_records_idempotency")):
+        _add_missing_columns(conn, table, [("idempotency_key", "VARCHAR(64)")])
+        _create_index(conn, model, index)
+
+
+def _jielong_records_task_student_index(conn: Connection) -> None:
+    _create_index(conn, JielongRecord, "ix_jielong_records_task_student")
+
+
+def _record_tables_task_id_indexes(conn: Connection) -> None:
+    _create_index(conn, TaskRecord, "ix_task_records_task_id")
+    _create_index(conn, JielongRecord, "ix_jielong_records_task_id")
+    _create_index(conn, TaskCompletion, "ix_task_completions_task_id")
+
+
+def _task_search_index(conn: Connection) -> None:
+    install_task_search(conn)
+
+
+def _task_tags_table(conn: Connection) -> None:
+    """创建 task_tags 并按现有任务的 tags 回填"""
+    table = TaskTag.__table__
+    table.create(bind=conn, checkfirst=True)
+    conn.execute(table.delete())
+    tasks = Task.__table__
+    rows = [
+        {"task_id": task_id, "tag": tag}
+        for task_id, tags in conn.execute(select(tasks.c.id, tasks.c.tags).where(tasks.c.tags.isnot(None)))
+        for tag in task_tag_values(tags)
+    ]
+    if rows:
+        conn.execute(table.insert(), rows)
+    logger.info(f"Backfilled task_tags with {len(rows)} rows")
+
+
+def _tasks_overdue_column(conn: Connection) -> None:
+    """新增 tasks.is_overdue 及索引，并立即执行一轮标记"""
+    _add_missing_columns(conn, "tasks", [("is_overdue", "BOOLEAN NOT NULL DEFAULT FALSE")])
+    _create_index(conn, Task, "ix_tasks_overdue_due_date")
+    for stmt in overdue_updates(datetime.utcnow()):
+        conn.execute(stmt)
+
+
+def _task_search_trigram_index(conn: Connection) -> None:
+    install_task_search_trigram(conn)
+
+
+def _tasks_created_at_nulls_last_index(conn: Connection) -> None:
+    """PostgreSQL 倒序默认 NULLS FIRST，列表按 created_at DESC NULLS LAST 排序需要对应顺序的索引；
+    SQLite 中 NULL 最小，DESC NULLS LAST 即默认顺序，ix_tasks_created_at_id 已可用（且不支持在索引中声明 NULLS）"""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_tasks_created_at_id_nulls_last "
+            "ON tasks (created_at DESC NULLS LAST, id DESC)"
+        ))
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "create_all", _create_all),
+    Migration(2, "daily_report_sales_columns", _daily_report_sales_columns),
+    Migration(3, "monthly_goal_target_columns", _monthly_goal_target_columns),
+    Migration(4, "users_password_column", _users_password_column),
+    Migration(5, "users_avatar_column", _users_avatar_column),
+    Migration(6, "default_admin_user", _default_admin_user),
+    Migration(7, "default_ai_functions", _default_ai_functions),
+    Migration(8, "jielong_records_task_user_index", _jielong_records_task_user_index),
+    Migration(9, "tasks_created_at_id_index", _tasks_created_at_id_index),
+    Migration(10, "task_audience_table", _task_audience_table),
+    Migration(11, "task_user_progress_table", _task_user_progress_table),
+    Migration(12, "progress_idempotency_keys", _progress_idempotency_keys),
+    Migration(13, "jielong_records_task_student_index", _jielong_records_task_student_index),
+    Migration(14, "record_tables_task_id_indexes", _record_tables_task_id_indexes),
+    Migration(15, "task_search_index", _task_search_index),
+    Migration(16, "task_tags_table", _task_tags_table),
+    Migration(17, "tasks_overdue_column", _tasks_overdue_column),
+    Migration(18, "task_search_trigram_index", _task_search_trigram_index),
+    Migration(19, "tasks_created_at_nulls_last_index", _tasks_created_at_nulls_last_index),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+# ==================== 执行器 ====================
+
+def _ensure_version_table(conn: Connection) -> None:
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        " version INTEGER PRIMARY KEY,"
+        " name VARCHAR(100) NOT NULL,"
+        " applied_at VARCHAR(32) NOT NULL,"
+        " duration_ms FLOAT)"
+    ))
+
+
+def get_current_version(bind: Engine = default_engine) -> int:
+    """返回已应用的最高版本；schema_version 表不存在时返回 0"""
+    try:
+        with bind.connect() as conn:
+            return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        return 0
+
+
+def needs_migration(bind: Engine = default_engine) -> bool:
+    return get_current_version(bind) < LATEST_VERSION
+
+
+def run_migrations(bind: Engine = default_engine, target: Optional[int] = None) -> List[dict]:
+    """应用所有未执行的迁移，返回本次执行的步骤及耗时"""
+    target = LATEST_VERSION if target is None else target
+    applied = []
+    with bind.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": _PG_LOCK_KEY})
+            conn.commit()
+        try:
+            _ensure_version_table(conn)
+            conn.commit()
+            done = {v for (v,) in conn.execute(text("SELECT version FROM schema_version"))}
+            conn.commit()
+            for migration in MIGRATIONS:
+                if migration.version in done or migration.version > target:
+                    continue
+                start = time.perf_counter()
+                try:
+                    # 先开启事务：步骤中的 Session 会加入该事务而不是自行回滚
+                    if not conn.in_transaction():
+                        conn.begin()
+                    migration.apply(conn)
+                except Exception:
+                    # 步骤本身的失败（含其中的 IntegrityError）一律视为迁移失败
+                    conn.rollback()
+                    logger.exception(f"Migration {migration.version:04d}_{migration.name} failed")
+                    raise
+                duration_ms = round((time.perf_counter() - start) * 1000, 3)
+                try:
+                    conn.execute(
+                        text("INSERT INTO schema_version (version, name, applied_at, duration_ms) VALUES (:v, :n, :t, :d)"),
+                        {"v": migration.version, "n": migration.name, "t": datetime.utcnow().isoformat(), "d": duration_ms},
+                    )
+                    conn.commit()
+                except IntegrityError:
+                    # 版本号主键冲突：其他进程已并发执行并记录该版本，放弃本进程的同一步骤
+                    conn.rollback()
+                    continue
+                except Exception:
+                    conn.rollback()
+                    logger.exception(f"Migration {migration.version:04d}_{migration.name} failed")
+                    raise
+                logger.info(f"Applied migration {migration.version:04d}_{migration.name} ({duration_ms} ms)")
+                applied.append({"version": migration.version, "name": migration.name, "duration_ms": duration_ms})
+        finally:
+            if conn.dialect.name == "postgresql":
+                conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _PG_LOCK_KEY})
+                conn.commit()
+    return applied
+
+
+def run_migrations_if_needed(bind: Engine = default_engine) -> List[dict]:
+    """启动时调用：版本已是最新时只执行一次查询"""
+    if not needs_migration(bind):
+        return []
+    return run_migrations(bind)
+
+
+def migration_status(bind: Engine = default_engine) -> dict:
+    current = get_current_version(bind)
+    return {
+        "current_version": current,
+        "latest_version": LATEST_VERSION,
+        "pending": [f"{m.version:04d}_{m.name}" for m in MIGRATIONS if m.version > current],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(prog="python -m app.migrations", description="数据库迁移")
+    parser.add_argument("command", nargs="?", default="upgrade", choices=["upgrade", "status"])
+    parser.add_argument("--target", type=int, default=None, help="迁移到指定版本（默认最新）")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "upgrade":
+        applied = run_migrations(target=args.target)
+        print(json.dumps({"applied": applied, **migration_status()}, ensure_ascii=False, indent=2))
+    else:
+        print(json.dumps(migration_status(), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,10 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, BigInteger, Text, Enum, JSON, Float, Date
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, BigInteger, Text, Enum, JSON, Float, Date, Index, event, inspect
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import false, func
 from .db import Base
 import enum
+from datetime import datetime, timezone
+from typing import Optional
 
 # 用户权限级别枚举
 class UserRole(str, enum.Enum):
@@ -270,6 +272,8 @@ class Task(Base):
     start_time = Column(DateTime(timezone=True), nullable=True)
     end_time = Column(DateTime(timezone=True), nullable=True)
     due_date = Column(DateTime(timezone=True), nullable=True)
+    # 是否逾期（已过截止时间且未完成 / 未取消）：由后台调度批量维护，读取方直接按此列过滤
+    is_overdue = Column(Boolean, nullable=False, default=False, server_default=false())
 
     # 创建信息
     created_by = Column(BigInteger, ForeignKey("users.id"), nullable=False)
@@ -280,29 +284,20 @@ class Task(Base):
     records = relationship("TaskRecord", back_populates="task", cascade="all, delete-orphan")
     jielong_records = relationship("JielongRecord", back_populates="task", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # 任务列表按 (created_at, id) 倒序的游标分页
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        # 逾期调度：按 (is_overdue, due_date) 范围查找待标记 / 待清除的任务
+        Index("ix_tasks_overdue_due_date", "is_overdue", "due_date"),
+    )
+
     def is_assigned_to_user(self, user: "User") -> bool:
         """
         检查此任务是否对指定用户可见。
         注意：这里的 'user' 是一个 User ORM 对象。
+        规则与 task_audience 表一致：任务受众主体与用户主体有交集即可见。
         """
-        # 情况1: 任务分配给所有人
-        if self.assignment_type == TaskAssignmentType.ALL:
-            return True
-
-        # 情况2: 任务直接分配给该用户
-        if self.assignment_type == TaskAssignmentType.USER:
-            return self.assigned_to == user.id
-
-        # 情况3: 任务分配给该用户所在的用户组
-        if self.assignment_type == TaskAssignmentType.GROUP:
-            return user.group_id is not None and self.target_group_id == user.group_id
-
-        # 情况4: 任务分配给该用户的身份类型
-        if self.assignment_type == TaskAssignmentType.IDENTITY:
-            return user.identity_type is not None and self.target_identity == user.identity_type
-
-        # 其他情况或数据不一致时，默认为不可见
-        return False
+        return bool(task_principals(self) & set(user_principals(user)))
 
     def get_progress_percentage(self) -> float:
         """获取任务进度百分比"""
@@ -329,6 +324,209 @@ class Task(Base):
         return False
 
 
+def task_principals(task) -> set:
+    """任务的受众主体（ALL / USER / GROUP / IDENTITY 四种分配方式各对应一种主体）
+
+    数据不一致（如 USER 类型但未指定用户）时返回空集，即对任何人不可见。
+    """
+    assignment_type = task.assignment_type
+    if assignment_type == TaskAssignmentType.ALL:
+        return {"all"}
+    if assignment_type == TaskAssignmentType.USER and task.assigned_to is not None:
+        return {f"user:{task.assigned_to}"}
+    if assignment_type == TaskAssignmentType.GROUP and task.target_group_id is not None:
+        return {f"group:{task.target_group_id}"}
+    if assignment_type == TaskAssignmentType.IDENTITY and task.target_identity:
+        return {f"identity:{task.target_identity}"}
+    return set()
+
+
+def user_principals(user) -> list:
+    """用户所属的主体；用户换组或换身份时主体随之变化，task_audience 无需更新"""
+    principals = ["all", f"user:{user.id}"]
+    if getattr(user, "group_id", None):
+        principals.append(f"group:{user.group_id}")
+    if getattr(user, "identity_type", None):
+        principals.append(f"identity:{user.identity_type}")
+    return principals
+
+
+class TaskAudience(Base):
+    """任务受众倒排索引：主体 -> 任务
+
+    由 Task 的 ORM 事件自动维护（新建 / 修改分配 / 删除），“用户可见的任务”即按主体主键查找。
+    """
+    __tablename__ = "task_audience"
+
+    principal = Column(String(64), primary_key=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+
+_TASK_AUDIENCE_FIELDS = ("assignment_type", "assigned_to", "target_group_id", "target_identity")
+
+
+def _write_task_audience(connection, task, replace: bool) -> None:
+    table = TaskAudience.__table__
+    if replace:
+        connection.execute(table.delete().where(table.c.task_id == task.id))
+    rows = [{"principal": p, "task_id": task.id} for p in task_principals(task)]
+    if rows:
+        connection.execute(table.insert(), rows)
+
+
+@event.listens_for(Task, "after_insert")
+def _task_audience_after_insert(mapper, connection, target):
+    _write_task_audience(connection, target, replace=False)
+
+
+@event.listens_for(Task, "after_update")
+def _task_audience_after_update(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in _TASK_AUDIENCE_FIELDS):
+        _write_task_audience(connection, target, replace=True)
+
+
+@event.listens_for(Task, "after_delete")
+def _task_audience_after_delete(mapper, connection, target):
+    table = TaskAudience.__table__
+    connection.execute(table.delete().where(table.c.task_id == target.id))
+
+
+OVERDUE_EXEMPT_STATUSES = (TaskStatus.DONE, TaskStatus.CANCELLED)
+_OVERDUE_FIELDS = ("due_date", "status", "is_completed")
+
+
+def task_is_overdue(task, now: datetime) -> bool:
+    """已过截止时间且未完成 / 未取消（now 为不带时区的 UTC 时间，与库中存储一致）"""
+    due = task.due_date
+    if due is None or task.status in OVERDUE_EXEMPT_STATUSES or task.is_completed:
+        return False
+    if due.tzinfo is not None:
+        due = due.astimezone(timezone.utc).replace(tzinfo=None)
+    return due < now
+
+
+@event.listens_for(Task, "before_update")
+def _task_overdue_before_update(mapper, connection, target):
+    # 完成 / 取消 / 改截止时间后立即更新逾期标记，不必等下一轮调度
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in _OVERDUE_FIELDS):
+        target.is_overdue = task_is_overdue(target, datetime.utcnow())
+
+
+TAG_MAX_LENGTH = 64
+
+
+def task_tag_values(tags) -> list:
+    """tags JSON -> 去重后的标签列表（去除首尾空白，忽略空值与非字符串，保持原顺序）"""
+    if not isinstance(tags, list):
+        return []
+    values = (t.strip()[:TAG_MAX_LENGTH] for t in tags if isinstance(t, str))
+    return list(dict.fromkeys(t for t in values if t))
+
+
+class TaskTag(Base):
+    """任务标签倒排索引：由 Task.tags 归一化而来，按标签过滤与分面统计直接查本表
+
+    由 Task 的 ORM 事件自动维护（新建 / 修改 tags / 删除）。
+    """
+    __tablename__ = "task_tags"
+
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String(TAG_MAX_LENGTH), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_task_tags_tag_task", "tag", "task_id"),
+    )
+
+
+def _write_task_tags(connection, task, replace: bool) -> None:
+    table = TaskTag.__table__
+    if replace:
+        connection.execute(table.delete().where(table.c.task_id == task.id))
+    rows = [{"task_id": task.id, "tag": tag} for tag in task_tag_values(task.tags)]
+    if rows:
+        connection.execute(table.insert(), rows)
+
+
+@event.listens_for(Task, "after_insert")
+def _task_tags_after_insert(mapper, connection, target):
+    _write_task_tags(connection, target, replace=False)
+
+
+@event.listens_for(Task, "after_update")
+def _task_tags_after_update(mapper, connection, target):
+    if inspect(target).attrs.tags.history.has_changes():
+        _write_task_tags(connection, target, replace=True)
+
+
+@event.listens_for(Task, "after_delete")
+def _task_tags_after_delete(mapper, connection, target):
+    table = TaskTag.__table__
+    connection.execute(table.delete().where(table.c.task_id == target.id))
+
+
+def jielong_personal_targets(task) -> dict:
+    """解析 jielong_config.personal_targets，键统一为字符串（兼容 str/int 键）"""
+    cfg = task.jielong_config if isinstance(task.jielong_config, dict) else {}
+    targets = cfg.get("personal_targets")
+    return {str(k): v for k, v in targets.items()} if isinstance(targets, dict) else {}
+
+
+def jielong_aggregate_progress(task, participants) -> tuple:
+    """接龙汇总 (目标, 进度)：默认目标 × 参与人数，再按 personal_targets 中属于参与者的条目修正（只遍历配置，不遍历参与者）"""
+    if not participants:
+        return None, None
+    default_target = int(task.jielong_target_count or 0)
+    total_target = default_target * len(participants)
+    participant_keys = {str(uid) for uid in participants}
+    for uid, t in jielong_personal_targets(task).items():
+        if uid in participant_keys and t:
+            try:
+                total_target += int(t) - default_target
+            except (TypeError, ValueError):
+                pass
+    if total_target <= 0:
+        return total_target, None
+    return total_target, round(float(task.jielong_current_count or 0) / float(total_target), 4)
+
+
+def task_personal_target(task, user_id) -> Optional[float]:
+    """任务对单个用户的目标值：金额 / 数量取任务目标，接龙优先取 personal_targets，勾选为 1"""
+    task_type = getattr(task.task_type, "value", task.task_type)
+    if task_type == "amount":
+        return task.target_amount
+    if task_type == "quantity":
+        return task.target_quantity
+    if task_type == "jielong":
+        return jielong_personal_targets(task).get(str(user_id)) or task.jielong_target_count
+    if task_type == "checkbox":
+        return 1
+    return None
+
+
+class TaskUserProgress(Base):
+    """按 (任务, 用户) 增量维护的个人进度汇总
+
+    current_value：金额 / 数量为累计提交值，接龙为参与次数，勾选为 0/1；
+    由 task_crud 在写入 TaskRecord / JielongRecord 及勾选切换时于同一事务中更新。
+    """
+    __tablename__ = "task_user_progress"
+
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True, index=True)
+    current_value = Column(Float, nullable=False, default=0.0)
+    target_value = Column(Float, nullable=True)
+    is_completed = Column(Boolean, nullable=False, default=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+@event.listens_for(Task, "after_delete")
+def _task_user_progress_after_delete(mapper, connection, target):
+    table = TaskUserProgress.__table__
+    connection.execute(table.delete().where(table.c.task_id == target.id))
+
+
 class TaskJielongEntry(Base):
     """接龙任务参与记录"""
     __tablename__ = "task_jielong_entries"
@@ -362,6 +560,10 @@ class TaskCompletion(Base):
     # 时间信息
     completed_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_task_completions_task_id", "task_id"),
+    )
+
 
 class DailyReport(Base):
     """日报模型"""
@@ -734,6 +936,7 @@ class TaskRecord(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     value = Column(Float, nullable=False)
+    idempotency_key = Column(String(64), nullable=True)  # 客户端重试去重
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -741,6 +944,12 @@ class TaskRecord(Base):
     task = relationship("Task")
     owner = relationship("User")
 
+    __table_args__ = (
+        Index("ux_task_records_idempotency", "task_id", "user_id", "idempotency_key", unique=True),
+        # 按任务查询记录（列表、ETag 水位）
+        Index("ix_task_records_task_id", "task_id"),
+    )
+
 
 class JielongRecord(Base):
     """记录接龙任务的每次参与详情"""
@@ -750,6 +959,7 @@ class JielongRecord(Base):
     student_id = Column(String, index=True)
     notes = Column(String, nullable=True)
     intention = Column(String, nullable=True)
+    idempotency_key = Column(String(64), nullable=True)  # 客户端重试去重
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -757,6 +967,15 @@ class JielongRecord(Base):
     task = relationship("Task")
     owner = relationship("User")
 
+    __table_args__ = (
+        # 按 (任务, 用户) 统计个人接龙数
+        Index("ix_jielong_records_task_user", "task_id", "user_id"),
+        Index("ux_jielong_records_idempotency", "task_id", "user_id", "idempotency_key", unique=True),
+        # 批量导入按 (任务, 学号) 去重
+        Index("ix_jielong_records_task_student", "task_id", "student_id"),
+        Index("ix_jielong_records_task_id", "task_id"),
+    )
+
 
 class MonthlyGoal(Base):
     """月度目标模型：按身份与作用域设置当月目标（金额/人数）。"""
@@ -98,6 +98,7 @@ class TaskResponse(BaseModel):
     due_date: Optional[datetime] = None
     status: str
     is_completed: Optional[bool] = None
+    is_overdue: Optional[bool] = None
     created_by: int
     created_at: datetime
     updated_at: Optional[datetime] = None
@@ -142,9 +143,10 @@ class TaskResponse(BaseModel):
 
 class PaginatedTaskResponse(BaseModel):
     items: List[TaskResponse]
-    total: int
+    total: Optional[int] = None  # 游标模式下默认不统计总数
     page: int
     size: int
+    next_cursor: Optional[str] = None  # 游标模式：下一页游标，没有更多数据时为 None
 
 # AI智能体相关schemas
 class AIAgentCreateRequest(BaseModel):
@@ -510,9 +512,10 @@ class PaginatedUserGroupResponse(BaseModel):
 # 任务分页响应schema
 class PaginatedTaskResponse(BaseModel):
     items: List[TaskResponse]
-    total: int
+    total: Optional[int] = None  # 游标模式下默认不统计总数
     page: int
     size: int
+    next_cursor: Optional[str] = None  # 游标模式：下一页游标，没有更多数据时为 None
 
 # 组别成员管理schema
 class AddMembersRequest(BaseModel):
@@ -596,6 +599,45 @@ class JielongParticipationCreate(BaseModel):
 class TaskProgressUpdate(BaseModel):
     value: float
 
+# 批量进度提交（金额/数量任务）
+class TaskProgressBatchItem(BaseModel):
+    task_id: int
+    value: float
+    user_id: Optional[int] = None  # 代录：管理员为组员提交，默认本人
+    idempotency_key: Optional[str] = Field(default=None, max_length=64)
+
+class TaskProgressBatchRequest(BaseModel):
+    items: List[TaskProgressBatchItem] = Field(..., min_length=1, max_length=500)
+
+class TaskProgressBatchItemResult(BaseModel):
+    index: int
+    task_id: int
+    user_id: Optional[int] = None
+    ok: bool
+    duplicate: bool = False  # 幂等键已提交过，未重复累加
+    error: Optional[str] = None
+
+class TaskProgressBatchResponse(BaseModel):
+    accepted: int
+    rejected: int
+    results: List[TaskProgressBatchItemResult]
+
+class TaskSearchResponse(BaseModel):
+    items: List[TaskResponse]
+    count: int
+
+class TaskTagFacet(BaseModel):
+    tag: str
+    count: int
+
+class TaskTagFacetResponse(BaseModel):
+    items: List[TaskTagFacet]
+
+class TaskFanOutResponse(BaseModel):
+    """按分配对象拆分创建任务的结果：ids 与 assigned_user_ids / assigned_group_ids（去重后）一一对应"""
+    count: int
+    ids: List[int]
+
 # 通知已读同步
 class NotificationReadSyncRequest(BaseModel):
     ids: List[str]
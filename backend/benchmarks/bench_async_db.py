@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+并发请求延迟基准：同步 Session（在 async def 中直接查询） vs AsyncSession
+
+场景：若干“慢”分析请求（分组聚合）与大量轻量请求（/ping）并发到达同一个 worker。
+同步模式下分析查询会阻塞事件循环，/ping 的延迟被拉长；异步模式下两者可以交错执行。
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_async_db.py --rows 200000 --slow 20 --pings 200
+
+输出为 JSON，便于对比不同版本的结果。
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def _summary(latencies_ms):
+    return {
+        "count": len(latencies_ms),
+        "p50_ms": round(_percentile(latencies_ms, 50), 2),
+        "p99_ms": round(_percentile(latencies_ms, 99), 2),
+        "max_ms": round(max(latencies_ms), 2) if latencies_ms else 0.0,
+        "mean_ms": round(statistics.mean(latencies_ms), 2) if latencies_ms else 0.0,
+    }
+
+
+def _seed(db_path: str, rows: int) -> None:
+    import sqlite3
+
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE tasks (id INTEGER PRIMARY KEY, status TEXT, priority TEXT, task_type TEXT, assigned_to INTEGER)"
+    )
+    statuses = ["pending", "processing", "done", "cancelled"]
+    priorities = ["low", "medium", "high", "urgent"]
+    types = ["amount", "quantity", "jielong", "checkbox"]
+    rnd = random.Random(42)
+    conn.executemany(
+        "INSERT INTO tasks (status, priority, task_type, assigned_to) VALUES (?, ?, ?, ?)",
+        (
+            (rnd.choice(statuses), rnd.choice(priorities), rnd.choice(types), rnd.randint(1, 500))
+            for _ in range(rows)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def build_app(db_url: str):
+    from fastapi import FastAPI, Depends
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import sessionmaker, Session
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+    from app.db import _to_async_url
+
+    engine = create_engine(db_url, connect_args={"check_same_thread": False})
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+    async_engine = create_async_engine(_to_async_url(db_url))
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    stats_sql = text(
+        "SELECT status, priority, task_type, COUNT(*) FROM tasks GROUP BY status, priority, task_type"
+    )
+
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/stats/sync")
+    async def stats_sync(db: Session = Depends(get_db)):
+        # 与改造前 main.py 一致：async def 中直接调用同步 Session
+        return {"rows": len(db.execute(stats_sql).all())}
+
+    @app.get("/stats/async")
+    async def stats_async(db: AsyncSession = Depends(get_async_db)):
+        return {"rows": len((await db.execute(stats_sql)).all())}
+
+    async def dispose():
+        await async_engine.dispose()
+        engine.dispose()
+
+    return app, dispose
+
+
+async def run_mode(app, mode: str, slow: int, pings: int, interval: float = 0.005):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # 预热连接池
+        await client.get(f"/stats/{mode}")
+
+        slow_latencies, ping_latencies = [], []
+
+        async def timed(path, sink, scheduled_at=None):
+            # scheduled_at：计划发送时间；事件循环被阻塞导致的发送延迟也计入延迟
+            t0 = scheduled_at if scheduled_at is not None else time.perf_counter()
+            resp = await client.get(path)
+            sink.append((time.perf_counter() - t0) * 1000)
+            resp.raise_for_status()
+
+        async def slow_batch():
+            await asyncio.gather(*(timed(f"/stats/{mode}", slow_latencies) for _ in range(slow)))
+
+        async def ping_stream(done: asyncio.Event):
+            # 分析请求进行期间每隔 interval 发一次 ping，直到分析请求全部完成
+            sent = 0
+            scheduled_at = time.perf_counter()
+            while not done.is_set() or sent < pings:
+                await timed("/ping", ping_latencies, scheduled_at)
+                sent += 1
+                scheduled_at = time.perf_counter() + interval
+                await asyncio.sleep(interval)
+
+        done = asyncio.Event()
+        t0 = time.perf_counter()
+        pingers = [asyncio.create_task(ping_stream(done)) for _ in range(4)]
+        await slow_batch()
+        done.set()
+        await asyncio.gather(*pingers)
+        wall = (time.perf_counter() - t0) * 1000
+
+    return {
+        "wall_ms": round(wall, 2),
+        "analytics": _summary(slow_latencies),
+        "ping": _summary(ping_latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000, help="tasks 表数据量")
+    parser.add_argument("--slow", type=int, default=20, help="并发的分析请求数")
+    parser.add_argument("--pings", type=int, default=50, help="每个 ping 协程的最少请求数（共 4 个协程）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        _seed(db_path, args.rows)
+        app, dispose = build_app(f"sqlite:///{db_path}")
+
+        async def run_all():
+            try:
+                return {
+                    "sync_session": await run_mode(app, "sync", args.slow, args.pings),
+                    "async_session": await run_mode(app, "async", args.slow, args.pings),
+                }
+            finally:
+                await dispose()
+
+        results = asyncio.run(run_all())
+
+    print(json.dumps({"benchmark": "async_db", "params": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+登录洪峰基准：同步校验密码（在 async def 中直接调用） vs 线程池校验
+
+场景：早高峰大量用户同时登录，同时有轻量请求（/ping）到达同一个 worker。
+同步模式下每次 PBKDF2 校验都会占住事件循环，登录请求被串行化，/ping 也一起排队；
+线程池模式下校验在 PASSWORD_HASH_WORKERS 个线程中并行执行，事件循环保持响应。
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_login_burst.py --logins 200 --rounds 29000
+
+输出为 JSON，便于对比不同版本的结果。
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def _summary(latencies_ms):
+    return {
+        "count": len(latencies_ms),
+        "p50_ms": round(_percentile(latencies_ms, 50), 2),
+        "p99_ms": round(_percentile(latencies_ms, 99), 2),
+        "max_ms": round(max(latencies_ms), 2) if latencies_ms else 0.0,
+        "mean_ms": round(statistics.mean(latencies_ms), 2) if latencies_ms else 0.0,
+    }
+
+
+def build_app(users: int):
+    from fastapi import FastAPI, HTTPException
+    from pydantic import BaseModel
+    from app.core import security
+
+    # 预先生成用户密码哈希（模拟数据库中的 hashed_password）
+    hashes = {f"user{i}": security.get_password_hash(f"pw{i}") for i in range(min(users, 20))}
+
+    class LoginRequest(BaseModel):
+        username: str
+        password: str
+
+    def lookup(username: str) -> str:
+        return hashes[f"user{int(username[4:]) % len(hashes)}"]
+
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.post("/login/sync")
+    async def login_sync(req: LoginRequest):
+        # 与改造前 main.py 一致：在事件循环中直接校验
+        if not security.verify_password(req.password, lookup(req.username)):
+            raise HTTPException(status_code=401)
+        return {"ok": True}
+
+    @app.post("/login/async")
+    async def login_async(req: LoginRequest):
+        verified, _ = await security.verify_and_update_password_async(req.password, lookup(req.username))
+        if not verified:
+            raise HTTPException(status_code=401)
+        return {"ok": True}
+
+    return app
+
+
+async def run_mode(app, mode: str, logins: int, interval: float = 0.005):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        login_latencies, ping_latencies = [], []
+
+        async def login(i, arrived_at):
+            # 所有登录请求同时到达：从到达时间开始计时，排队等待事件循环的时间也计入
+            idx = i % 20
+            resp = await client.post(f"/login/{mode}", json={"username": f"user{idx}", "password": f"pw{idx}"})
+            login_latencies.append((time.perf_counter() - arrived_at) * 1000)
+            resp.raise_for_status()
+
+        async def ping_stream(done: asyncio.Event):
+            # 从计划发送时间开始计时：事件循环被阻塞导致的发送延迟也计入
+            scheduled_at = time.perf_counter()
+            while not done.is_set():
+                await client.get("/ping")
+                ping_latencies.append((time.perf_counter() - scheduled_at) * 1000)
+                scheduled_at = time.perf_counter() + interval
+                await asyncio.sleep(interval)
+
+        done = asyncio.Event()
+        t0 = time.perf_counter()
+        pinger = asyncio.create_task(ping_stream(done))
+        await asyncio.sleep(interval)  # 让 ping 协程先进入稳定节奏
+        arrived_at = time.perf_counter()
+        await asyncio.gather(*(login(i, arrived_at) for i in range(logins)))
+        done.set()
+        await pinger
+        wall = (time.perf_counter() - t0) * 1000
+
+    return {
+        "wall_ms": round(wall, 2),
+        "logins_per_sec": round(logins / (wall / 1000), 1),
+        "login": _summary(login_latencies),
+        "ping": _summary(ping_latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200, help="并发登录请求数")
+    parser.add_argument("--rounds", type=int, default=None, help="PBKDF2 迭代次数（默认读取 PASSWORD_HASH_ROUNDS）")
+    parser.add_argument("--workers", type=int, default=None, help="哈希线程数（默认读取 PASSWORD_HASH_WORKERS）")
+    args = parser.parse_args()
+
+    # security 模块在导入时读取环境变量
+    if args.rounds is not None:
+        os.environ["PASSWORD_HASH_ROUNDS"] = str(args.rounds)
+    if args.workers is not None:
+        os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+
+    from app.core import security
+
+    app = build_app(args.logins)
+    results = {
+        "sync_verify": asyncio.run(run_mode(app, "sync", args.logins)),
+        "threadpool_verify": asyncio.run(run_mode(app, "async", args.logins)),
+    }
+    params = dict(vars(args), rounds=security.PASSWORD_HASH_ROUNDS, workers=security.PASSWORD_HASH_WORKERS)
+    print(json.dumps({"benchmark": "login_burst", "params": params, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
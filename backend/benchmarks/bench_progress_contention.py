@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+进度计数器并发压测：大量并行提交同一个热门任务，校验累计值精确无误
+
+场景：
+- amount：N 次并行金额提交（每个 Idempotency-Key 重复提交一次，模拟客户端重试）
+- jielong：N 次并行接龙参与（同样带重复提交）
+- legacy：改造前的“读取 → Python 中累加 → 提交”写法，用于对照丢失更新的数量
+
+每个提交使用独立的会话（等同于独立请求），在线程池中执行。
+atomic 场景的累计值与个人进度汇总必须与唯一提交数完全一致，否则以非零状态退出。
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_progress_contention.py --submissions 2000 --workers 32
+
+输出为 JSON，便于对比不同版本的结果。
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def _run_parallel(fn, count: int, workers: int) -> dict:
+    errors = []
+
+    def call(i):
+        try:
+            fn(i)
+        except Exception as e:  # 统计失败而不是中断压测
+            errors.append(f"{type(e).__name__}: {e}")
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(call, range(count)))
+    wall = time.perf_counter() - t0
+    return {"submissions": count, "wall_ms": round(wall * 1000, 2),
+            "per_sec": round(count / wall, 1) if wall else None, "errors": len(errors), "sample_errors": errors[:3]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissions", type=int, default=2000, help="每个场景的提交次数（含重复提交）")
+    parser.add_argument("--workers", type=int, default=32, help="并发线程数")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmp.name, 'contention.db')}")
+    os.environ.setdefault("DB_POOL_SIZE", str(args.workers))
+
+    from app.db import SessionLocal, engine
+    from app.migrations import run_migrations
+    from app.models import Task, TaskType, TaskAssignmentType, TaskUserProgress, User
+    from app.crud import task_crud
+    from app.schemas import JielongParticipationCreate
+
+    run_migrations()
+    db = SessionLocal()
+    user = db.query(User).filter(User.username == "admin").first()
+    tasks = {}
+    for name, task_type in (("amount", TaskType.AMOUNT), ("jielong", TaskType.JIELONG), ("legacy", TaskType.AMOUNT)):
+        task = Task(title=f"contention-{name}", task_type=task_type, assignment_type=TaskAssignmentType.ALL,
+                    target_amount=1e9, jielong_target_count=10 ** 9, created_by=user.id)
+        db.add(task)
+        db.flush()
+        tasks[name] = task.id
+    db.commit()
+    user_id = user.id
+    db.close()
+
+    # 每个 key 提交两次：唯一提交数为 submissions / 2
+    unique = args.submissions // 2
+
+    def submit_amount(i):
+        with SessionLocal() as s:
+            if task_crud.log_task_progress(s, tasks["amount"], user_id, 1.0, idempotency_key=f"a-{i % unique}") is None:
+                raise RuntimeError("log_task_progress returned None")
+
+    def submit_jielong(i):
+        with SessionLocal() as s:
+            data = JielongParticipationCreate(student_id=f"s{i}", notes=None)
+            if task_crud.add_jielong_participation(s, tasks["jielong"], user_id, data, idempotency_key=f"j-{i % unique}") is None:
+                raise RuntimeError("add_jielong_participation returned None")
+
+    def submit_legacy(i):
+        # 改造前写法：读取后在 Python 中累加
+        with SessionLocal() as s:
+            task = s.query(Task).filter(Task.id == tasks["legacy"]).first()
+            task.current_amount = (task.current_amount or 0.0) + 1.0
+            s.commit()
+
+    results = {
+        "amount": _run_parallel(submit_amount, args.submissions, args.workers),
+        "jielong": _run_parallel(submit_jielong, args.submissions, args.workers),
+        "legacy": _run_parallel(submit_legacy, args.submissions, args.workers),
+    }
+
+    with SessionLocal() as s:
+        amount_task = s.get(Task, tasks["amount"])
+        jielong_task = s.get(Task, tasks["jielong"])
+        legacy_task = s.get(Task, tasks["legacy"])
+        results["amount"].update(expected=unique, total=amount_task.current_amount,
+                                 progress=s.get(TaskUserProgress, (tasks["amount"], user_id)).current_value)
+        results["jielong"].update(expected=unique, total=jielong_task.jielong_current_count,
+                                  progress=s.get(TaskUserProgress, (tasks["jielong"], user_id)).current_value)
+        results["legacy"].update(expected=args.submissions, total=legacy_task.current_amount,
+                                 lost_updates=args.submissions - int(legacy_task.current_amount or 0))
+    engine.dispose()
+    tmp.cleanup()
+
+    ok = all(
+        results[name]["errors"] == 0
+        and results[name]["total"] == results[name]["expected"] == results[name]["progress"]
+        for name in ("amount", "jielong")
+    )
+    print(json.dumps({"benchmark": "progress_contention", "params": vars(args), "ok": ok, "results": results},
+                     ensure_ascii=False, indent=2))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
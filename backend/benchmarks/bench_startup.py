@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+冷启动基准：在独立子进程中测量后端启动各阶段的耗时与内存
+
+每次运行启动一个全新的 Python 进程（模块缓存为空），依次记录：
+- 第三方依赖与 app.* 各模块的导入耗时（按导入顺序，后一个模块不含已导入部分）
+- 各数据库迁移步骤（原 _ensure_* 运行时检查）的耗时
+- app.main 导入时的迁移版本检查耗时
+- 启动事件耗时与首个请求（time-to-first-request，从进程启动计时）
+- 启动完成后的常驻内存（RSS）
+
+场景：
+- cold：全新数据库，执行全部迁移
+- warm：已迁移到最新版本的数据库（常规重启 / 扩容 worker）
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_startup.py --repeat 3
+
+输出为 JSON，便于跨版本追踪回归。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_PROCESS_START = time.perf_counter()
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+THIRD_PARTY_MODULES = ["pydantic", "sqlalchemy", "fastapi", "passlib.context"]
+APP_MODULES = ["app.db", "app.models", "app.schemas", "app.core.security", "app.migrations", "app.main"]
+
+
+def _rss_kb():
+    """当前常驻内存（KB）；非 Linux 平台回退到峰值 RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        except ImportError:
+            return None
+
+
+def _elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+# ==================== 子进程 ====================
+
+def child(out_path: str, migrate_first: bool) -> None:
+    import importlib
+
+    result = {"imports_ms": {}, "migrations": [], "rss_kb": {}}
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    try:
+        for name in THIRD_PARTY_MODULES + APP_MODULES[:-1]:
+            t0 = time.perf_counter()
+            importlib.import_module(name)
+            result["imports_ms"][name] = _elapsed_ms(t0)
+
+        # 单独执行迁移以获得逐步耗时；随后 app.main 导入时只剩一次版本检查
+        from app import migrations
+        if migrate_first:
+            t0 = time.perf_counter()
+            result["migrations"] = migrations.run_migrations()
+            result["migrations_total_ms"] = _elapsed_ms(t0)
+
+        t0 = time.perf_counter()
+        result["version_check_needed"] = migrations.needs_migration()
+        result["version_check_ms"] = _elapsed_ms(t0)
+
+        t0 = time.perf_counter()
+        main = importlib.import_module("app.main")
+        result["imports_ms"]["app.main"] = _elapsed_ms(t0)
+        result["route_count"] = len(main.app.routes)
+        result["rss_kb"]["after_import"] = _rss_kb()
+
+        from fastapi.testclient import TestClient
+
+        client = TestClient(main.app)
+        t0 = time.perf_counter()
+        client.__enter__()  # 触发 startup 事件
+        result["startup_event_ms"] = _elapsed_ms(t0)
+        try:
+            t0 = time.perf_counter()
+            resp = client.get("/health")
+            result["first_request_ms"] = _elapsed_ms(t0)
+            result["first_request_status"] = resp.status_code
+            result["time_to_first_request_ms"] = _elapsed_ms(_PROCESS_START)
+        finally:
+            client.__exit__(None, None, None)
+        result["rss_kb"]["after_first_request"] = _rss_kb()
+    except Exception as e:  # 记录失败阶段，而不是让父进程拿不到结果
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+# ==================== 父进程 ====================
+
+def _run_child(db_url: str, migrate_first: bool) -> dict:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+        out_path = tmp.name
+    env = dict(os.environ, DATABASE_URL=db_url, ACCESS_LOG_ENABLED="false", PYTHONDONTWRITEBYTECODE="1")
+    env.pop("ASYNC_DATABASE_URL", None)
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--child", "--out", out_path]
+    if migrate_first:
+        cmd.append("--migrate-first")
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=str(BACKEND_DIR), env=env, capture_output=True, text=True)
+    wall_ms = _elapsed_ms(t0)
+    try:
+        with open(out_path, encoding="utf-8") as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        result = {"error": (proc.stderr or "").strip()[-2000:] or f"exit code {proc.returncode}"}
+    finally:
+        if os.path.exists(out_path):
+            os.unlink(out_path)
+    result["process_wall_ms"] = wall_ms
+    return result
+
+
+def _median_summary(runs):
+    keys = ["process_wall_ms", "time_to_first_request_ms", "startup_event_ms", "version_check_ms", "migrations_total_ms"]
+    summary = {}
+    for key in keys:
+        values = [r[key] for r in runs if isinstance(r.get(key), (int, float))]
+        if values:
+            summary[key] = round(statistics.median(values), 2)
+    modules = {name for r in runs for name in r.get("imports_ms", {})}
+    summary["imports_ms"] = {
+        name: round(statistics.median([r["imports_ms"][name] for r in runs if name in r.get("imports_ms", {})]), 2)
+        for name in THIRD_PARTY_MODULES + APP_MODULES if name in modules
+    }
+    rss = [r["rss_kb"]["after_first_request"] for r in runs if r.get("rss_kb", {}).get("after_first_request")]
+    if rss:
+        summary["rss_kb_after_first_request"] = int(statistics.median(rss))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="每个场景的子进程运行次数")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    parser.add_argument("--migrate-first", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.out, args.migrate_first)
+        return
+
+    scenarios = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cold_runs = []
+        for i in range(args.repeat):
+            cold_runs.append(_run_child(f"sqlite:///{os.path.join(tmp, f'cold_{i}.db')}", migrate_first=True))
+        scenarios["cold"] = {"summary": _median_summary(cold_runs), "runs": cold_runs}
+
+        warm_db = f"sqlite:///{os.path.join(tmp, 'warm.db')}"
+        _run_child(warm_db, migrate_first=True)  # 准备已迁移的数据库
+        warm_runs = [_run_child(warm_db, migrate_first=False) for _ in range(args.repeat)]
+        scenarios["warm"] = {"summary": _median_summary(warm_runs), "runs": warm_runs}
+
+    print(json.dumps({"benchmark": "startup", "params": {"repeat": args.repeat}, "python": sys.version.split()[0],
+                      "scenarios": scenarios}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
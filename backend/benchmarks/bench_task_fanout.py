@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+多人分配建任务基准：逐个调用 POST /api/v1/tasks vs 一次调用 POST /api/v1/tasks/fan-out
+
+场景：给 N 个用户各布置一个相同的任务。
+- single：每个用户一次创建请求（每次独立提交，受众索引逐行写入）
+- fan_out：一次请求、一个事务，任务与受众索引各一次批量 INSERT
+
+两种方式创建的任务数与受众行数必须一致，否则以非零状态退出。
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_task_fanout.py --assignees 500 --rounds 3
+
+输出为 JSON，便于对比不同版本的结果。
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--assignees", type=int, default=500, help="每轮分配的用户数")
+    parser.add_argument("--rounds", type=int, default=3, help="每种方式重复的轮数")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmp.name, 'fanout.db')}")
+    os.environ.setdefault("ACCESS_LOG_ENABLED", "false")
+    os.environ["TASK_FAN_OUT_MAX_ASSIGNEES"] = str(max(args.assignees, 1000))
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from app.db import SessionLocal, engine
+    from app.models import Task, TaskAudience, User
+    from app.core.security import get_password_hash
+    import app.main
+
+    statements = [0]
+    event.listen(engine, "before_cursor_execute", lambda *_: statements.__setitem__(0, statements[0] + 1))
+
+    results = {}
+    with TestClient(app.main.app) as client:
+        with SessionLocal() as s:
+            hashed = get_password_hash("bench")
+            users = [User(username=f"fanout{i}", hashed_password=hashed, is_active=True) for i in range(args.assignees)]
+            s.add_all(users)
+            s.commit()
+            user_ids = [u.id for u in users]
+        client.post("/api/v1/auth/login", json={"username": "admin", "password": "admin123"})
+
+        body = {"title": "fan-out", "task_type": "amount", "assignment_type": "user", "target_amount": 100}
+
+        def single():
+            for user_id in user_ids:
+                r = client.post("/api/v1/tasks", json={**body, "assigned_user_ids": [user_id]})
+                r.raise_for_status()
+
+        def fan_out():
+            r = client.post("/api/v1/tasks/fan-out", json={**body, "assigned_user_ids": user_ids})
+            r.raise_for_status()
+            if r.json()["count"] != len(user_ids):
+                raise RuntimeError("fan-out created fewer tasks than assignees")
+
+        for name, fn in (("single", single), ("fan_out", fan_out)):
+            walls = []
+            statements[0] = 0
+            for _ in range(args.rounds):
+                t0 = time.perf_counter()
+                fn()
+                walls.append(time.perf_counter() - t0)
+            best = min(walls)
+            results[name] = {
+                "tasks_per_round": len(user_ids),
+                "best_ms": round(best * 1000, 2),
+                "tasks_per_sec": round(len(user_ids) / best, 1) if best else None,
+                "statements_per_round": statements[0] // args.rounds,
+            }
+
+        with SessionLocal() as s:
+            total_tasks = s.query(Task).filter(Task.title == "fan-out").count()
+            total_audience = (
+                s.query(TaskAudience)
+                .join(Task, Task.id == TaskAudience.task_id)
+                .filter(Task.title == "fan-out")
+                .count()
+            )
+    engine.dispose()
+    tmp.cleanup()
+
+    expected = 2 * args.rounds * len(user_ids)
+    ok = total_tasks == expected == total_audience
+    speedup = (results["single"]["best_ms"] / results["fan_out"]["best_ms"]) if results["fan_out"]["best_ms"] else None
+    print(json.dumps({"benchmark": "task_fanout", "params": vars(args), "ok": ok,
+                      "expected_tasks": expected, "tasks": total_tasks, "audience_rows": total_audience,
+                      "speedup": round(speedup, 1) if speedup else None, "results": results},
+                     ensure_ascii=False, indent=2))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# backend/tests/test_access_log.py
+import logging
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.core import access_log
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record.msg)
+
+
+def test_should_log_sampling():
+    """
+    4xx/5xx 与慢请求始终记录；采样率为 0 时跳过普通 2xx
+    """
+    assert access_log.should_log(200, 5, sample_rate=1.0)
+    assert not access_log.should_log(200, 5, sample_rate=0.0)
+    assert access_log.should_log(404, 5, sample_rate=0.0)
+    assert access_log.should_log(200, access_log.ACCESS_LOG_SLOW_MS + 1, sample_rate=0.0)
+
+
+def test_middleware_logs_route_template():
+    """
+    访问日志记录路由模板而不是具体路径，并包含状态码与耗时
+    """
+    app = FastAPI()
+    app.add_middleware(access_log.AccessLogMiddleware, sample_rate=1.0)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404)
+        return {"id": item_id}
+
+    handler = _ListHandler()
+    access_log.access_logger.addHandler(handler)
+    try:
+        client = TestClient(app)
+        client.get("/items/42")
+        client.get("/items/0")
+    finally:
+        access_log.access_logger.removeHandler(handler)
+
+    assert [(r["route"], r["status"]) for r in handler.records] == [("/items/{item_id}", 200), ("/items/{item_id}", 404)]
+    assert all(r["duration_ms"] >= 0 and r["user_id"] is None for r in handler.records)
@@ -0,0 +1,75 @@
+# backend/tests/test_db_config.py
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.db_config import build_engine_kwargs, install_read_only_guard, install_sqlite_pragmas, pool_status
+
+
+def _make_engine(tmp_path, monkeypatch, **env):
+    for key, value in env.items():
+        monkeypatch.setenv(key, value)
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = create_engine(url, **build_engine_kwargs(url))
+    install_sqlite_pragmas(engine, url)
+    return engine
+
+
+def test_sqlite_pragmas_applied(tmp_path, monkeypatch):
+    """
+    新连接上应用 WAL / synchronous=NORMAL / cache_size 等 PRAGMA
+    """
+    engine = _make_engine(tmp_path, monkeypatch, SQLITE_CACHE_SIZE="-2000")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -2000
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    engine.dispose()
+
+
+def test_pool_settings_from_env(tmp_path, monkeypatch):
+    """
+    连接池大小与溢出数由环境变量控制
+    """
+    engine = _make_engine(tmp_path, monkeypatch, DB_POOL_SIZE="3", DB_MAX_OVERFLOW="1")
+    assert engine.pool.size() == 3
+    assert engine.pool._max_overflow == 1
+    engine.dispose()
+
+
+def test_pool_status_reports_in_use_and_wait(tmp_path, monkeypatch):
+    """
+    pool_status 返回占用连接数与 checkout 统计，dispose 后指标保留
+    """
+    engine = _make_engine(tmp_path, monkeypatch)
+    conn1 = engine.connect()
+    conn2 = engine.connect()
+    status = pool_status(engine)
+    assert status["in_use"] == 2
+    assert status["checkouts"] == 2
+    assert status["checkout_wait_max_ms"] >= 0
+    conn1.close()
+    conn2.close()
+    assert pool_status(engine)["in_use"] == 0
+
+    engine.dispose()
+    assert pool_status(engine)["checkouts"] == 2
+
+
+def test_read_only_guard_blocks_writes(tmp_path):
+    """
+    只读库连接拒绝写入，读取正常
+    """
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    with create_engine(url).begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY)"))
+        conn.execute(text("INSERT INTO t (id) VALUES (1)"))
+
+    read_engine = create_engine(url, **build_engine_kwargs(url))
+    install_read_only_guard(read_engine, url)
+    with read_engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM t")).scalar() == 1
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO t (id) VALUES (2)"))
+    read_engine.dispose()
@@ -0,0 +1,35 @@
+# backend/tests/test_db_session.py
+from types import SimpleNamespace
+
+from app.db import get_db, get_request_db
+
+
+def _fake_request():
+    return SimpleNamespace(state=SimpleNamespace())
+
+
+def test_get_db_shared_within_request():
+    """
+    同一请求内再次解析 get_db 复用已打开的 Session，请求结束后清理
+    """
+    request = _fake_request()
+    outer = get_db(request)
+    db = next(outer)
+    assert get_request_db(request) is db
+
+    inner = get_db(request)
+    assert next(inner) is db
+    inner.close()
+
+    outer.close()
+    assert get_request_db(request) is None
+
+
+def test_get_db_does_not_checkout_connection_until_used():
+    """
+    未执行 SQL 的请求不占用连接
+    """
+    gen = get_db(_fake_request())
+    db = next(gen)
+    assert not db.in_transaction()
+    gen.close()
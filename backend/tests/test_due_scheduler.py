@@ -0,0 +1,56 @@
+# backend/tests/test_due_scheduler.py
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, select
+
+from app.db import Base
+from app.core.due_scheduler import overdue_updates
+from app.models import Task, TaskStatus, task_is_overdue
+
+NOW = datetime(2025, 3, 1, 12, 0, 0)
+
+
+def test_task_is_overdue():
+    """
+    过期且未完成 / 未取消才算逾期；带时区的截止时间先换算为 UTC
+    """
+    def task(due, status=TaskStatus.PENDING, is_completed=False):
+        return SimpleNamespace(due_date=due, status=status, is_completed=is_completed)
+
+    assert task_is_overdue(task(NOW - timedelta(minutes=1)), NOW)
+    assert not task_is_overdue(task(NOW + timedelta(minutes=1)), NOW)
+    assert not task_is_overdue(task(None), NOW)
+    assert not task_is_overdue(task(NOW - timedelta(days=1), status=TaskStatus.DONE), NOW)
+    assert not task_is_overdue(task(NOW - timedelta(days=1), is_completed=True), NOW)
+    # 北京时间 19:30 = UTC 11:30
+    assert task_is_overdue(task(datetime(2025, 3, 1, 19, 30, tzinfo=timezone(timedelta(hours=8)))), NOW)
+
+
+def test_overdue_updates_mark_and_clear_in_bulk(tmp_path):
+    """
+    一轮两条 UPDATE：标记新逾期任务，清除已完成 / 截止时间推后的任务，且不改 updated_at
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'due.db'}")
+    Base.metadata.create_all(bind=engine)
+    tasks = Task.__table__
+    base = {"created_by": 1, "task_type": "checkbox", "assignment_type": "all", "is_completed": False,
+            "updated_at": datetime(2025, 1, 1)}
+    with engine.begin() as conn:
+        conn.execute(tasks.insert(), [
+            {**base, "title": "late", "due_date": NOW - timedelta(hours=1), "status": "pending", "is_overdue": False},
+            {**base, "title": "future", "due_date": NOW + timedelta(hours=1), "status": "pending", "is_overdue": False},
+            {**base, "title": "done", "due_date": NOW - timedelta(hours=1), "status": "done", "is_overdue": True},
+            {**base, "title": "moved", "due_date": NOW + timedelta(days=1), "status": "pending", "is_overdue": True},
+            {**base, "title": "none", "due_date": None, "status": "processing", "is_overdue": False},
+        ])
+        mark, clear = overdue_updates(NOW)
+        assert conn.execute(mark).rowcount == 1
+        assert conn.execute(clear).rowcount == 2
+        rows = dict(conn.execute(select(tasks.c.title, tasks.c.is_overdue)).all())
+        assert rows == {"late": True, "future": False, "done": False, "moved": False, "none": False}
+        assert set(conn.execute(select(tasks.c.updated_at)).scalars()) == {datetime(2025, 1, 1)}
+
+        mark, clear = overdue_updates(NOW)
+        assert conn.execute(mark).rowcount == 0 and conn.execute(clear).rowcount == 0
+    engine.dispose()
@@ -0,0 +1,34 @@
+# backend/tests/test_etag.py
+from starlette.requests import Request
+
+from app.core.etag import if_none_match, make_etag, not_modified
+
+
+def _request(if_none_match_header=None):
+    headers = [(b"if-none-match", if_none_match_header.encode())] if if_none_match_header else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_etag_is_stable_and_sensitive_to_parts():
+    """
+    相同组成部分得到相同的强 ETag，任一部分变化则不同
+    """
+    etag = make_etag([1, "2024-01-01"], 10, None)
+    assert etag == make_etag([1, "2024-01-01"], 10, None)
+    assert etag != make_etag([1, "2024-01-01"], 11, None)
+    assert etag.startswith('"') and etag.endswith('"')
+
+
+def test_if_none_match_accepts_lists_weak_and_wildcard():
+    """
+    If-None-Match 支持多个值、W/ 前缀与 *
+    """
+    etag = make_etag("task", 1)
+    assert if_none_match(_request(f'"other", W/{etag}'), etag)
+    assert if_none_match(_request("*"), etag)
+    assert not if_none_match(_request('"other"'), etag)
+    assert not if_none_match(_request(), etag)
+
+    response = not_modified(etag)
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
@@ -0,0 +1,144 @@
+# backend/tests/test_migrations.py
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.exc import IntegrityError
+
+from app import migrations
+from app.models import JielongRecord, Task, TaskAudience, TaskCompletion, TaskRecord, TaskTag, TaskUserProgress
+
+# 结构迁移步骤（1-5）经 run_migrations 执行；默认账号等数据初始化步骤在应用启动时覆盖
+SCHEMA_TARGET = 5
+# 由现有数据回填派生表 / 派生列的步骤：task_audience、task_user_progress、全文检索、task_tags、逾期标记
+BACKFILL_VERSIONS = (10, 11, 15, 16, 17)
+
+
+def test_run_migrations_records_versions_and_is_idempotent(tmp_path):
+    """
+    首次执行应用迁移并记录版本；再次执行不重复任何步骤
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    assert migrations.get_current_version(engine) == 0
+    assert migrations.needs_migration(engine)
+
+    applied = migrations.run_migrations(engine, target=SCHEMA_TARGET)
+    assert [m["version"] for m in applied] == list(range(1, SCHEMA_TARGET + 1))
+    assert migrations.get_current_version(engine) == SCHEMA_TARGET
+    assert "daily_reports" in inspect(engine).get_table_names()
+
+    assert migrations.run_migrations(engine, target=SCHEMA_TARGET) == []
+    engine.dispose()
+
+
+def test_migration_status_lists_pending_steps(tmp_path):
+    """
+    status 返回当前版本与待执行的步骤
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    migrations.run_migrations(engine, target=1)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT name FROM schema_version")).scalar() == "create_all"
+
+    status = migrations.migration_status(engine)
+    assert status["current_version"] == 1
+    assert status["pending"][0] == "0002_daily_report_sales_columns"
+    assert len(status["pending"]) == migrations.LATEST_VERSION - 1
+    engine.dispose()
+
+
+def test_integrity_error_inside_step_is_not_treated_as_concurrent_apply(tmp_path, monkeypatch):
+    """
+    步骤自身抛出的 IntegrityError 应中止迁移，且不记录该版本
+    """
+    def broken(conn):
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY)"))
+        conn.execute(text("INSERT INTO t (id) VALUES (1)"))
+        conn.execute(text("INSERT INTO t (id) VALUES (1)"))
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", [migrations.Migration(1, "broken", broken)])
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    with pytest.raises(IntegrityError):
+        migrations.run_migrations(engine, target=1)
+    assert migrations.get_current_version(engine) == 0
+    engine.dispose()
+
+
+def _seed_baseline(conn):
+    """升级前的库：派生表与 is_overdue 列尚不存在，任务与记录均已存在"""
+    now = datetime.utcnow()
+    tasks = Task.__table__
+    for row in (
+        {"id": 1, "title": "周末数学作业", "task_type": "amount", "assignment_type": "all", "target_amount": 100.0,
+         "tags": ["数学组", " 数学组 ", "通知"], "due_date": now - timedelta(days=1)},
+        {"id": 2, "title": "接龙报名", "task_type": "jielong", "assignment_type": "user", "assigned_to": 7,
+         "jielong_target_count": 3, "jielong_config": {"personal_targets": {"7": 1}}, "due_date": now + timedelta(days=1)},
+        {"id": 3, "title": "阅读打卡", "task_type": "checkbox", "assignment_type": "group", "target_group_id": 2,
+         "is_completed": True, "due_date": now - timedelta(days=1)},
+        {"id": 4, "title": "家访", "task_type": "quantity", "assignment_type": "identity", "target_identity": "CC",
+         "target_quantity": 5},
+    ):
+        conn.execute(tasks.insert().values(created_by=1, **row))
+    conn.execute(TaskRecord.__table__.insert(), [
+        {"id": 1, "task_id": 1, "user_id": 7, "value": 60.0},
+        {"id": 2, "task_id": 1, "user_id": 7, "value": 50.0},
+        {"id": 3, "task_id": 1, "user_id": 8, "value": 10.0},
+        {"id": 4, "task_id": 4, "user_id": 8, "value": 2.0},
+    ])
+    conn.execute(JielongRecord.__table__.insert(), [
+        {"id": 1, "task_id": 2, "user_id": 7, "student_id": "s1"},
+        {"id": 2, "task_id": 2, "user_id": 8, "student_id": "s2"},
+        {"id": 3, "task_id": 2, "user_id": 8, "student_id": "s3"},
+    ])
+    conn.execute(TaskCompletion.__table__.insert(), [{"id": 1, "task_id": 3, "user_id": 7, "is_completed": True}])
+
+    # create_all 已按当前模型建表：删除后续迁移新增的派生表与列，还原升级前的结构
+    for table in (TaskAudience, TaskUserProgress, TaskTag):
+        table.__table__.drop(bind=conn)
+    conn.execute(text("DROP INDEX ix_tasks_overdue_due_date"))
+    conn.execute(text("ALTER TABLE tasks DROP COLUMN is_overdue"))
+
+
+def _derived_state(conn):
+    progress = TaskUserProgress.__table__
+    return {
+        "audience": set(conn.execute(select(TaskAudience.__table__.c.principal, TaskAudience.__table__.c.task_id))),
+        "progress": set(conn.execute(select(progress.c.task_id, progress.c.user_id, progress.c.current_value,
+                                            progress.c.target_value, progress.c.is_completed))),
+        "tags": set(conn.execute(select(TaskTag.__table__.c.task_id, TaskTag.__table__.c.tag))),
+        "overdue": dict(conn.execute(text("SELECT id, is_overdue FROM tasks")).all()),
+        "fts": conn.execute(text("SELECT count(*) FROM tasks_fts")).scalar(),
+        "fts_tag_match": [r for (r,) in conn.execute(text("SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH '\"数学组\"'"))],
+    }
+
+
+def test_backfill_steps_populate_derived_data_and_rerun_as_noop(tmp_path):
+    """
+    在已有数据的库上执行回填步骤：受众、个人进度、标签、全文索引与逾期标记按现有行生成；重复执行结果不变
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    migrations.run_migrations(engine, target=SCHEMA_TARGET)
+    steps = [m for m in migrations.MIGRATIONS if m.version in BACKFILL_VERSIONS]
+    with engine.begin() as conn:
+        _seed_baseline(conn)
+        for step in steps:
+            step.apply(conn)
+        state = _derived_state(conn)
+
+    assert state["audience"] == {("all", 1), ("user:7", 2), ("group:2", 3), ("identity:CC", 4)}
+    assert state["progress"] == {
+        (1, 7, 110.0, 100.0, True), (1, 8, 10.0, 100.0, False),
+        (2, 7, 1.0, 1.0, True), (2, 8, 2.0, 3.0, False),  # 用户 7 的个人目标为 1
+        (3, 7, 1.0, 1.0, True),
+        (4, 8, 2.0, 5.0, False),
+    }
+    assert state["tags"] == {(1, "数学组"), (1, "通知")}
+    assert state["overdue"] == {1: True, 2: False, 3: False, 4: False}
+    assert state["fts"] == 4
+    assert state["fts_tag_match"] == [1]
+
+    with engine.begin() as conn:
+        for step in steps:
+            step.apply(conn)
+        assert _derived_state(conn) == state
+    engine.dispose()
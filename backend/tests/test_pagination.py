@@ -0,0 +1,24 @@
+# backend/tests/test_pagination.py
+import pytest
+from fastapi import HTTPException
+
+from app.core.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    """
+    游标编码后可原样解码，且不含 base64 填充字符
+    """
+    cursor = encode_cursor(42, "2024-01-02T03:04:05")
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 2) == [42, "2024-01-02T03:04:05"]
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor(1), encode_cursor(1, 2, 3)])
+def test_invalid_cursor_returns_400(cursor):
+    """
+    无法解码或元素个数不符的游标返回 400
+    """
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, 2)
+    assert exc.value.status_code == 400
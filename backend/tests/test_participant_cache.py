@@ -0,0 +1,37 @@
+# backend/tests/test_participant_cache.py
+from app.core.participant_cache import ParticipantSetCache
+
+
+def test_reuses_participant_set_until_epoch_bump():
+    """
+    同一 key 复用已加载的集合；纪元推进后重新加载
+    """
+    cache = ParticipantSetCache(ttl_seconds=30, max_entries=10)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return [3, 1, 3, None, 2]
+
+    assert cache.get_or_load(("group", 1), loader) == (1, 2, 3)
+    assert cache.get_or_load(("group", 1), loader) == (1, 2, 3)
+    assert len(loads) == 1
+
+    cache.bump_epoch()
+    cache.get_or_load(("group", 1), loader)
+    assert len(loads) == 2
+    assert cache.stats()["hits"] == 1
+
+
+def test_result_loaded_during_epoch_bump_is_not_cached():
+    """
+    加载期间成员关系变化时，本次结果不写入缓存
+    """
+    cache = ParticipantSetCache(ttl_seconds=30, max_entries=10)
+
+    def loader():
+        cache.bump_epoch()
+        return [1]
+
+    cache.get_or_load(("identity", "CC"), loader)
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,33 @@
+# backend/tests/test_security.py
+import asyncio
+
+from passlib.context import CryptContext
+
+from app.core import security
+
+
+def test_async_verify_and_hash():
+    """
+    线程池中的哈希与校验结果与同步版本一致
+    """
+    async def run():
+        hashed = await security.get_password_hash_async("secret123")
+        assert await security.verify_password_async("secret123", hashed)
+        assert not await security.verify_password_async("wrong", hashed)
+
+    asyncio.run(run())
+
+
+def test_rehash_when_rounds_change():
+    """
+    旧迭代次数生成的哈希在校验成功时返回新哈希；当前参数的哈希不需要升级
+    """
+    old_hash = CryptContext(schemes=["pbkdf2_sha256"], pbkdf2_sha256__default_rounds=1000).hash("secret123")
+    verified, new_hash = security.verify_and_update_password("secret123", old_hash)
+    assert verified
+    assert new_hash and f"${security.PASSWORD_HASH_ROUNDS}$" in new_hash
+
+    verified, again = security.verify_and_update_password("secret123", new_hash)
+    assert verified and again is None
+
+    assert security.verify_and_update_password("wrong", old_hash) == (False, None)
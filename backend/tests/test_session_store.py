@@ -0,0 +1,119 @@
+# backend/tests/test_session_store.py
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.session_store import MemorySessionStore, SQLiteSessionStore, ServerSideSessionMiddleware
+
+
+def test_memory_store_lru_and_ttl():
+    """
+    超出容量淘汰最久未使用的会话；TTL 到期后失效
+    """
+    store = MemorySessionStore(max_entries=2)
+    store.set("a", {"user_id": 1}, ttl=30)
+    store.set("b", {"user_id": 2}, ttl=30)
+    store.get("a")  # a 变为最近使用
+    store.set("c", {"user_id": 3}, ttl=30)
+    assert store.get("b") is None
+    assert store.get("a") == {"user_id": 1}
+
+    store.set("d", {"user_id": 4}, ttl=0.05)
+    time.sleep(0.1)
+    assert store.get("d") is None
+
+
+def test_sqlite_store_shared_between_instances(tmp_path):
+    """
+    SQLite 后端：不同实例（模拟多个 worker）读取同一份会话
+    """
+    path = str(tmp_path / "sessions.db")
+    SQLiteSessionStore(path).set("sid", {"user_id": 7}, ttl=30)
+    other = SQLiteSessionStore(path)
+    assert other.get("sid") == {"user_id": 7}
+    other.delete("sid")
+    assert SQLiteSessionStore(path).get("sid") is None
+
+
+def test_touch_extends_expiry_at_most_once_per_interval(tmp_path):
+    """
+    touch 将过期时间延长为 now + ttl；未到刷新间隔或会话已过期时不续期
+    """
+    for store in (MemorySessionStore(), SQLiteSessionStore(str(tmp_path / "sessions.db"))):
+        store.set("sid", {"user_id": 1}, ttl=0.3)
+        assert store.touch("sid", ttl=30, min_interval=10)
+        assert not store.touch("sid", ttl=30, min_interval=10)
+        time.sleep(0.4)
+        assert store.get("sid") == {"user_id": 1}
+
+        store.set("gone", {"user_id": 2}, ttl=0.05)
+        time.sleep(0.1)
+        assert not store.touch("gone", ttl=30)
+        assert store.get("gone") is None
+
+
+def _session_app(store, **options):
+    app = FastAPI()
+    app.add_middleware(ServerSideSessionMiddleware, store=store, **options)
+
+    @app.post("/login/{user_id}")
+    async def login(user_id: int, request: Request):
+        request.session["user_id"] = user_id
+        request.session["user"] = {"id": user_id, "username": f"u{user_id}", "role": "user"}
+        return {"ok": True}
+
+    @app.get("/me")
+    async def me(request: Request):
+        return {"user_id": request.session.get("user_id")}
+
+    @app.post("/logout")
+    async def logout(request: Request):
+        request.session.clear()
+        return {"ok": True}
+
+    return app
+
+
+def test_middleware_cookie_carries_only_session_id():
+    """
+    Cookie 只携带会话 ID，数据保存在服务端；切换用户时更换会话 ID，登出后清除
+    """
+    store = MemorySessionStore()
+    client = TestClient(_session_app(store))
+
+    client.post("/login/1")
+    sid = client.cookies.get("session")
+    assert sid and "u1" not in sid
+    assert store.get(sid)["user_id"] == 1
+    assert client.get("/me").json() == {"user_id": 1}
+
+    # 未修改会话的请求不重新下发 Cookie
+    assert "set-cookie" not in client.get("/me").headers
+
+    client.post("/login/2")
+    new_sid = client.cookies.get("session")
+    assert new_sid != sid
+    assert store.get(sid) is None
+
+    client.post("/logout")
+    assert store.get(new_sid) is None
+    assert len(store) == 0
+    assert client.get("/me").json() == {"user_id": None}
+
+
+def test_middleware_slides_expiry_on_reads():
+    """
+    只读请求也会续期会话并重新下发 Cookie（滑动窗口）
+    """
+    store = MemorySessionStore()
+    client = TestClient(_session_app(store, refresh_interval=0))
+
+    client.post("/login/1")
+    sid = client.cookies.get("session")
+    expires_at = store._entries[sid][0]
+    time.sleep(0.05)
+    r = client.get("/me")
+    assert r.json() == {"user_id": 1}
+    assert r.headers["set-cookie"].startswith(f"session={sid};")
+    assert store._entries[sid][0] > expires_at
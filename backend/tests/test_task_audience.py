@@ -0,0 +1,30 @@
+# backend/tests/test_task_audience.py
+from types import SimpleNamespace
+
+from app.models import TaskAssignmentType, task_principals, user_principals
+
+
+def _task(assignment_type, **fields):
+    defaults = {"assigned_to": None, "target_group_id": None, "target_identity": None}
+    return SimpleNamespace(assignment_type=assignment_type, **{**defaults, **fields})
+
+
+def test_task_principals_per_assignment_type():
+    """
+    每种分配方式映射为一个受众主体；字段缺失时不可见
+    """
+    assert task_principals(_task(TaskAssignmentType.ALL)) == {"all"}
+    assert task_principals(_task(TaskAssignmentType.USER, assigned_to=7)) == {"user:7"}
+    assert task_principals(_task("group", target_group_id=3)) == {"group:3"}
+    assert task_principals(_task(TaskAssignmentType.IDENTITY, target_identity="CC")) == {"identity:CC"}
+    assert task_principals(_task(TaskAssignmentType.GROUP)) == set()
+
+
+def test_user_principals_follow_group_and_identity():
+    """
+    用户主体随组与身份变化，无需改写 task_audience
+    """
+    user = SimpleNamespace(id=5, group_id=2, identity_type="SS")
+    assert user_principals(user) == ["all", "user:5", "group:2", "identity:SS"]
+    user.group_id, user.identity_type = None, None
+    assert user_principals(user) == ["all", "user:5"]
@@ -0,0 +1,133 @@
+# backend/tests/test_task_progress.py
+import threading
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import configure_mappers, sessionmaker
+
+from app.db import Base
+from app.models import JielongRecord, Task, TaskRecord, TaskUserProgress, jielong_aggregate_progress
+
+THREADS = 16
+ROUNDS = 50
+USERS = (1, 2, 3, 4)
+
+
+@pytest.fixture
+def crud():
+    """真实写入路径：task_crud 依赖完整的 schemas 与 ORM 映射，两者不可用时跳过"""
+    try:
+        from app.crud import task_crud
+        from app.schemas import JielongParticipationCreate
+        configure_mappers()
+    except Exception as e:
+        pytest.skip(f"task_crud 不可用：{type(e).__name__}")
+    return SimpleNamespace(task_crud=task_crud, JielongParticipationCreate=JielongParticipationCreate)
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'progress.db'}", connect_args={"timeout": 60})
+    Base.metadata.create_all(bind=engine)
+    base = {"created_by": 1, "assignment_type": "all"}
+    with engine.begin() as conn:
+        conn.execute(Task.__table__.insert().values(
+            **base, id=1, title="募捐", task_type="amount", target_amount=50.0, current_amount=0.0))
+        conn.execute(Task.__table__.insert().values(
+            **base, id=2, title="接龙", task_type="jielong", jielong_target_count=30, jielong_current_count=0,
+            jielong_config={"personal_targets": {"1": 1000}}))
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+def _run_threads(target):
+    """每个线程用独立 Session（相当于独立请求）执行 target(i)；返回各线程结果"""
+    results, errors = [], []
+
+    def run(i):
+        try:
+            results.append(target(i))
+        except Exception as e:  # 线程内异常带回主线程断言
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    return results
+
+
+def _progress(conn, task_id):
+    table = TaskUserProgress.__table__
+    return [tuple(r) for r in conn.execute(
+        select(table.c.user_id, table.c.current_value, table.c.is_completed)
+        .where(table.c.task_id == task_id).order_by(table.c.user_id))]
+
+
+def _count(conn, model):
+    return conn.execute(select(func.count()).select_from(model.__table__)).scalar()
+
+
+def test_concurrent_progress_logs_keep_exact_totals(crud, sessions):
+    """
+    多线程并发调用 log_task_progress / add_jielong_participation：任务计数器与个人进度不丢失更新
+    """
+    def submit(i):
+        user_id = USERS[i % len(USERS)]
+        ok = 0
+        for n in range(ROUNDS):
+            with sessions() as db:
+                ok += crud.task_crud.log_task_progress(db, 1, user_id, 1.5) is not None
+            with sessions() as db:
+                data = crud.JielongParticipationCreate(id=f"s{i}-{n}")
+                ok += crud.task_crud.add_jielong_participation(db, 2, user_id, data) is not None
+        return ok
+
+    assert _run_threads(submit) == [2 * ROUNDS] * THREADS
+
+    per_user = THREADS // len(USERS) * ROUNDS
+    with sessions() as db:
+        conn = db.connection()
+        tasks = Task.__table__
+        assert conn.execute(select(tasks.c.current_amount).where(tasks.c.id == 1)).scalar() == THREADS * ROUNDS * 1.5
+        assert conn.execute(select(tasks.c.jielong_current_count).where(tasks.c.id == 2)).scalar() == THREADS * ROUNDS
+        assert _count(conn, TaskRecord) == _count(conn, JielongRecord) == THREADS * ROUNDS
+        # 金额目标 50 均已达到；接龙用户 1 个人目标 1000 未达到，其他用户默认目标 30 已达到
+        assert _progress(conn, 1) == [(u, per_user * 1.5, True) for u in USERS]
+        assert _progress(conn, 2) == [(u, per_user, u != 1) for u in USERS]
+
+
+def test_concurrent_retries_with_same_idempotency_key_count_once(crud, sessions):
+    """
+    同一幂等键的并发重试只生效一次：计数器、明细与个人进度都只累加一次，其余请求得到已有结果
+    """
+    def retry(i):
+        with sessions() as db:
+            assert crud.task_crud.log_task_progress(db, 1, 1, 10.0, idempotency_key="retry-amount") is not None
+        with sessions() as db:
+            data = crud.JielongParticipationCreate(id="s1")
+            return crud.task_crud.add_jielong_participation(db, 2, 1, data, idempotency_key="retry-jielong").id
+
+    assert len(set(_run_threads(retry))) == 1
+
+    with sessions() as db:
+        conn = db.connection()
+        tasks = Task.__table__
+        assert conn.execute(select(tasks.c.current_amount).where(tasks.c.id == 1)).scalar() == 10.0
+        assert conn.execute(select(tasks.c.jielong_current_count).where(tasks.c.id == 2)).scalar() == 1
+        assert _count(conn, TaskRecord) == _count(conn, JielongRecord) == 1
+        assert _progress(conn, 1) == [(1, 10.0, False)]
+        assert _progress(conn, 2) == [(1, 1.0, False)]
+
+
+def test_jielong_aggregate_uses_participant_personal_targets():
+    """
+    接龙汇总目标 = 默认目标 × 参与人数，属于参与者的个人目标替换默认值，非参与者的配置忽略
+    """
+    task = SimpleNamespace(jielong_target_count=5, jielong_current_count=9,
+                           jielong_config={"personal_targets": {"1": 8, 2: 2, "99": 100}})
+    assert jielong_aggregate_progress(task, [1, 2, 3]) == (15, 0.6)
+    assert jielong_aggregate_progress(task, []) == (None, None)
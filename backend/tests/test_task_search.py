@@ -0,0 +1,47 @@
+# backend/tests/test_task_search.py
+from sqlalchemy import create_engine, text
+
+from app.db import Base
+from app.core.task_search import install_task_search
+from app.models import Task
+
+
+def _match(conn, q):
+    return [row[0] for row in conn.execute(
+        text("SELECT title FROM tasks_fts WHERE tasks_fts MATCH :q ORDER BY bm25(tasks_fts, 10.0, 1.0, 5.0)"), {"q": q})]
+
+
+def test_fts_index_follows_task_writes(tmp_path):
+    """
+    回填已有任务；插入 / 更新 / 删除（含批量语句）由触发器同步，标签中的中文可检索
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    Base.metadata.create_all(bind=engine)
+    tasks = Task.__table__
+
+    def row(title, description=None, tags=None):
+        return {"title": title, "description": description, "tags": tags, "created_by": 1,
+                "task_type": "CHECKBOX", "assignment_type": "ALL", "priority": "MEDIUM", "status": "PENDING"}
+
+    with engine.begin() as conn:
+        conn.execute(tasks.insert(), [row("周末数学作业", description="完成练习册")])
+        install_task_search(conn)
+        conn.execute(tasks.insert(), [
+            row("阅读打卡", description="每天阅读数学故事"),
+            row("家长会回执", tags=["数学组", "通知"]),
+        ])
+
+        assert _match(conn, '"数学作业"') == ["周末数学作业"]
+        assert _match(conn, '"数学组"') == ["家长会回执"]
+        assert _match(conn, '"数学故"') == ["阅读打卡"]
+
+        conn.execute(tasks.update().where(tasks.c.title == "阅读打卡").values(title="数学故事打卡"))
+        assert _match(conn, '"数学故"') == ["数学故事打卡"]
+
+        conn.execute(tasks.delete().where(tasks.c.title == "数学故事打卡"))
+        assert _match(conn, '"数学故"') == []
+        assert conn.execute(text("SELECT count(*) FROM tasks_fts")).scalar() == 2
+
+        install_task_search(conn)  # 重复执行幂等
+        assert conn.execute(text("SELECT count(*) FROM tasks_fts")).scalar() == 2
+    engine.dispose()
@@ -0,0 +1,12 @@
+# backend/tests/test_task_tags.py
+from app.models import TAG_MAX_LENGTH, task_tag_values
+
+
+def test_task_tag_values_normalizes_json_tags():
+    """
+    去除空白与重复、忽略非字符串，保持原顺序；非数组返回空列表
+    """
+    assert task_tag_values([" 数学 ", "通知", "数学", "", None, 3, "  "]) == ["数学", "通知"]
+    assert task_tag_values(None) == []
+    assert task_tag_values("数学") == []
+    assert task_tag_values(["x" * 100]) == ["x" * TAG_MAX_LENGTH]
@@ -0,0 +1,70 @@
+# backend/tests/test_user_cache.py
+import time
+
+from app.core.user_cache import UserIdentityCache
+
+
+def test_cache_hit_and_miss():
+    """
+    写入快照后命中，未写入的 user_id 未命中
+    """
+    cache = UserIdentityCache(ttl_seconds=30, max_entries=10)
+    cache.put(1, {"id": 1, "username": "alice"})
+
+    assert cache.get(1) == {"id": 1, "username": "alice"}
+    assert cache.get(2) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_returns_copy():
+    """
+    调用方修改返回的快照不应污染缓存
+    """
+    cache = UserIdentityCache(ttl_seconds=30, max_entries=10)
+    cache.put(1, {"id": 1, "role": "user"})
+    snapshot = cache.get(1)
+    snapshot["role"] = "super_admin"
+    assert cache.get(1)["role"] == "user"
+
+
+def test_cache_expires_after_ttl():
+    """
+    超过 TTL 后条目失效
+    """
+    cache = UserIdentityCache(ttl_seconds=0.05, max_entries=10)
+    cache.put(1, {"id": 1})
+    time.sleep(0.1)
+    assert cache.get(1) is None
+
+
+def test_cache_invalidate_and_clear():
+    """
+    显式失效与清空
+    """
+    cache = UserIdentityCache(ttl_seconds=30, max_entries=10)
+    cache.put(1, {"id": 1})
+    cache.put(2, {"id": 2})
+    cache.put(3, {"id": 3})
+
+    cache.invalidate(1, 2)
+    assert cache.get(1) is None
+    assert cache.get(2) is None
+    assert cache.get(3) == {"id": 3}
+
+    cache.clear()
+    assert cache.get(3) is None
+
+
+def test_cache_respects_max_entries():
+    """
+    超出容量时淘汰最早写入的条目
+    """
+    cache = UserIdentityCache(ttl_seconds=30, max_entries=2)
+    cache.put(1, {"id": 1})
+    cache.put(2, {"id": 2})
+    cache.put(3, {"id": 3})
+
+    assert cache.stats()["size"] == 2
+    assert cache.get(1) is None
+    assert cache.get(3) == {"id": 3}